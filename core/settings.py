@@ -24,17 +24,91 @@ ALLOWED_HOSTS = os.getenv("ALLOWED_HOSTS", "").split(",") if os.getenv("ALLOWED_
 
 # Application-specific settings
 CALENDLY_SIGNING_KEY = os.getenv("CALENDLY_SIGNING_KEY", "")
+# Failed attempts to apply a stored delivery before it is marked failed
+CALENDLY_MAX_ATTEMPTS = int(os.getenv("CALENDLY_MAX_ATTEMPTS", "6"))
 LLM_BASE_URL = os.getenv("LLM_BASE_URL", "")
 LLM_API_KEY  = os.getenv("LLM_API_KEY", "")
 LLM_MODEL    = os.getenv("LLM_MODEL", "deepseek-chat")
 ASSISTANT_ENABLED = os.getenv("ASSISTANT_ENABLED", "0") == "1"
-
-CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "barrister-site-cache"
-    }
+# Assistant reply cache: seconds to keep answers (0 disables) and the shingle
+# similarity at which a first-turn question reuses a near-identical one's answer
+# (0 disables the near-duplicate tier)
+ASSISTANT_RESPONSE_CACHE_TTL = int(os.getenv("ASSISTANT_RESPONSE_CACHE_TTL", "86400"))
+ASSISTANT_NEAR_DUPLICATE_THRESHOLD = float(os.getenv("ASSISTANT_NEAR_DUPLICATE_THRESHOLD", "0.8"))
+# Approximate tokens of retrieved site content added to each assistant prompt
+# (pages/retrieval.py); 0 leaves only the site map
+ASSISTANT_CONTEXT_TOKENS = int(os.getenv("ASSISTANT_CONTEXT_TOKENS", "700"))
+# Assistant prompt budget (pages/prompt.py), in estimated tokens: the whole
+# prompt, and any one message (longer questions are refused, longer history
+# turns cut)
+ASSISTANT_PROMPT_TOKENS = int(os.getenv("ASSISTANT_PROMPT_TOKENS", "2500"))
+ASSISTANT_MAX_MESSAGE_TOKENS = int(os.getenv("ASSISTANT_MAX_MESSAGE_TOKENS", "400"))
+# Per-client rate limits (pages/ratelimit.py), shared across workers via the cache.
+# "rates" are "<count>/<period>" strings; "block" locks a client out for N seconds
+# after it trips a limit.
+RATE_LIMITS = {
+    "assist": {"rates": [os.getenv("RATE_LIMIT_ASSIST", "3/30s")], "block": 10},
+    "contact": {"rates": [os.getenv("RATE_LIMIT_CONTACT", "5/10m")]},
+    "book_submit": {"rates": [os.getenv("RATE_LIMIT_BOOK_SUBMIT", "5/10m")]},
 }
+# Reverse proxies in front of the app that append to X-Forwarded-For (1 on
+# Render). Rate limits key on the address the outermost of them saw; 0 uses
+# REMOTE_ADDR, which behind a proxy is the proxy itself.
+RATE_LIMIT_PROXY_HOPS = int(os.getenv("RATE_LIMIT_PROXY_HOPS", "0"))
+# Serve /api/assist/ with async views; only useful under an ASGI worker (see DEPLOYMENT.md)
+ASSISTANT_ASYNC = os.getenv("ASSISTANT_ASYNC", "0") == "1"
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "25"))            # overall budget per message, incl. retries
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))  # consecutive failures before failing fast
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))       # seconds before probing the upstream again
+
+# Email. Site mail is queued in the database and sent by `manage.py send_outbox`
+# (pages/outbox.py), never during a request.
+EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", "django.core.mail.backends.smtp.EmailBackend")
+EMAIL_HOST = os.getenv("EMAIL_HOST", "localhost")
+EMAIL_PORT = int(os.getenv("EMAIL_PORT", "587"))
+EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER", "")
+EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "")
+EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "1") == "1"
+EMAIL_TIMEOUT = int(os.getenv("EMAIL_TIMEOUT", "20"))
+DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "webmaster@localhost")
+ENQUIRY_TO_EMAIL = os.getenv("ENQUIRY_TO_EMAIL", "")   # where enquiry/booking notifications go; empty disables them
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))      # messages sent per SMTP connection
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))   # then the message is dead-lettered
+OUTBOX_RETRY_BASE = int(os.getenv("OUTBOX_RETRY_BASE", "60"))      # seconds before the first retry, doubling
+OUTBOX_RETRY_CAP = int(os.getenv("OUTBOX_RETRY_CAP", "3600"))
+
+# Public page cache: seconds a rendered page is kept (0 disables). Entries are
+# also invalidated whenever CMS content is saved, so this can be generous.
+PAGE_CACHE_TIMEOUT = int(os.getenv("PAGE_CACHE_TIMEOUT", "3600"))
+# Identifies the deployed code in public page ETags (pages/conditional.py), so
+# browsers re-download pages after a deploy; Render sets RENDER_GIT_COMMIT
+SITE_RELEASE = os.getenv("SITE_RELEASE") or os.getenv("RENDER_GIT_COMMIT", "")
+# Seconds each process batches metric increments before writing them to the cache
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "10"))
+# Bearer token allowing a scraper to read /metrics/ without a staff login
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Shared across all gunicorn workers on the node (SQLite file in WAL mode), so
+# rate limits and the page cache are not split per process.
+# Set CACHE_BACKEND=locmem to fall back to the old per-process cache.
+if os.getenv("CACHE_BACKEND", "sqlite") == "locmem":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "barrister-site-cache"
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "pages.cache_backends.SQLiteCache",
+            "LOCATION": os.getenv("CACHE_LOCATION", str(BASE_DIR / "cache.sqlite3")),
+            "OPTIONS": {
+                "MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", "5000")),
+            },
+        }
+    }
 
 # Application definition
 
@@ -87,10 +161,34 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Connection settings for the SQLite file shared by all gunicorn workers
+# (pages/sqlite_backend). WAL lets readers carry on while one process writes;
+# NORMAL sync is safe with WAL (a power cut can lose the last commits, not
+# corrupt the file); writers wait up to BUSY_TIMEOUT ms for the lock instead of
+# failing with "database is locked". Sizes are bytes for mmap and, when
+# negative, KiB of page cache per connection.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000")),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(128 * 1024 * 1024))),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-20000")),
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'pages.sqlite_backend',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'init_command': "; ".join(f"PRAGMA {name} = {value}" for name, value in SQLITE_PRAGMAS.items()),
+            # transaction.atomic() takes the write lock when it starts, so a
+            # transaction that reads before writing can't fail to upgrade
+            'transaction_mode': os.getenv("SQLITE_TRANSACTION_MODE", "IMMEDIATE"),
+        },
+        # On-disk test database: the default in-memory one uses SQLite's shared
+        # cache, which fails concurrent writers immediately instead of making
+        # them wait, so the booking stress test needs a real file
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Lead, SitePage, PracticeArea, BlogPost, CaseStudy, Booking, HomepageSettings, AvailabilitySlot, BookingSubmission
+from django.utils import timezone
+from .models import Lead, SitePage, PracticeArea, BlogPost, CaseStudy, Booking, HomepageSettings, AvailabilitySlot, BookingSubmission, OutboundEmail, CalendlyDelivery
+from . import calendly, search
 
 @admin.register(HomepageSettings)
 class HomepageSettingsAdmin(admin.ModelAdmin):
@@ -25,11 +27,25 @@ class PracticeAreaAdmin(admin.ModelAdmin):
     prepopulated_fields = {"slug": ("name",)}
     list_editable = ("order",)
 
+class IndexedSearchMixin:
+    """
+    Admin search through the full-text index (pages/search.py) for the long
+    text fields; search_fields then only needs the short columns.
+    """
+    search_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        matches, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term.strip() and search.enabled():
+            matches |= queryset.filter(pk__in=search.matching_ids(search_term, self.search_kind))
+        return matches, may_have_duplicates
+
 @admin.register(BlogPost)
-class BlogPostAdmin(admin.ModelAdmin):
+class BlogPostAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ("title","published","published_at","created_at","source_name")
     list_filter = ("published",)
-    search_fields = ("title","summary","body","source_name")
+    search_fields = ("title","source_name")
+    search_kind = search.BLOG
     prepopulated_fields = {"slug": ("title",)}
     date_hierarchy = "published_at"
     fieldsets = (
@@ -46,10 +62,11 @@ class BlogPostAdmin(admin.ModelAdmin):
     )
 
 @admin.register(CaseStudy)
-class CaseStudyAdmin(admin.ModelAdmin):
+class CaseStudyAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ("title","outcome","published","published_at")
     list_filter = ("published","practice_areas")
-    search_fields = ("title","summary","body","citation_ref","citation_name")
+    search_fields = ("title","citation_ref","citation_name")
+    search_kind = search.CASE
     prepopulated_fields = {"slug": ("title",)}
     filter_horizontal = ("practice_areas",)
     date_hierarchy = "published_at"
@@ -97,4 +114,35 @@ class BookingSubmissionAdmin(admin.ModelAdmin):
         ("Payment & Status", {
             "fields": ("is_paid", "created_at")
         }),
-    )
\ No newline at end of file
+    )
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ("subject", "to", "status", "attempts", "next_attempt_at", "created_at", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("subject", "to")
+    readonly_fields = ("attempts", "last_error", "created_at", "sent_at")
+    ordering = ("-created_at",)
+    actions = ["retry_now"]
+
+    @admin.action(description="Send again on the next outbox run")
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=OutboundEmail.SENT).update(
+            status=OutboundEmail.PENDING, attempts=0, next_attempt_at=timezone.now(), claim="",
+        )
+        self.message_user(request, f"{updated} message(s) queued for retry.")
+
+@admin.register(CalendlyDelivery)
+class CalendlyDeliveryAdmin(admin.ModelAdmin):
+    list_display = ("event", "calendly_id", "status", "attempts", "received_at", "processed_at")
+    list_filter = ("status", "event")
+    search_fields = ("calendly_id",)
+    readonly_fields = ("digest", "body", "event", "calendly_id", "attempts", "last_error", "received_at",
+                       "processed_at")
+    ordering = ("-received_at",)
+    actions = ["replay_deliveries"]
+
+    @admin.action(description="Apply again on the next process_calendly run")
+    def replay_deliveries(self, request, queryset):
+        updated = calendly.replay(queryset)
+        self.message_user(request, f"{updated} delivery(ies) queued for replay.")
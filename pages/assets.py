@@ -0,0 +1,269 @@
+"""
+Build of the self-hosted front-end bundle, run by `manage.py build_assets`.
+
+The site used to load Bootstrap, Bootstrap Icons and its fonts from jsDelivr
+and Google Fonts. This builds them from the copies in assets/vendor/ instead,
+offline:
+
+- the Bootstrap stylesheet is purged: a rule is kept only if every class in
+  one of its selectors could appear in the site's markup (any word that occurs
+  in Templates/, static/js/ or the Python code, or a prefix written before a
+  template variable, like `alert-{{ message.tags }}`);
+- the icon font is cut down to the `bi-*` icons that occur in those files, and
+  only their CSS rules are kept;
+- the Inter font is cut down to Latin text and the 400-700 weights the site
+  uses;
+- the purged Bootstrap, the icon rules, the @font-face rules and site.css are
+  written as one stylesheet, css/bundle.css. assistant.css is not included:
+  base.html loads it with assistant.js when the widget is first used.
+
+The serif display faces (IBM Plex Serif, Playfair Display) are not vendored
+yet and still come from Google Fonts, loaded without blocking rendering.
+
+The outputs are committed and go through collectstatic like any other static
+file, so CompressedManifestStaticFilesStorage fingerprints them and WhiteNoise
+serves them precompressed (gzip and Brotli) with a far-future cache lifetime.
+Font subsetting needs fontTools with WOFF2 support (requirements-dev.txt);
+the site itself does not.
+"""
+import gzip
+import io
+import logging
+import re
+from pathlib import Path
+
+from django.conf import settings
+
+VENDOR = settings.BASE_DIR / "assets" / "vendor"
+STATIC = Path(settings.STATICFILES_DIRS[0])
+
+BOOTSTRAP_CSS = VENDOR / "bootstrap" / "bootstrap.min.css"
+BOOTSTRAP_JS = VENDOR / "bootstrap" / "bootstrap.min.js"
+ICONS_CSS = VENDOR / "bootstrap-icons" / "bootstrap-icons.min.css"
+ICONS_FONT = VENDOR / "bootstrap-icons" / "bootstrap-icons.woff2"
+INTER_FONT = VENDOR / "inter" / "Inter.var.ttf"
+
+# site stylesheets appended after Bootstrap, in cascade order
+SITE_CSS = ("css/site.css",)
+
+BUNDLE = "css/bundle.css"
+ICONS_OUTPUT = "fonts/bootstrap-icons.woff2"
+INTER_OUTPUT = "fonts/inter-latin.woff2"
+JS_OUTPUT = "js/bootstrap.min.js"
+
+# Where class names can appear
+SCANNED = (
+    (settings.BASE_DIR / "Templates", "*.html"),
+    (STATIC / "js", "*.js"),
+    (settings.BASE_DIR / "pages", "*.py"),
+)
+# classes only ever added by Bootstrap's own JavaScript (collapse, alert)
+SAFELIST = frozenset({"show", "showing", "hiding", "collapsing", "collapsed", "fade"})
+
+# Google Fonts' "latin" range
+LATIN = ("U+0000-00FF,U+0131,U+0152-0153,U+02BB-02BC,U+02C6,U+02DA,U+02DC,U+0304,U+0308,U+0329,"
+         "U+2000-206F,U+20AC,U+2122,U+2191,U+2193,U+2212,U+2215,U+FEFF,U+FFFD")
+INTER_WEIGHTS = (400, 700)
+
+FONT_FACES = f"""@font-face{{font-family:Inter;font-style:normal;font-weight:{INTER_WEIGHTS[0]} {INTER_WEIGHTS[1]};\
+font-display:swap;src:url("../{INTER_OUTPUT}") format("woff2");unicode-range:{LATIN.replace(",", ", ")}}}"""
+
+_TOKEN = re.compile(r"[A-Za-z_][\w-]*")
+_DYNAMIC_PREFIX = re.compile(r"([A-Za-z][\w-]*-)\{[{%]")
+_CLASS = re.compile(r"\.((?:\\.|[\w-])+)")
+_NOT = re.compile(r":not\((?:[^()]|\([^()]*\))*\)")
+_SOURCE_MAP = re.compile(r"\n?/[*/]# sourceMappingURL=\S+(?: \*/)?\s*$")
+_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_ICON_RULE = re.compile(r'\.bi-([\w-]+)::before\{content:"\\([0-9a-f]+)"\}')
+
+
+def markup_words():
+    """(words, prefixes): every identifier-like word in the scanned files, and
+    the class prefixes that are completed by a template variable."""
+    words, prefixes = set(), set()
+    for directory, pattern in SCANNED:
+        for path in directory.rglob(pattern):
+            if path == STATIC / JS_OUTPUT or path.name.startswith("tests"):
+                continue  # Bootstrap's own class names; test fixtures
+            text = path.read_text(encoding="utf-8", errors="replace")
+            words.update(_TOKEN.findall(text))
+            prefixes.update(_DYNAMIC_PREFIX.findall(text))
+    return words, tuple(sorted(prefixes))
+
+
+# --- a minimal CSS reader: enough for minified Bootstrap and our stylesheets
+
+def _block_end(css, start):
+    """Index just past the "}" matching the "{" at css[start]."""
+    depth, i, quote = 0, start, None
+    while i < len(css):
+        char = css[i]
+        if quote:
+            if char == "\\":
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    raise ValueError("unbalanced braces in CSS")
+
+
+def rules(css):
+    """Top-level (prelude, body) pairs; body is None for statements like @charset."""
+    css = _COMMENT.sub("", css)
+    out, i = [], 0
+    while i < len(css):
+        while i < len(css) and css[i].isspace():
+            i += 1
+        brace = css.find("{", i)
+        semicolon = css.find(";", i)
+        if brace == -1 and semicolon == -1:
+            break
+        if css.startswith("@", i) and semicolon != -1 and (brace == -1 or semicolon < brace):
+            out.append((css[i:semicolon].strip(), None))
+            i = semicolon + 1
+            continue
+        end = _block_end(css, brace)
+        out.append((css[i:brace].strip(), css[brace + 1:end - 1]))
+        i = end
+    return out
+
+
+def split_selectors(prelude):
+    """Selectors of a rule, split on commas outside parentheses and brackets."""
+    parts, depth, current = [], 0, ""
+    for char in prelude:
+        if char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        if char == "," and depth == 0:
+            parts.append(current.strip())
+            current = ""
+        else:
+            current += char
+    parts.append(current.strip())
+    return parts
+
+
+def selector_used(selector, words, prefixes):
+    # a class inside :not() is a condition on the element, not a requirement
+    classes = _CLASS.findall(_NOT.sub("", selector))
+    return all(
+        name in words or name in SAFELIST or name.startswith(prefixes)
+        for name in (c.replace("\\", "") for c in classes)
+    )
+
+
+def purge(css, words, prefixes):
+    """`css` without the style rules none of whose selectors can match the site's markup."""
+    kept = []
+    for prelude, body in rules(css):
+        if body is None:
+            kept.append(prelude + ";")
+        elif prelude.startswith(("@media", "@supports", "@container", "@layer")):
+            inner = purge(body, words, prefixes)
+            if inner:
+                kept.append(f"{prelude}{{{inner}}}")
+        elif prelude.startswith("@"):
+            kept.append(f"{prelude}{{{body}}}")  # @font-face, @keyframes, ...
+        else:
+            selectors = [s for s in split_selectors(prelude) if selector_used(s, words, prefixes)]
+            if selectors:
+                kept.append(f"{','.join(selectors)}{{{body}}}")
+    return "".join(kept)
+
+
+def minify(css):
+    """Comments and redundant whitespace removed; values are left alone."""
+    css = _COMMENT.sub("", css)
+    css = re.sub(r"\s+", " ", css)
+    return re.sub(r"\s*([{};>])\s*", r"\1", css).replace(";}", "}").strip()
+
+
+def icon_styles(css, words):
+    """(CSS, code points) for the icons named in `words`, from bootstrap-icons.min.css."""
+    shared, icons, codepoints = [], [], []
+    for prelude, body in rules(css):
+        match = _ICON_RULE.fullmatch(f"{prelude}{{{body}}}")
+        if match:
+            name, codepoint = match.groups()
+            if f"bi-{name}" in words:
+                icons.append(match.group(0))
+                codepoints.append(int(codepoint, 16))
+        elif prelude == "@font-face":
+            shared.append(f'@font-face{{font-display:block;font-family:bootstrap-icons;'
+                          f'src:url("../{ICONS_OUTPUT}") format("woff2")}}')
+        else:
+            shared.append(f"{prelude}{{{body}}}")
+    return "".join(shared + icons), codepoints
+
+
+def subset_font(source, unicodes, axes=None):
+    """
+    WOFF2 bytes of `source` with only the given code points (a list, or a
+    range string like LATIN) and, for a variable font, axis ranges.
+    """
+    # build-time only dependency, see requirements-dev.txt
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+    from fontTools.varLib import instancer
+
+    if isinstance(unicodes, str):
+        unicodes = subset.parse_unicodes(unicodes)
+    logging.getLogger("fontTools").setLevel(logging.ERROR)  # noisy about harmless quirks of the sources
+    font = TTFont(source, recalcTimestamp=False, lazy=False)
+    options = subset.Options()
+    options.layout_features = ["*"]
+    options.name_IDs = ["*"]  # keep the copyright and licence names
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=unicodes)
+    subsetter.subset(font)
+    if axes:
+        font = instancer.instantiateVariableFont(font, axes)
+    buffer = io.BytesIO()
+    font.flavor = "woff2"
+    font.save(buffer)
+    return buffer.getvalue()
+
+
+def build():
+    """{output path relative to static/: bytes} for everything the site links to."""
+    words, prefixes = markup_words()
+    bootstrap = purge(_SOURCE_MAP.sub("", BOOTSTRAP_CSS.read_text(encoding="utf-8")), words, prefixes)
+    icons, codepoints = icon_styles(ICONS_CSS.read_text(encoding="utf-8"), words)
+    site = [minify((STATIC / name).read_text(encoding="utf-8")) for name in SITE_CSS]
+    bundle = "\n".join([bootstrap, icons, FONT_FACES, *site]) + "\n"
+
+    return {
+        BUNDLE: bundle.encode(),
+        ICONS_OUTPUT: subset_font(ICONS_FONT, codepoints),
+        INTER_OUTPUT: subset_font(INTER_FONT, LATIN, axes={"wght": INTER_WEIGHTS, "slnt": 0}),
+        JS_OUTPUT: _SOURCE_MAP.sub("", BOOTSTRAP_JS.read_text(encoding="utf-8")).encode() + b"\n",
+    }
+
+
+def compressed_sizes(data):
+    """(raw, gzip, brotli or None) byte counts, as WhiteNoise would serve them."""
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+    return len(data), len(gzip.compress(data, 9)), len(brotli.compress(data)) if brotli else None
+
+
+def cdn_inputs():
+    """The files the site used to load from CDNs (fonts excepted) plus its own CSS."""
+    return {
+        "bootstrap.min.css": BOOTSTRAP_CSS.read_bytes(),
+        "bootstrap-icons.css": ICONS_CSS.read_bytes(),
+        "bootstrap-icons.woff2": ICONS_FONT.read_bytes(),
+        **{name: (STATIC / name).read_bytes() for name in ("css/site.css", "css/assistant.css")},
+    }
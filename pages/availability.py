@@ -0,0 +1,96 @@
+"""
+Per-date availability for the public booking pages.
+
+Counts of bookable slots per date are computed in the database with a single
+GROUP BY (no model instances are built) and cached per month under a version
+that pages/signals.py bumps whenever an AvailabilitySlot is saved or deleted,
+which covers slots being created, edited, booked (book_submit saves the slot
+as unavailable) and removed. Code that changes slots without model signals
+(QuerySet.update(), bulk_create()) must call invalidate_availability().
+
+Cached months hold counts for every date in the month; dates before today are
+dropped when reading, so a cached month never needs rebuilding at midnight.
+Today's count is always read live with AvailabilitySlot.objects.bookable(),
+so slots that have already started today stop counting straight away.
+"""
+import calendar
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+from .cache_versions import get_version, bump_version
+from .models import AvailabilitySlot
+
+VERSION_NAME = "availability"
+CACHE_TIMEOUT = 60 * 60 * 24
+MAX_MONTHS_AHEAD = 24  # furthest month the month API will compute
+
+
+def count_by_date(start, end=None):
+    """[(date, available slot count)] for start <= date (<= end), in date order."""
+    slots = AvailabilitySlot.objects.filter(is_available=True, date__gte=start)
+    if end is not None:
+        slots = slots.filter(date__lte=end)
+    rows = (slots
+            .values("date")
+            .annotate(count=Count("id"))
+            .order_by("date"))
+    return [(row["date"], row["count"]) for row in rows]
+
+
+def _today_count(today):
+    return AvailabilitySlot.objects.bookable().filter(date=today).count()
+
+
+def _month_counts(year, month):
+    key = f"availability:v{get_version(VERSION_NAME)}:{year:04d}-{month:02d}"
+    counts = cache.get(key)
+    if counts is None:
+        last_day = calendar.monthrange(year, month)[1]
+        counts = [(day.isoformat(), count)
+                  for day, count in count_by_date(date(year, month, 1), date(year, month, last_day))]
+        cache.set(key, counts, CACHE_TIMEOUT)
+    return [(date.fromisoformat(day), count) for day, count in counts]
+
+
+def month_availability(year, month, today=None):
+    """[(date, count)] of bookable dates in the month, from today onwards."""
+    today = today or timezone.localdate()
+    days = [(day, count) for day, count in _month_counts(year, month) if day > today]
+    if (today.year, today.month) == (year, month):
+        count = _today_count(today)
+        if count:
+            days.insert(0, (today, count))
+    return days
+
+
+def upcoming_dates(today=None):
+    """[(date, count)] for every date from today that has a bookable slot."""
+    today = today or timezone.localdate()
+    key = f"availability:v{get_version(VERSION_NAME)}:upcoming:{today.isoformat()}"
+    counts = cache.get(key)
+    if counts is None:
+        counts = [(day.isoformat(), count) for day, count in count_by_date(today + timedelta(days=1))]
+        cache.set(key, counts, CACHE_TIMEOUT)
+    days = [(date.fromisoformat(day), count) for day, count in counts]
+    count = _today_count(today)
+    if count:
+        days.insert(0, (today, count))
+    return days
+
+
+def month_offset(year, month, today=None):
+    """Months between today's month and (year, month); negative for past months."""
+    today = today or timezone.localdate()
+    return (year - today.year) * 12 + (month - today.month)
+
+
+def add_months(year, month, delta):
+    index = year * 12 + (month - 1) + delta
+    return index // 12, index % 12 + 1
+
+
+def invalidate_availability():
+    bump_version(VERSION_NAME)
@@ -0,0 +1,36 @@
+"""
+Atomic reservation of availability slots.
+
+A slot is claimed with a single conditional UPDATE (`... SET is_available =
+0 WHERE id = ? AND is_available AND starts_at > now`), and the booking row is
+inserted in the same transaction. The database serialises concurrent UPDATEs on the row, so
+however many submissions race for one slot exactly one of them sees a row
+count of 1; every other one gets SlotTaken and nothing is written for it.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .availability import invalidate_availability
+from .models import AvailabilitySlot
+
+
+class SlotTaken(Exception):
+    """The slot was booked, withdrawn or started before this submission claimed it."""
+
+
+def reserve_slot(slot_id, booking):
+    """
+    Claim slot `slot_id` and save the unsaved BookingSubmission `booking` for
+    it, atomically. Raises SlotTaken if the slot is no longer available.
+    """
+    with transaction.atomic():
+        claimed = AvailabilitySlot.objects.bookable().filter(pk=slot_id).update(
+            is_available=False, updated_at=timezone.now(),
+        )
+        if not claimed:
+            raise SlotTaken(slot_id)
+        booking.slot_id = slot_id
+        booking.save()
+        # update() sends no post_save, so refresh the booking calendar here
+        transaction.on_commit(invalidate_availability)
+    return booking
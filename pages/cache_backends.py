@@ -0,0 +1,269 @@
+"""
+SQLite-backed Django cache shared by every worker process on a node.
+
+LocMemCache keeps a separate cache per gunicorn worker, which splits rate
+limits and page-cache hit rates across processes. This backend stores entries
+in a single SQLite file in WAL mode, so readers never block the writer and all
+workers see the same data without running a cache server.
+
+Usage in settings:
+
+    CACHES = {
+        "default": {
+            "BACKEND": "pages.cache_backends.SQLiteCache",
+            "LOCATION": "/path/to/cache.sqlite3",
+            "OPTIONS": {"MAX_ENTRIES": 5000},
+        }
+    }
+
+Integers are stored as native SQLite integers and incr()/decr() run inside a
+BEGIN IMMEDIATE transaction, so counters are atomic across processes;
+everything else is pickled. Entries past MAX_ENTRIES are culled
+expired-first, then least recently used.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key      TEXT PRIMARY KEY,
+    value    BLOB,
+    expires  REAL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_entries_expires ON cache_entries (expires);
+CREATE INDEX IF NOT EXISTS cache_entries_accessed ON cache_entries (accessed);
+"""
+
+# Reads only refresh the LRU timestamp when it is older than this many seconds,
+# so a hot key does not turn every get() into a write.
+ACCESS_RESOLUTION = 30
+
+INT64_MIN, INT64_MAX = -(2 ** 63), 2 ** 63 - 1
+
+
+def _encode(value):
+    if type(value) is int and INT64_MIN <= value <= INT64_MAX:
+        return value
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def _decode(raw):
+    if isinstance(raw, int):
+        return raw
+    return pickle.loads(raw)
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._path = str(location)
+        self._busy_timeout = int(options.get("BUSY_TIMEOUT", 5000))
+        self._cull_every = max(1, int(options.get("CULL_CHECK_EVERY", 50)))
+        self._local = threading.local()
+        self._writes = 0
+        self._schema_ready = False
+
+    # -- connection handling --------------------------------------------
+
+    def _conn(self):
+        """Per-thread connection, reopened after fork so workers never share one."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self._path, timeout=self._busy_timeout / 1000,
+                               isolation_level=None, check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout = {self._busy_timeout}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        if not self._schema_ready:
+            conn.executescript(SCHEMA)
+            self._schema_ready = True
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _write(self, sql, params=()):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.execute(sql, params)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount
+
+    # -- Django cache API ----------------------------------------------
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._conn().execute(
+            "SELECT value, expires, accessed FROM cache_entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return default
+        raw, expires, accessed = row
+        now = time.time()
+        if expires is not None and expires <= now:
+            self._write("DELETE FROM cache_entries WHERE key = ? AND expires <= ?", (key, now))
+            return default
+        if now - accessed > ACCESS_RESOLUTION:
+            self._write("UPDATE cache_entries SET accessed = ? WHERE key = ?", (now, key))
+        return _decode(raw)
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(k, version=version): k for k in keys}
+        if not key_map:
+            return {}
+        now = time.time()
+        placeholders = ",".join("?" * len(key_map))
+        rows = self._conn().execute(
+            f"SELECT key, value FROM cache_entries WHERE key IN ({placeholders}) "
+            "AND (expires IS NULL OR expires > ?)",
+            (*key_map, now),
+        ).fetchall()
+        return {key_map[key]: _decode(raw) for key, raw in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        expires = self.get_backend_timeout(timeout)
+        self._write(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+            (key, _encode(value), expires, time.time()),
+        )
+        self._maybe_cull()
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        rows = [
+            (self.make_and_validate_key(k, version=version), _encode(v), expires, now)
+            for k, v in data.items()
+        ]
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache_entries (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._maybe_cull()
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        # Insert, or take over the row only if the existing entry has expired
+        added = self._write(
+            "INSERT INTO cache_entries (key, value, expires, accessed) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires, "
+            "accessed = excluded.accessed WHERE cache_entries.expires IS NOT NULL "
+            "AND cache_entries.expires <= ?",
+            (key, _encode(value), expires, now, now),
+        )
+        if added:
+            self._maybe_cull()
+        return bool(added)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        return bool(self._write(
+            "UPDATE cache_entries SET expires = ?, accessed = ? "
+            "WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (self.get_backend_timeout(timeout), now, key, now),
+        ))
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value FROM cache_entries WHERE key = ? AND (expires IS NULL OR expires > ?)",
+                (key, now),
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            if not isinstance(row[0], int):
+                raise ValueError("Key '%s' does not hold an integer" % key)
+            new_value = row[0] + delta
+            conn.execute(
+                "UPDATE cache_entries SET value = ?, accessed = ? WHERE key = ?",
+                (_encode(new_value), now, key),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return new_value
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._conn().execute(
+            "SELECT 1 FROM cache_entries WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return bool(self._write("DELETE FROM cache_entries WHERE key = ?", (key,)))
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(k, version=version) for k in keys]
+        if keys:
+            placeholders = ",".join("?" * len(keys))
+            self._write(f"DELETE FROM cache_entries WHERE key IN ({placeholders})", keys)
+
+    def clear(self):
+        self._write("DELETE FROM cache_entries")
+
+    # -- eviction ---------------------------------------------------------
+
+    def _maybe_cull(self):
+        # Counting rows on every write would dominate set() cost, so only check
+        # every CULL_CHECK_EVERY writes from this process.
+        self._writes += 1
+        if self._writes % self._cull_every:
+            return
+        self._cull()
+
+    def _cull(self):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM cache_entries WHERE expires IS NOT NULL AND expires <= ?", (now,))
+            count = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+            if count > self._max_entries:
+                if self._cull_frequency == 0:
+                    conn.execute("DELETE FROM cache_entries")
+                else:
+                    excess = count - self._max_entries
+                    to_remove = max(excess, count // self._cull_frequency)
+                    conn.execute(
+                        "DELETE FROM cache_entries WHERE key IN "
+                        "(SELECT key FROM cache_entries ORDER BY accessed LIMIT ?)",
+                        (to_remove,),
+                    )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
@@ -0,0 +1,29 @@
+"""
+Named version counters for derived caches.
+
+Instead of deleting cached entries when content changes, callers include the
+current version in their cache keys and bump it on change; old entries are
+never read again and age out on their own. Counters live in the shared cache
+so a bump in one worker is seen by all of them.
+"""
+from django.core.cache import cache
+
+KEY_PREFIX = "cache_version:"
+
+
+def get_version(name):
+    key = KEY_PREFIX + name
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, None)
+        version = cache.get(key, 1)
+    return version
+
+
+def bump_version(name):
+    key = KEY_PREFIX + name
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 2, None)
+        return cache.get(key, 2)
@@ -0,0 +1,240 @@
+"""
+Calendly webhook inbox.
+
+The webhook view only verifies the signature and stores the raw body with
+receive(), a single INSERT that is ignored when a row with the same body hash
+already exists, so Calendly's retries of a delivery are stored once and the
+view can answer 204 straight away. The process_calendly command applies
+stored deliveries to Booking in batches:
+
+- a batch is claimed with one UPDATE guarded by the due conditions, like the
+  email outbox (pages/outbox.py), so concurrent workers never apply the same
+  delivery twice and a crashed worker's batch is picked up again once the
+  lease expires;
+- all events in the batch for the same calendly_id are folded into one final
+  state and written with two bulk upserts, instead of an update_or_create per
+  event;
+- a cancellation is final: a late or replayed invitee.created never
+  reopens a canceled booking.
+
+If writing a batch fails, its deliveries are applied one at a time so one bad
+event does not hold back the others; a delivery that still fails is retried
+with the outbox's backoff and marked failed after CALENDLY_MAX_ATTEMPTS.
+Deliveries that cannot be parsed are marked failed at once. Failed ones are
+kept for inspection; replay() queues stored deliveries again (applying them
+is idempotent).
+"""
+import hashlib
+import hmac
+import json
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import metrics
+from .models import Booking, CalendlyDelivery
+from .outbox import retry_delay
+
+RECEIVED = metrics.register("calendly_deliveries_total", "Verified Calendly webhook deliveries received")
+APPLIED = metrics.register("calendly_events_applied_total", "Calendly deliveries applied to bookings")
+REJECTED = metrics.register("calendly_events_failed_total", "Calendly deliveries that could not be applied")
+
+CREATED = "invitee.created"
+CANCELED = "invitee.canceled"
+
+CLAIM_LEASE = timedelta(minutes=10)
+BATCH_SIZE = 500
+
+BOOKING_FIELDS = ["start_time", "end_time", "invitee_name", "invitee_email"]
+
+
+def _signature(body, signing_key):
+    return hmac.new(signing_key.encode(), msg=body, digestmod=hashlib.sha256).hexdigest()
+
+
+def sign(body, signing_key):
+    """A Calendly-Webhook-Signature header value for `body` (used by the load test)."""
+    return f"t={int(timezone.now().timestamp())},v1={_signature(body, signing_key)}"
+
+
+def verify_signature(body, header, signing_key):
+    """True if `header` carries a valid v1 signature of `body`."""
+    try:
+        parts = dict(p.split("=", 1) for p in header.split(","))
+    except ValueError:
+        return False
+    return hmac.compare_digest(parts.get("v1", ""), _signature(body, signing_key))
+
+
+def receive(body):
+    """Store a verified delivery unless an identical one is already stored."""
+    CalendlyDelivery.objects.bulk_create(
+        [CalendlyDelivery(digest=hashlib.sha256(body).hexdigest(),
+                          body=body.decode("utf-8", errors="replace"))],
+        ignore_conflicts=True,
+    )
+    metrics.incr(RECEIVED)
+
+
+def parse(body):
+    """(event, calendly_id, booking fields) from a delivery body; raises ValueError."""
+    payload = json.loads(body)
+    if not isinstance(payload, dict):
+        raise ValueError("payload is not a JSON object")
+    trigger = str(payload.get("event") or "")
+    data = payload.get("payload") or {}
+
+    # Common fields (v2 webhooks)
+    event = data.get("event") or {}          # start_time, end_time, status
+    invitee = data.get("invitee") or {}      # name, email
+    uid = invitee.get("uuid") or data.get("uuid") or event.get("uuid") or "unknown"
+    fields = {
+        "start_time": parse_datetime(event.get("start_time") or ""),
+        "end_time": parse_datetime(event.get("end_time") or ""),
+        "invitee_name": (invitee.get("name") or "")[:120],
+        "invitee_email": (invitee.get("email") or "")[:254],
+    }
+    return trigger, str(uid)[:120], fields
+
+
+def claim_batch(size, now=None):
+    """Claim up to `size` due deliveries for this worker; returns them oldest first."""
+    now = now or timezone.now()
+    token = uuid.uuid4().hex
+    due = (CalendlyDelivery.objects
+           .filter(status=CalendlyDelivery.PENDING, next_attempt_at__lte=now)
+           .order_by("next_attempt_at")
+           .values("pk")[:size])
+    _claim(due, token, now)
+    return list(CalendlyDelivery.objects.filter(claim=token).order_by("received_at", "pk"))
+
+
+def _claim(ids, token, now):
+    """Stamp `token` on those of `ids` that are still due; returns how many."""
+    # due conditions repeated on the UPDATE, as in outbox._claim
+    return (CalendlyDelivery.objects
+            .filter(pk__in=ids, status=CalendlyDelivery.PENDING, next_attempt_at__lte=now)
+            .update(claim=token, next_attempt_at=now + CLAIM_LEASE))
+
+
+def coalesce(events):
+    """
+    Fold (event, calendly_id, fields) tuples, oldest first, into
+    {calendly_id: final Booking values}. Only events this site handles count.
+    """
+    state = {}
+    for trigger, uid, fields in events:
+        if trigger == CREATED:
+            booking = state.setdefault(uid, {})
+            booking.update(fields)
+            booking.setdefault("status", "created")
+        elif trigger == CANCELED:
+            state.setdefault(uid, {})["status"] = "canceled"
+    return state
+
+
+def apply(state):
+    """Write coalesced booking states with one upsert per shape; returns the count."""
+    if not state:
+        return 0
+    already_canceled = set(Booking.objects
+                           .filter(calendly_id__in=list(state), status="canceled")
+                           .values_list("calendly_id", flat=True))
+    full, status_only = [], []
+    for uid, values in state.items():
+        if uid in already_canceled:
+            values["status"] = "canceled"
+        booking = Booking(calendly_id=uid, **values)
+        (full if "invitee_email" in values else status_only).append(booking)
+
+    if full:
+        Booking.objects.bulk_create(full, update_conflicts=True, unique_fields=["calendly_id"],
+                                    update_fields=["status", *BOOKING_FIELDS], batch_size=BATCH_SIZE)
+    if status_only:
+        Booking.objects.bulk_create(status_only, update_conflicts=True, unique_fields=["calendly_id"],
+                                    update_fields=["status"], batch_size=BATCH_SIZE)
+    return len(state)
+
+
+def process_batch(size=None):
+    """Apply one batch of due deliveries; returns (applied, failed)."""
+    deliveries = claim_batch(size or BATCH_SIZE)
+    if not deliveries:
+        return 0, 0
+
+    now = timezone.now()
+    parsed, failed = [], 0
+    for delivery in deliveries:
+        delivery.claim = ""
+        delivery.processed_at = now
+        try:
+            trigger, uid, fields = parse(delivery.body)
+        except (ValueError, AttributeError, TypeError) as exc:
+            delivery.status = CalendlyDelivery.FAILED
+            delivery.last_error = _error(exc)
+            failed += 1
+            continue
+        delivery.status = CalendlyDelivery.DONE
+        delivery.event, delivery.calendly_id = trigger[:60], uid
+        delivery.last_error = ""
+        parsed.append((delivery, (trigger, uid, fields)))
+
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                apply(coalesce([event for _delivery, event in parsed]))
+        except Exception:
+            # Find the bad event(s): apply each delivery on its own, in order
+            for delivery, event in parsed:
+                try:
+                    with transaction.atomic():
+                        apply(coalesce([event]))
+                except Exception as exc:
+                    _failed(delivery, exc, now)
+        CalendlyDelivery.objects.bulk_update(
+            deliveries, ["status", "event", "calendly_id", "claim", "attempts", "last_error", "next_attempt_at",
+                         "processed_at"],
+            batch_size=BATCH_SIZE,
+        )
+    applied = sum(1 for delivery, _event in parsed if delivery.status == CalendlyDelivery.DONE)
+    failed += len(parsed) - applied
+    metrics.incr(APPLIED, applied)
+    if failed:
+        metrics.incr(REJECTED, failed)
+    return applied, failed
+
+
+def _error(exc):
+    return f"{type(exc).__name__}: {exc}"[:2000]
+
+
+def _failed(delivery, error, now):
+    """Record a failed attempt to apply `delivery`: retry later, or give up."""
+    delivery.attempts += 1
+    delivery.last_error = _error(error)
+    if delivery.attempts >= settings.CALENDLY_MAX_ATTEMPTS:
+        delivery.status = CalendlyDelivery.FAILED
+    else:
+        delivery.status = CalendlyDelivery.PENDING
+        delivery.next_attempt_at = now + retry_delay(delivery.attempts)
+
+
+def drain(size=None):
+    """Process batches until nothing is due; returns (applied, failed)."""
+    total_applied = total_failed = 0
+    while True:
+        applied, failed = process_batch(size)
+        if not applied and not failed:
+            return total_applied, total_failed
+        total_applied += applied
+        total_failed += failed
+
+
+def replay(queryset):
+    """Queue the given deliveries to be applied again; returns how many."""
+    return queryset.update(status=CalendlyDelivery.PENDING, next_attempt_at=timezone.now(),
+                           claim="", attempts=0, last_error="")
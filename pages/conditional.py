@@ -0,0 +1,81 @@
+"""
+HTTP validators (ETag / Last-Modified) for public CMS pages.
+
+Each page declares a function returning the newest `updated_at` among the rows
+it renders, computed with one query (see latest_update). `conditional_page`
+wraps the view in Django's `condition()`, so a revisit carrying If-None-Match
+or If-Modified-Since is answered 304 Not Modified before the page cache, the
+view or the template engine run.
+
+Last-Modified is that timestamp. The ETag also hashes in the page-cache
+content version, which is bumped by deletions and by edits to models without
+timestamps (practice areas), and SITE_RELEASE, so a deploy with new markup or
+fingerprinted static file names is never answered with a 304 for the old
+page. Browsers send If-None-Match whenever they have an ETag, and it takes
+precedence over If-Modified-Since.
+
+Like the page cache, this only applies to anonymous GETs: visitors with a
+session may see the owner link or flash messages.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from . import metrics
+from .page_cache import _is_cacheable_request, get_content_version
+
+NOT_MODIFIED = metrics.register("conditional_not_modified_total",
+                                "Public page requests answered 304 Not Modified")
+
+
+def latest_update(*querysets):
+    """The newest `updated_at` among the rows of `querysets`, in one query; None if they are all empty."""
+    columns = [queryset.order_by().values_list("updated_at", flat=True) for queryset in querysets]
+    first, *rest = columns
+    if rest:
+        first = first.union(*rest, all=True)
+    return first.order_by("-updated_at").first()
+
+
+def conditional_page(updated=None):
+    """
+    Give an anonymous GET of a public page an ETag and Last-Modified, and
+    answer matching revisits with 304.
+
+    `updated(request, *args, **kwargs)` returns the newest timestamp the page
+    renders, or None when there is nothing to render (the view then runs and
+    404s without validators). Pages with no timestamped content omit it and
+    get an ETag only.
+    """
+    def decorator(view_func):
+        def last_modified(request, *args, **kwargs):
+            # condition() calls both functions; run the query once per request
+            if not hasattr(request, "_content_updated"):
+                request._content_updated = updated(request, *args, **kwargs) if updated else None
+            return request._content_updated
+
+        def etag(request, *args, **kwargs):
+            modified = last_modified(request, *args, **kwargs)
+            if updated and modified is None:
+                return None
+            key = f"{settings.SITE_RELEASE}:{get_content_version()}:{modified.isoformat() if modified else ''}"
+            return hashlib.sha256(key.encode()).hexdigest()[:24]
+
+        conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not _is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+            response = conditional_view(request, *args, **kwargs)
+            if response.status_code == 304:
+                metrics.incr(NOT_MODIFIED)
+            if response.has_header("ETag"):
+                # stored, but checked with the server before each reuse
+                patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return decorator
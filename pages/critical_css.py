@@ -0,0 +1,191 @@
+"""
+Above-the-fold ("critical") CSS for the main public pages.
+
+`manage.py build_critical_css` renders each page in PAGES and collects the
+elements a visitor sees before scrolling: the top bar and navbar, the first
+FOLD_BLOCKS top-level blocks of <main>, and fixed-position elements such as
+the assistant launcher. The rules of css/bundle.css that can match those
+elements are written to assets/critical/<page>.css. The {% critical_css %}
+tag (templatetags/critical_css.py) inlines that file in the page's <head> and
+loads the full bundle without blocking rendering.
+
+Matching is static, not a browser layout. A selector is kept when its last
+compound selector matches a fold element and each compound to its left
+matches one of that element's ancestors. Combinator types, attribute
+selectors and pseudo-classes are ignored, so the matching errs towards
+keeping a rule. An extra rule only costs bytes; a missing one would show as
+a restyle when the bundle arrives.
+"""
+import re
+from html.parser import HTMLParser
+
+from django.conf import settings
+
+from . import assets
+
+CRITICAL_DIR = settings.BASE_DIR / "assets" / "critical"
+
+# page name -> (URL name, model whose first published object is rendered)
+PAGES = {
+    "home": ("home", None),
+    "blog_list": ("blog_list", None),
+    "blog_detail": ("blog_detail", "BlogPost"),
+    "case_list": ("case_list", None),
+    "case_detail": ("case_detail", "CaseStudy"),
+    "practice_areas": ("practice_areas", None),
+    "booking": ("book_index", None),
+}
+
+FOLD_BLOCKS = 2
+# visible on load wherever they are in the document
+FIXED_IDS = ("assistant-btn",)
+
+VOID_TAGS = frozenset("area base br col embed hr img input link meta param source track wbr".split())
+
+_PSEUDO = re.compile(r"::?[\w-]+(?:\((?:[^()]|\([^()]*\))*\))?")
+_ATTRIBUTE = re.compile(r"\[[^\]]*\]")
+_COMBINATOR = re.compile(r"\s*[>+~]\s*|\s+")
+_COMPOUND = re.compile(r"^(\*|[A-Za-z][\w-]*)?((?:[#.](?:\\.|[\w-])+)*)$")
+_PART = re.compile(r"([#.])((?:\\.|[\w-])+)")
+
+
+class Element:
+    __slots__ = ("tag", "id", "classes", "parent", "children")
+
+    def __init__(self, tag, attrs, parent):
+        attrs = dict(attrs)
+        self.tag = tag
+        self.id = attrs.get("id") or ""
+        self.classes = frozenset((attrs.get("class") or "").split())
+        self.parent = parent
+        self.children = []
+
+    def descendants(self):
+        for child in self.children:
+            yield child
+            yield from child.descendants()
+
+    def ancestors(self):
+        node = self.parent
+        while node is not None:
+            yield node
+            node = node.parent
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Element("#document", [], None)
+        self.current = self.root
+
+    def handle_starttag(self, tag, attrs):
+        element = Element(tag, attrs, self.current)
+        self.current.children.append(element)
+        if tag not in VOID_TAGS:
+            self.current = element
+
+    def handle_startendtag(self, tag, attrs):
+        self.current.children.append(Element(tag, attrs, self.current))
+
+    def handle_endtag(self, tag):
+        # tolerate unclosed elements: close back to the matching start tag
+        for node in [self.current, *self.current.ancestors()]:
+            if node.tag == tag:
+                self.current = node.parent or self.root
+                return
+
+
+def parse(html):
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+
+def fold_elements(html):
+    """The elements of a rendered page that are on screen before scrolling, with their ancestors."""
+    root = parse(html)
+    everything = list(root.descendants())
+    main = next((e for e in everything if e.tag == "main"), None)
+    if main is None:
+        return everything
+
+    blocks = [e for e in main.parent.children if e is not main and _precedes(e, main, everything)]
+    blocks += main.children[:FOLD_BLOCKS]
+    blocks += [e for e in everything if e.id in FIXED_IDS]
+
+    fold = set()
+    for block in blocks:
+        fold.add(block)
+        fold.update(block.descendants())
+        fold.update(block.ancestors())
+    fold.discard(root)
+    return fold
+
+
+def _precedes(a, b, order):
+    return order.index(a) < order.index(b)
+
+
+def compounds(selector):
+    """[(tag, id, classes)] left to right, or None if the selector can't be read."""
+    bare = _ATTRIBUTE.sub("", _PSEUDO.sub("", selector)).strip()
+    if not bare:
+        return []
+    parsed = []
+    for part in _COMBINATOR.split(bare):
+        if not part:
+            continue
+        match = _COMPOUND.match(part)
+        if not match:
+            return None
+        tag, rest = match.groups()
+        ids = [name for kind, name in _PART.findall(rest) if kind == "#"]
+        classes = frozenset(name.replace("\\", "") for kind, name in _PART.findall(rest) if kind == ".")
+        parsed.append((None if tag in (None, "*") else tag.lower(), ids[0] if ids else None, classes))
+    return parsed
+
+
+def _matches(element, compound):
+    tag, id_, classes = compound
+    return ((tag is None or element.tag == tag) and (id_ is None or element.id == id_)
+            and classes <= element.classes)
+
+
+def selector_matches(selector, elements):
+    parsed = compounds(selector)
+    if parsed is None:
+        return True  # unusual syntax: keep the rule
+    if not parsed:
+        return True  # only pseudo-classes or attributes, e.g. :root or [hidden]
+    *ancestors, key = parsed
+    for element in elements:
+        if not _matches(element, key):
+            continue
+        chain = element.ancestors()
+        if all(any(_matches(node, compound) for node in chain) for compound in reversed(ancestors)):
+            return True
+    return False
+
+
+def critical(css, elements):
+    """The rules of `css` that can apply to `elements`."""
+    kept = []
+    for prelude, body in assets.rules(css):
+        if body is None or prelude.startswith("@keyframes"):
+            continue  # @charset isn't valid in <style>; animations can wait for the bundle
+        if prelude.startswith(("@media", "@supports", "@container", "@layer")):
+            inner = critical(body, elements)
+            if inner:
+                kept.append(f"{prelude}{{{inner}}}")
+        elif prelude.startswith("@"):
+            kept.append(f"{prelude}{{{body}}}")  # @font-face
+        else:
+            selectors = [s for s in assets.split_selectors(prelude) if selector_matches(s, elements)]
+            if selectors:
+                kept.append(f"{','.join(selectors)}{{{body}}}")
+    return "".join(kept)
+
+
+def path(page):
+    return CRITICAL_DIR / f"{page}.css"
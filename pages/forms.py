@@ -1,5 +1,9 @@
+import re
+from datetime import date
+
 from django import forms
 from .models import Lead, HomepageSettings, SitePage, PracticeArea, BlogPost, CaseStudy, AvailabilitySlot, BookingSubmission
+from .recurrence import Rule
 
 class ContactForm(forms.ModelForm):
     consent = forms.BooleanField(
@@ -190,3 +194,91 @@ class BookingSubmissionForm(forms.ModelForm):
             "phone": "Optional. Provide if you'd like to be contacted by phone.",
             "description": "Provide a brief overview of your legal matter (2-3 sentences).",
         }
+
+class RecurringAvailabilityForm(forms.Form):
+    """Rule for generating many availability slots at once (see pages/recurrence.py)."""
+    WEEKDAY_CHOICES = [
+        ("0", "Mon"), ("1", "Tue"), ("2", "Wed"), ("3", "Thu"), ("4", "Fri"), ("5", "Sat"), ("6", "Sun"),
+    ]
+
+    start_date = forms.DateField(
+        label="From",
+        widget=forms.DateInput(attrs={"class": "form-control", "type": "date"}),
+    )
+    end_date = forms.DateField(
+        label="Until",
+        widget=forms.DateInput(attrs={"class": "form-control", "type": "date"}),
+        help_text="Inclusive.",
+    )
+    weekdays = forms.MultipleChoiceField(
+        label="Days of the week",
+        choices=WEEKDAY_CHOICES,
+        initial=["0", "1", "2", "3", "4"],
+        widget=forms.CheckboxSelectMultiple(attrs={"class": "form-check-input"}),
+    )
+    start_time = forms.TimeField(
+        label="Daily start",
+        widget=forms.TimeInput(attrs={"class": "form-control", "type": "time"}),
+    )
+    end_time = forms.TimeField(
+        label="Daily end",
+        widget=forms.TimeInput(attrs={"class": "form-control", "type": "time"}),
+    )
+    block_minutes = forms.IntegerField(
+        label="Slot length (minutes)",
+        initial=30,
+        min_value=5,
+        max_value=480,
+        widget=forms.NumberInput(attrs={"class": "form-control"}),
+    )
+    slot_type = forms.ChoiceField(
+        label="Consultation Type",
+        choices=AvailabilitySlot.SLOT_TYPE_CHOICES,
+        initial="initial",
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    skip_dates = forms.CharField(
+        label="Skip dates",
+        required=False,
+        widget=forms.Textarea(attrs={"class": "form-control", "rows": 2, "placeholder": "2025-12-25, 2025-12-26"}),
+        help_text="Optional. Dates to leave out (YYYY-MM-DD), separated by commas or new lines.",
+    )
+    notes = forms.CharField(
+        label="Internal Notes",
+        required=False,
+        widget=forms.Textarea(attrs={"class": "form-control", "rows": 2, "placeholder": "Optional internal notes"}),
+    )
+
+    def clean_weekdays(self):
+        return [int(day) for day in self.cleaned_data["weekdays"]]
+
+    def clean_skip_dates(self):
+        dates = []
+        for value in re.split(r"[\s,]+", self.cleaned_data["skip_dates"].strip()):
+            if not value:
+                continue
+            try:
+                dates.append(date.fromisoformat(value))
+            except ValueError:
+                raise forms.ValidationError(f"'{value}' is not a date in YYYY-MM-DD format.")
+        return dates
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date, end_date = cleaned_data.get("start_date"), cleaned_data.get("end_date")
+        start_time, end_time = cleaned_data.get("start_time"), cleaned_data.get("end_time")
+
+        if start_date and end_date:
+            if end_date < start_date:
+                raise forms.ValidationError("The end date must be on or after the start date.")
+            if (end_date - start_date).days > 366:
+                raise forms.ValidationError("Generate at most one year of slots at a time.")
+        if start_time and end_time and end_time <= start_time:
+            raise forms.ValidationError("Daily end time must be after the start time.")
+
+        return cleaned_data
+
+    def rule(self):
+        data = self.cleaned_data
+        return Rule(data["start_date"], data["end_date"], data["weekdays"], data["start_time"],
+                    data["end_time"], data["block_minutes"], data["skip_dates"])
@@ -0,0 +1,213 @@
+"""
+Responsive variants of hero images.
+
+When a BlogPost, CaseStudy or SitePage is saved with a new hero_image, the
+post_save receiver in signals.py calls process(), which:
+
+- reads the original's pixel size into hero_width / hero_height, so templates
+  can give the <img> its intrinsic size and the page doesn't shift as it loads;
+- resizes it to each of WIDTHS narrower than the original (plus the original
+  width, capped at the largest bucket) and encodes every size as AVIF (when
+  this Pillow build can), WebP and the original's format (JPEG, or PNG for
+  images with transparency) as a fallback;
+- records the variant files in hero_variants, which the {% responsive_image %}
+  tag in pages/templatetags/responsive_images.py turns into a <picture> with
+  srcset / sizes.
+
+Uploads live in the default (media) storage. Older posts name a file under
+static/img/ instead (the templates used to link /static/img/<hero_image>);
+their variants are written next to them under static/img/variants/ so they
+are deployed and served like the originals. build_image_variants processes
+every existing image.
+
+Variants are only regenerated when hero_image changes, so saving a post's
+text doesn't re-encode its image.
+"""
+import io
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from . import metrics
+
+GENERATED = metrics.register("image_variants_generated_total", "Responsive image variants written")
+FAILED = metrics.register("image_variants_failed_total", "Hero images that could not be processed")
+
+WIDTHS = (480, 800, 1200, 1600)
+VARIANT_DIR = "variants"
+
+MEDIA, STATIC = "media", "static"
+
+# (MIME type, Pillow format, extension, save options), best compression first
+MODERN_FORMATS = [
+    ("image/avif", "AVIF", "avif", {"quality": 55, "speed": 8}),
+    ("image/webp", "WEBP", "webp", {"quality": 75, "method": 4}),
+]
+JPEG = ("image/jpeg", "JPEG", "jpg", {"quality": 82, "optimize": True, "progressive": True})
+PNG = ("image/png", "PNG", "png", {"optimize": True})
+
+
+def static_storage():
+    """Storage for images that live under static/img/ (older content)."""
+    return FileSystemStorage(location=settings.STATICFILES_DIRS[0] / "img",
+                             base_url="/" + settings.STATIC_URL.strip("/") + "/img/")
+
+
+def storage_for(origin):
+    return default_storage if origin == MEDIA else static_storage()
+
+
+def locate(name):
+    """(origin, storage) holding the file `name`, or (None, None) if neither has it."""
+    if not name:
+        return None, None
+    if default_storage.exists(name):
+        return MEDIA, default_storage
+    storage = static_storage()
+    if storage.exists(name):
+        return STATIC, storage
+    return None, None
+
+
+def origin_of(instance):
+    """
+    MEDIA or STATIC for an object's hero_image, decided from the stored fields
+    so rendering a page never asks the storage what exists.
+    """
+    name = instance.hero_image.name
+    variants = instance.hero_variants or {}
+    if variants.get("src") == name and variants.get("origin"):
+        return variants["origin"]
+    # not processed yet, or the file was missing: uploads are named under the
+    # field's upload_to, older content names a file in static/img/
+    return MEDIA if name.startswith(instance.hero_image.field.upload_to) else STATIC
+
+
+def source_url(instance):
+    """URL of an object's original hero image."""
+    return storage_for(origin_of(instance)).url(instance.hero_image.name)
+
+
+def formats():
+    """The formats this Pillow build can write, modern ones first."""
+    Image.init()
+    return [fmt for fmt in MODERN_FORMATS if fmt[1] in Image.SAVE]
+
+
+def widths_for(width):
+    """Variant widths for an original `width` pixels wide."""
+    largest = min(width, WIDTHS[-1])
+    return [w for w in WIDTHS if w < largest] + [largest]
+
+
+def variant_name(name, width, extension):
+    stem = posixpath.splitext(name)[0]
+    return f"{VARIANT_DIR}/{stem}-{width}w.{extension}"
+
+
+def has_alpha(image):
+    return image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+
+
+def _encode(image, fmt):
+    _mime, pillow_format, _ext, options = fmt
+    buffer = io.BytesIO()
+    if pillow_format == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    image.save(buffer, pillow_format, **options)
+    return buffer.getvalue()
+
+
+def generate(name, origin=None):
+    """
+    Write the variants of image `name`; returns the hero_* field values
+    {"hero_width", "hero_height", "hero_variants"}, or None if the file is
+    missing or not an image.
+    """
+    if origin is None:
+        origin, storage = locate(name)
+        if origin is None:
+            return None
+    else:
+        storage = storage_for(origin)
+
+    try:
+        with storage.open(name, "rb") as handle:
+            image = Image.open(handle)
+            image.load()
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+        metrics.incr(FAILED)
+        return None
+
+    image = ImageOps.exif_transpose(image)  # phone photos are often stored sideways
+    if has_alpha(image):
+        image = image.convert("RGBA")
+        fallback = PNG
+    else:
+        image = image.convert("RGB")
+        fallback = JPEG
+    width, height = image.size
+
+    sources = {}
+    for fmt in formats() + [fallback]:
+        mime, _format, extension, _options = fmt
+        sources[mime] = []
+        for target in widths_for(width):
+            resized = image if target == width else image.resize(
+                (target, max(1, round(height * target / width))), Image.LANCZOS)
+            variant = variant_name(name, target, extension)
+            if storage.exists(variant):
+                storage.delete(variant)  # same name for a replaced upload; don't get a suffixed copy
+            saved = storage.save(variant, ContentFile(_encode(resized, fmt)))
+            sources[mime].append([target, saved])
+    metrics.incr(GENERATED, sum(len(files) for files in sources.values()))
+
+    return {
+        "hero_width": width,
+        "hero_height": height,
+        "hero_variants": {"src": name, "origin": origin, "fallback": fallback[0], "sources": sources},
+    }
+
+
+def delete_variants(variants):
+    """Remove the files listed in a hero_variants value."""
+    if not variants or "sources" not in variants:
+        return
+    storage = storage_for(variants.get("origin"))
+    for files in variants["sources"].values():
+        for _width, name in files:
+            storage.delete(name)
+
+
+def is_current(instance):
+    """Whether instance.hero_variants describes its current hero_image."""
+    return (instance.hero_variants or {}).get("src") == (instance.hero_image.name or None)
+
+
+def process(instance, force=False):
+    """
+    Bring an object's hero_width / hero_height / hero_variants in line with
+    its hero_image, replacing old variants; returns False if they already
+    were (unless `force`). Saves those three fields with an UPDATE, so no
+    save signals fire again.
+    """
+    if is_current(instance) and not force:
+        return False
+    old = instance.hero_variants
+    name = instance.hero_image.name
+    origin, _storage = locate(name)
+    values = generate(name, origin) if origin else None
+    if values is None:
+        # no image, or one that is missing or can't be read: templates fall
+        # back to the original, from the origin recorded here
+        values = {"hero_width": None, "hero_height": None,
+                  "hero_variants": {"src": name, "origin": origin} if name else {}}
+    if old and old.get("src") != name:
+        delete_variants(old)
+    type(instance)._default_manager.filter(pk=instance.pk).update(**values)
+    for field, value in values.items():
+        setattr(instance, field, value)
+    return True
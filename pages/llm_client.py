@@ -0,0 +1,409 @@
+"""
+HTTP client for the OpenAI-compatible chat completions API behind the assistant.
+
+- One pooled keep-alive requests.Session per process, so repeat calls skip the
+  TCP + TLS handshake.
+- Bounded retries with full-jitter exponential backoff for connection errors,
+  timeouts, 429 and 5xx responses, all within an overall deadline.
+- A circuit breaker that fails fast after repeated upstream failures instead of
+  tying up a worker for the full timeout on every message.
+- Latency and error counters reported through pages.metrics.
+
+Every call has an async twin (apost / achat / astream_chat) built on httpx,
+used by the async assistant views when the site runs under an ASGI worker.
+Both share the same circuit breaker and counters.
+
+The client takes its endpoint explicitly, so it can be pointed at a local stub
+(`python manage.py llm_stub_server`) in tests and load tests.
+"""
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import metrics
+
+REQUESTS = metrics.register("llm_requests_total", "Chat completion calls made to the LLM upstream")
+FAILURES = metrics.register("llm_failures_total", "Chat completion calls that failed after all retries")
+RETRIES = metrics.register("llm_retries_total", "Retry attempts against the LLM upstream")
+SHORT_CIRCUITS = metrics.register("llm_circuit_open_total", "Calls rejected because the circuit breaker was open")
+LATENCY_MS = metrics.register("llm_latency_ms_sum", "Total wall-clock milliseconds spent in successful LLM calls")
+SUCCESSES = metrics.register("llm_success_total", "Chat completion calls that returned a reply")
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """The upstream could not produce a completion."""
+
+
+class CircuitOpenError(LLMError):
+    """Raised without contacting the upstream while the breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open breaker.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    fail immediately for `reset_timeout` seconds. The first call after that is
+    let through as a probe; success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now):
+        if self._opened_at is None:
+            return "closed"
+        if now - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self._state(time.monotonic())
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class LLMClient:
+    def __init__(self, base_url, api_key, model, timeout=25.0, connect_timeout=3.05,
+                 max_retries=2, backoff_base=0.25, backoff_cap=2.0, pool_size=10,
+                 breaker=None):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.pool_size = pool_size
+        self.breaker = breaker or CircuitBreaker()
+        self._session = None
+        self._session_pid = None
+        self._session_lock = threading.Lock()
+        self._async_clients = {}
+
+    @property
+    def session(self):
+        # Sockets must not be shared across a fork, so each worker builds its own pool
+        if self._session is None or self._session_pid != os.getpid():
+            with self._session_lock:
+                if self._session is None or self._session_pid != os.getpid():
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    session.headers.update({
+                        "Authorization": f"Bearer {self.api_key}",
+                        "Content-Type": "application/json",
+                    })
+                    self._session, self._session_pid = session, os.getpid()
+        return self._session
+
+    def _backoff(self, attempt):
+        """Full jitter: uniform in [0, min(cap, base * 2**attempt)]."""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def post(self, payload, stream=False):
+        """
+        POST a chat completion request, retrying transient failures.
+        Returns the successful requests.Response; raises LLMError otherwise.
+        """
+        self._check_breaker()
+        url = f"{self.base_url}/chat/completions"
+        deadline = time.monotonic() + self.timeout
+        started = time.monotonic()
+        attempt = 0
+        reachable = False
+        try:
+            while True:
+                remaining = max(deadline - time.monotonic(), 0.1)
+                try:
+                    resp = self.session.post(
+                        url, json=payload, stream=stream,
+                        timeout=(min(self.connect_timeout, remaining), remaining),
+                    )
+                    if resp.status_code < 400:
+                        reachable = True
+                        self._succeeded(started)
+                        return resp
+                    error = LLMError(f"LLM upstream returned HTTP {resp.status_code}")
+                    retryable = resp.status_code in RETRY_STATUSES
+                    resp.close()
+                except (requests.ConnectionError, requests.Timeout) as exc:
+                    error, retryable = LLMError(str(exc)), True
+                except requests.RequestException as exc:
+                    error, retryable = LLMError(str(exc)), False
+
+                delay = self._backoff(attempt)
+                if self._give_up(error, retryable, attempt, delay, deadline):
+                    reachable = not retryable
+                    raise error
+                attempt += 1
+                time.sleep(delay)
+        finally:
+            self._record_outcome(reachable)
+
+    def _payload(self, messages, temperature, max_tokens, stream=False):
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def _give_up(self, error, retryable, attempt, delay, deadline):
+        """Record a failed attempt; return True if the caller should stop retrying."""
+        if retryable and attempt < self.max_retries and time.monotonic() + delay < deadline:
+            metrics.incr(RETRIES)
+            return False
+        metrics.incr(FAILURES)
+        return True
+
+    def _record_outcome(self, reachable):
+        """
+        Report a finished call to the breaker. Runs in a finally block, so any
+        exit (including an unexpected exception or a cancelled async call)
+        ends a half-open probe. A non-retryable error such as 400/401 means
+        the upstream answered: it is reachable, not an outage.
+        """
+        if reachable:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    def _succeeded(self, started):
+        metrics.incr(SUCCESSES)
+        metrics.incr(LATENCY_MS, int((time.monotonic() - started) * 1000))
+
+    def _check_breaker(self):
+        if not self.breaker.allow():
+            metrics.incr(SHORT_CIRCUITS)
+            raise CircuitOpenError("LLM upstream circuit is open")
+        metrics.incr(REQUESTS)
+
+    def chat(self, messages, temperature=0.2, max_tokens=350):
+        """Return the assistant's reply text for `messages`."""
+        resp = self.post(self._payload(messages, temperature, max_tokens))
+        try:
+            return _reply_from_json(resp.json())
+        except ValueError as exc:
+            raise LLMError("Malformed completion response") from exc
+
+    def stream_chat(self, messages, temperature=0.2, max_tokens=350):
+        """
+        Yield reply text deltas as the upstream streams them (`stream: true`).
+        Raises LLMError if the request fails or the stream breaks mid-way.
+        """
+        resp = self.post(self._payload(messages, temperature, max_tokens, stream=True), stream=True)
+        with resp:
+            try:
+                parser = _SSEParser()
+                for chunk in resp.iter_content(chunk_size=None, decode_unicode=True):
+                    for content in parser.feed(chunk):
+                        yield content
+                    if parser.done:
+                        return
+            except requests.RequestException as exc:
+                metrics.incr(FAILURES)
+                raise LLMError(f"LLM stream interrupted: {exc}") from exc
+
+    # -- async API (ASGI) ----------------------------------------------
+
+    async def _async_client(self):
+        # httpx.AsyncClient is bound to the event loop it first runs on, so
+        # each loop gets its own, closed when that loop shuts down
+        loop = asyncio.get_running_loop()
+        entry = self._async_clients.get(loop)
+        if entry is None:
+            client = httpx.AsyncClient(
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                limits=httpx.Limits(max_connections=self.pool_size * 10,
+                                    max_keepalive_connections=self.pool_size),
+            )
+            keeper = self._close_with_loop(loop, client)
+            entry = self._async_clients[loop] = (client, keeper)
+            await keeper.__anext__()
+        return entry[0]
+
+    async def _close_with_loop(self, loop, client):
+        # asyncio.run() (uvicorn, asgiref) finalises every live async generator
+        # before closing its loop, which runs this finally block while the
+        # client's connections can still be closed cleanly
+        try:
+            yield
+        finally:
+            self._async_clients.pop(loop, None)
+            await client.aclose()
+
+    async def apost(self, payload, stream=False):
+        """
+        Async version of post(). With stream=True the caller must close the
+        returned httpx.Response (aclose()).
+        """
+        await sync_to_async(self._check_breaker, thread_sensitive=False)()
+        client = await self._async_client()
+        url = f"{self.base_url}/chat/completions"
+        deadline = time.monotonic() + self.timeout
+        started = time.monotonic()
+        attempt = 0
+        reachable = False
+        try:
+            while True:
+                remaining = max(deadline - time.monotonic(), 0.1)
+                timeout = httpx.Timeout(remaining, connect=min(self.connect_timeout, remaining))
+                try:
+                    request = client.build_request("POST", url, json=payload, timeout=timeout)
+                    resp = await client.send(request, stream=stream)
+                    if resp.status_code < 400:
+                        reachable = True
+                        await sync_to_async(self._succeeded, thread_sensitive=False)(started)
+                        return resp
+                    error = LLMError(f"LLM upstream returned HTTP {resp.status_code}")
+                    retryable = resp.status_code in RETRY_STATUSES
+                    await resp.aclose()
+                except (httpx.TransportError) as exc:
+                    error, retryable = LLMError(str(exc) or exc.__class__.__name__), True
+                except httpx.HTTPError as exc:
+                    error, retryable = LLMError(str(exc)), False
+
+                delay = self._backoff(attempt)
+                give_up = await sync_to_async(self._give_up, thread_sensitive=False)(
+                    error, retryable, attempt, delay, deadline)
+                if give_up:
+                    reachable = not retryable
+                    raise error
+                attempt += 1
+                await asyncio.sleep(delay)
+        finally:
+            # in-memory only, safe to call from the event loop
+            self._record_outcome(reachable)
+
+    async def achat(self, messages, temperature=0.2, max_tokens=350):
+        """Async version of chat()."""
+        resp = await self.apost(self._payload(messages, temperature, max_tokens))
+        try:
+            return _reply_from_json(resp.json())
+        except ValueError as exc:
+            raise LLMError("Malformed completion response") from exc
+
+    async def astream_chat(self, messages, temperature=0.2, max_tokens=350):
+        """Async version of stream_chat(): an async iterator of text deltas."""
+        resp = await self.apost(self._payload(messages, temperature, max_tokens, stream=True), stream=True)
+        try:
+            parser = _SSEParser()
+            async for chunk in resp.aiter_text():
+                for content in parser.feed(chunk):
+                    yield content
+                if parser.done:
+                    return
+        except httpx.HTTPError as exc:
+            await sync_to_async(metrics.incr, thread_sensitive=False)(FAILURES)
+            raise LLMError(f"LLM stream interrupted: {exc}") from exc
+        finally:
+            await resp.aclose()
+
+
+def _reply_from_json(data):
+    try:
+        return data["choices"][0]["message"]["content"].strip()
+    except (KeyError, IndexError, TypeError, AttributeError) as exc:
+        raise ValueError("no reply content") from exc
+
+
+class _SSEParser:
+    """
+    Incremental parser for the upstream's `stream: true` response. feed()
+    takes raw text chunks and returns the content deltas they completed.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self.done = False
+
+    def feed(self, chunk):
+        if isinstance(chunk, bytes):
+            chunk = chunk.decode("utf-8", errors="replace")
+        self._buffer += chunk
+        contents = []
+        while "\n" in self._buffer and not self.done:
+            line, self._buffer = self._buffer.split("\n", 1)
+            line = line.rstrip("\r")
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                self.done = True
+                break
+            try:
+                delta = json.loads(data)["choices"][0].get("delta") or {}
+            except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+                continue  # keep-alive or non-content event
+            if delta.get("content"):
+                contents.append(delta["content"])
+        return contents
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide client configured from settings."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = LLMClient(
+                    base_url=settings.LLM_BASE_URL,
+                    api_key=settings.LLM_API_KEY,
+                    model=settings.LLM_MODEL,
+                    timeout=settings.LLM_TIMEOUT,
+                    max_retries=settings.LLM_MAX_RETRIES,
+                    breaker=CircuitBreaker(
+                        failure_threshold=settings.LLM_BREAKER_THRESHOLD,
+                        reset_timeout=settings.LLM_BREAKER_RESET,
+                    ),
+                )
+    return _client
@@ -0,0 +1,203 @@
+"""
+Check the query plans behind every page served by pages/urls.py.
+
+Each URL is requested as a logged-in staff user, so the owner area is
+covered too. Every public URL is then requested again as an anonymous visitor,
+which goes through the page cache and conditional GET code, and revisited
+with the ETag / Last-Modified it returned. All of it runs against one sample
+row per model, created inside a transaction that is rolled back afterwards.
+Every SELECT the views and templates run is passed through SQLite's EXPLAIN
+QUERY PLAN, and the command fails if any of them reads a whole table.
+pages/tests.py runs the command, so a dropped index fails the test suite.
+
+    python manage.py audit_queries
+    python manage.py audit_queries --verbose    # print every plan
+
+Intentional full scans (owner screens that list a whole table) are listed in
+ALLOWED_SCANS. A new URL with arguments needs an entry in sample_kwargs(),
+otherwise the command fails rather than skipping it.
+"""
+import re
+from datetime import date, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.utils import Error as DatabaseError
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, reverse
+
+from pages import urls as page_urls
+from pages.models import AvailabilitySlot, BlogPost, BookingSubmission, CaseStudy, PracticeArea
+
+# URLs that only accept POST or end the session; they are not auditable by GET
+SKIP = {"calendly_webhook", "ai_assist", "ai_assist_stream", "owner_logout"}
+
+# url name -> tables it may scan in full, because it lists every row anyway
+ALLOWED_SCANS = {
+    # HomepageSettings is a single-row table (pages/singletons.py); its
+    # timestamp feeds the home page's Last-Modified
+    "home": {"pages_practicearea", "pages_homepagesettings"},
+    "practice_areas": {"pages_practicearea"},
+    "practice_area_detail": {"pages_practicearea"},
+    "owner_practice_area_list": {"pages_practicearea"},
+    "owner_blog_list": {"pages_blogpost"},
+    "owner_case_list": {"pages_casestudy"},
+    "owner_availability_list": {"pages_availabilityslot"},
+    # the practice-area checkboxes on the case form list every area
+    "owner_case_create": {"pages_practicearea"},
+    "owner_case_edit": {"pages_practicearea"},
+}
+
+# "SCAN pages_blogpost" is a full table scan; "SCAN ... USING [COVERING] INDEX"
+# walks an index in order and "SEARCH" is an index lookup. Older SQLite
+# versions print "SCAN TABLE <name>".
+_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+
+AUDIT_SETTINGS = {
+    "ALLOWED_HOSTS": ["testserver"],
+    # no cached pages, so every view really queries the database
+    "CACHES": {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                           "LOCATION": "audit-queries"}},
+    "STORAGES": {
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+def create_samples():
+    """One published row per model so detail URLs resolve and lists are non-empty."""
+    area = PracticeArea.objects.create(name="Audit area", slug="audit-area")
+    post = BlogPost.objects.create(title="Audit post", slug="audit-post", body="x")
+    case = CaseStudy.objects.create(title="Audit case", slug="audit-case", body="x")
+    case.practice_areas.add(area)
+    slot = AvailabilitySlot.objects.create(
+        date=date.today() + timedelta(days=7), start_time=time(10), end_time=time(11),
+    )
+    booking = BookingSubmission.objects.create(
+        slot=slot, name="Audit", email="audit@example.com", description="x",
+    )
+    return {"area": area, "post": post, "case": case, "slot": slot, "booking": booking}
+
+
+def sample_kwargs(name, samples):
+    """URL kwargs for the pattern `name`, or None if there is no sample for it."""
+    by_name = {
+        "practice_area_detail": {"slug": samples["area"].slug},
+        "blog_detail": {"slug": samples["post"].slug},
+        "case_detail": {"slug": samples["case"].slug},
+        "book_date": {"date": samples["slot"].date.isoformat()},
+        "availability_month": {"year": samples["slot"].date.year, "month": samples["slot"].date.month},
+        "book_slot": {"pk": samples["slot"].pk},
+        "book_submit": {"pk": samples["slot"].pk},
+        "book_success": {"booking_id": samples["booking"].pk},
+        "owner_edit_site_page": {"slug": "privacy"},
+        "owner_practice_area_edit": {"pk": samples["area"].pk},
+        "owner_practice_area_delete": {"pk": samples["area"].pk},
+        "owner_blog_edit": {"pk": samples["post"].pk},
+        "owner_blog_delete": {"pk": samples["post"].pk},
+        "owner_case_edit": {"pk": samples["case"].pk},
+        "owner_case_delete": {"pk": samples["case"].pk},
+        "owner_availability_edit": {"pk": samples["slot"].pk},
+        "owner_availability_delete": {"pk": samples["slot"].pk},
+        "owner_booking_toggle_paid": {"pk": samples["booking"].pk},
+    }
+    return by_name.get(name)
+
+
+def full_scans(plan):
+    return {m.group(1) for m in (_FULL_SCAN.match(row[-1]) for row in plan) if m}
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN QUERY PLAN every query behind pages/urls.py and fail on full table scans"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verbose", action="store_true", help="Print the plan of every query")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("audit_queries uses SQLite's EXPLAIN QUERY PLAN")
+
+        self.verbose = options["verbose"]
+        self.problems = []
+        try:
+            with override_settings(**AUDIT_SETTINGS), transaction.atomic():
+                self._audit()
+                raise Rollback
+        except Rollback:
+            pass
+
+        if self.problems:
+            for problem in self.problems:
+                self.stderr.write(problem)
+            raise CommandError(f"{len(self.problems)} full table scan(s) found")
+        self.stdout.write(self.style.SUCCESS("No unexpected full table scans"))
+
+    def _audit(self):
+        cache.clear()  # a page cached by an earlier run would hide its queries
+        samples = create_samples()
+        urls = []
+        for pattern in page_urls.urlpatterns:
+            if not isinstance(pattern, URLPattern) or pattern.name in SKIP:
+                continue
+            kwargs = {}
+            if pattern.pattern.converters:
+                kwargs = sample_kwargs(pattern.name, samples)
+                if kwargs is None:
+                    raise CommandError(f"No sample kwargs for URL {pattern.name!r}; add them to sample_kwargs()")
+            urls.append((pattern, reverse(pattern.name, kwargs=kwargs)))
+
+        staff = Client()
+        staff.force_login(get_user_model().objects.create_user("audit-queries", is_staff=True))
+        for pattern, url in urls:
+            self._audit_url(staff, pattern.name, url, "staff")
+
+        anonymous = Client()
+        for pattern, url in urls:
+            if str(pattern.pattern).startswith("owner/"):
+                continue
+            response = self._audit_url(anonymous, pattern.name, url, "anonymous")
+            validators = {}
+            if response.has_header("ETag"):
+                validators["HTTP_IF_NONE_MATCH"] = response["ETag"]
+            if response.has_header("Last-Modified"):
+                validators["HTTP_IF_MODIFIED_SINCE"] = response["Last-Modified"]
+            if validators:
+                self._audit_url(anonymous, pattern.name, url, "revisit", **validators)
+
+    def _audit_url(self, client, name, url, who, **headers):
+        with CaptureQueriesContext(connection) as captured:
+            with transaction.atomic():
+                response = client.get(url, secure=True, **headers)
+                transaction.set_rollback(True)  # GETs with side effects stay harmless
+        self.stdout.write(f"{who:<10} {url:<40} {response.status_code}  {len(captured)} queries")
+
+        allowed = ALLOWED_SCANS.get(name, set())
+        seen = set()
+        for query in captured.captured_queries:
+            sql = query["sql"]
+            if not sql.lstrip().upper().startswith("SELECT") or sql in seen:
+                continue
+            seen.add(sql)
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("EXPLAIN QUERY PLAN " + sql)
+                    plan = cursor.fetchall()
+            except DatabaseError as exc:
+                self.stderr.write(f"  could not explain: {exc}\n  {sql}")
+                continue
+            if self.verbose:
+                self.stdout.write(f"  {sql}")
+                for row in plan:
+                    self.stdout.write(f"    {row[-1]}")
+            for table in sorted(full_scans(plan) - allowed):
+                self.problems.append(f"{name} ({url}, {who}): full scan of {table}\n  {sql}")
+        return response
@@ -0,0 +1,85 @@
+"""
+Compare get/set throughput of the cache backends available to the site.
+
+    python manage.py benchmark_cache
+    python manage.py benchmark_cache --ops 20000 --processes 4
+
+Single-process numbers show raw per-call cost. With --processes > 1 the shared
+backends (file, sqlite) are also hammered by several processes at once, the
+way gunicorn workers use them; LocMem is skipped there because each process
+would only be talking to its own private copy.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from pages.cache_backends import SQLiteCache
+
+PAYLOAD = {"content": b"x" * 2048, "status": 200, "content_type": "text/html"}
+
+
+def make_backend(name, workdir):
+    params = {"TIMEOUT": 300, "OPTIONS": {"MAX_ENTRIES": 100000}}
+    if name == "locmem":
+        return LocMemCache("benchmark", params)
+    if name == "file":
+        return FileBasedCache(os.path.join(workdir, "filecache"), params)
+    return SQLiteCache(os.path.join(workdir, "cache.sqlite3"), params)
+
+
+def run_ops(name, workdir, ops, keyspace, worker=0):
+    """Run `ops` sets then `ops` gets; return (set_seconds, get_seconds)."""
+    cache = make_backend(name, workdir)
+    keys = [f"bench:{worker}:{i % keyspace}" for i in range(ops)]
+    start = time.perf_counter()
+    for key in keys:
+        cache.set(key, PAYLOAD)
+    set_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for key in keys:
+        cache.get(key)
+    get_seconds = time.perf_counter() - start
+    return set_seconds, get_seconds
+
+
+def _worker(args):
+    return run_ops(*args)
+
+
+class Command(BaseCommand):
+    help = "Benchmark get/set throughput of LocMem, file-based and SQLite cache backends"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ops", type=int, default=5000, help="Operations of each kind per process")
+        parser.add_argument("--keyspace", type=int, default=1000, help="Distinct keys per process")
+        parser.add_argument("--processes", type=int, default=1, help="Concurrent processes for shared backends")
+
+    def handle(self, *args, **options):
+        ops, keyspace, processes = options["ops"], options["keyspace"], options["processes"]
+        workdir = tempfile.mkdtemp(prefix="cache-bench-")
+        try:
+            self.stdout.write(f"{ops} sets + {ops} gets per process, {keyspace} keys, 2 KB values\n")
+            self.stdout.write(f"{'backend':<10}{'procs':>6}{'set ops/s':>14}{'get ops/s':>14}")
+            for name in ("locmem", "file", "sqlite"):
+                self._report(name, 1, [run_ops(name, workdir, ops, keyspace)], ops)
+            if processes > 1:
+                for name in ("file", "sqlite"):
+                    jobs = [(name, workdir, ops, keyspace, n) for n in range(processes)]
+                    with multiprocessing.get_context("spawn").Pool(processes) as pool:
+                        results = pool.map(_worker, jobs)
+                    self._report(name, processes, results, ops)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def _report(self, name, processes, results, ops):
+        # Aggregate throughput: total operations over the slowest process's time
+        total = ops * processes
+        set_rate = total / max(r[0] for r in results)
+        get_rate = total / max(r[1] for r in results)
+        self.stdout.write(f"{name:<10}{processes:>6}{set_rate:>14,.0f}{get_rate:>14,.0f}")
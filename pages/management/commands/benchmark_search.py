@@ -0,0 +1,103 @@
+"""
+Compare site search against the LIKE '%term%' scan the admin used to run.
+
+    python manage.py benchmark_search
+    python manage.py benchmark_search --posts 5000 --queries 200
+
+Synthetic blog posts are inserted (and indexed by the usual signals) inside
+a transaction that is rolled back at the end, so the database is left as it
+was. Their words follow a Zipf distribution over a few thousand terms, like
+real prose, so common words match most posts and rarer ones a handful. Each
+query is timed through search.search() and through the old admin lookup:
+title/summary/body icontains, counted and then the first page fetched, as
+the changelist does.
+"""
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from pages import search
+from pages.management.commands.loadtest_assistant import percentile
+from pages.models import BlogPost
+
+VOCABULARY = (
+    "contract breach injunction damages negligence tort appeal tribunal employment dismissal "
+    "shareholder director insolvency receivership arbitration mediation commercial court judgment "
+    "evidence disclosure discovery privilege solicitor barrister counsel hearing trial sentencing "
+    "bail regulatory compliance data protection defamation personal injury claim liability "
+    "insurance settlement costs jurisdiction statute precedent supreme circuit district"
+).split()
+
+
+class Rollback(Exception):
+    pass
+
+
+def vocabulary(rng, size=5000):
+    """Legal terms first (most frequent), then made-up words to fill the long tail."""
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = list(VOCABULARY)
+    while len(words) < size:
+        words.append("".join(rng.choice(letters) for _ in range(rng.randint(4, 10))))
+    weights = [1 / rank for rank in range(1, size + 1)]  # Zipf
+    return words, weights
+
+
+def synthetic_text(rng, words, weights, count):
+    return " ".join(rng.choices(words, weights, k=count))
+
+
+class Command(BaseCommand):
+    help = "Benchmark FTS site search against LIKE scans on synthetic posts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=3000)
+        parser.add_argument("--queries", type=int, default=100)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        words, weights = vocabulary(rng)
+        # queries from the body of the distribution: frequent legal terms and mid-frequency words
+        terms = [" ".join(rng.sample(words[:500], rng.choice((1, 2)))) for _ in range(options["queries"])]
+        try:
+            with transaction.atomic():
+                start = time.perf_counter()
+                for n in range(options["posts"]):
+                    BlogPost.objects.create(
+                        title=f"Benchmark {synthetic_text(rng, words, weights, 5)} {n}",
+                        slug=f"benchmark-search-{n}",
+                        summary=synthetic_text(rng, words, weights, 25),
+                        body="".join(f"<p>{synthetic_text(rng, words, weights, 80)}</p>" for _ in range(6)),
+                    )
+                self.stdout.write(f"created and indexed {options['posts']} posts "
+                                  f"in {time.perf_counter() - start:.1f} s")
+
+                self._report("FTS search (top 20)", terms, lambda term: search.search(term))
+                self._report("LIKE scan (admin changelist)", terms, self._like)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _like(self, term):
+        matches = BlogPost.objects.filter(*[
+            Q(title__icontains=word) | Q(summary__icontains=word) | Q(body__icontains=word)
+            for word in term.split()
+        ])
+        matches.count()
+        return list(matches.values_list("pk", "title")[:20])
+
+    def _report(self, label, terms, run):
+        timings = []
+        for term in terms:
+            start = time.perf_counter()
+            run(term)
+            timings.append((time.perf_counter() - start) * 1000)
+        self.stdout.write(
+            f"{label:<28} p50 {statistics.median(timings):8.2f} ms   "
+            f"p95 {percentile(timings, 95):8.2f} ms   max {max(timings):8.2f} ms"
+        )
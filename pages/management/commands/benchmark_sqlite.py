@@ -0,0 +1,161 @@
+"""
+Measure mixed read/write throughput of the SQLite database with several
+processes at once, the way gunicorn workers share it: Django's stock SQLite
+connection settings against the ones in settings.DATABASES
+(pages/sqlite_backend).
+
+    python manage.py benchmark_sqlite
+    python manage.py benchmark_sqlite --processes 8 --seconds 10 --writes 0.3
+
+Each process loops over the site's typical queries on a scratch copy of the
+schema: blog list pages and a month of booking slots as reads, and as writes
+a booking (read a slot, update it, insert the submission, in one transaction)
+or a CMS edit (read a post, update it). Failed operations are ones that hit
+"database is locked". The site's own database is not touched.
+"""
+import multiprocessing
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import date, time as clock, timedelta
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from django.utils import timezone
+
+ALIAS = "benchmark"
+POSTS = 300
+SLOTS = 200
+
+PROFILES = {
+    "before (stock)": ("django.db.backends.sqlite3", {}),
+    "after (settings)": (settings.DATABASES[DEFAULT_DB_ALIAS]["ENGINE"],
+                         settings.DATABASES[DEFAULT_DB_ALIAS].get("OPTIONS", {})),
+}
+
+
+def use_database(profile, path):
+    """Point the ALIAS connection of this process at `path` with a profile's settings."""
+    engine, options = PROFILES[profile]
+    configured = connections.configure_settings({
+        DEFAULT_DB_ALIAS: {}, ALIAS: {"ENGINE": engine, "NAME": str(path), "OPTIONS": dict(options)},
+    })
+    connections.settings[ALIAS] = configured[ALIAS]
+
+
+def create_and_seed():
+    from pages.models import AvailabilitySlot, BlogPost, BookingSubmission
+
+    # just the tables used; migrations' data steps would query the default database
+    with connections[ALIAS].schema_editor() as editor:
+        for model in (BlogPost, AvailabilitySlot, BookingSubmission):
+            editor.create_model(model)
+    now = timezone.now()
+    BlogPost.objects.using(ALIAS).bulk_create(
+        BlogPost(title=f"Post {n}", slug=f"post-{n}", summary="Summary " * 10, body="<p>Body</p>" * 50,
+                 published_at=now - timedelta(days=n))
+        for n in range(POSTS)
+    )
+    slots = []
+    for n in range(SLOTS):
+        day, start = date.today() + timedelta(days=1 + n // 8), clock(9 + n % 8)
+        end = clock(10 + n % 8)
+        starts_at, ends_at = AvailabilitySlot.bounds(day, start, end)
+        slots.append(AvailabilitySlot(date=day, start_time=start, end_time=end, starts_at=starts_at, ends_at=ends_at))
+    AvailabilitySlot.objects.using(ALIAS).bulk_create(slots)
+
+
+def run(profile, path, seconds, write_ratio, start_at, worker):
+    """(reads, writes, failures, write latencies in ms) of one process."""
+    django.setup()
+    use_database(profile, path)
+    from pages.models import AvailabilitySlot, BlogPost, BookingSubmission
+
+    posts = BlogPost.objects.using(ALIAS)
+    slots = AvailabilitySlot.objects.using(ALIAS)
+    rng = random.Random(worker)
+    reads = writes = failures = 0
+    latencies = []
+    connections[ALIAS].ensure_connection()
+    time.sleep(max(0.0, start_at - time.time()))
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            if rng.random() >= write_ratio:
+                if rng.random() < 0.5:
+                    list(posts.filter(published=True).order_by("-published_at", "-id")
+                         .only("title", "slug", "summary", "published_at")[:12])
+                else:
+                    first = date.today() + timedelta(days=rng.randrange(20))
+                    list(slots.filter(is_available=True, date__gte=first, date__lt=first + timedelta(days=31))
+                         .values_list("date", "start_time"))
+                reads += 1
+                continue
+            with transaction.atomic(using=ALIAS):
+                if rng.random() < 0.5:
+                    slot = slots.filter(pk=rng.randrange(1, SLOTS + 1)).first()
+                    slots.filter(pk=slot.pk).update(updated_at=timezone.now())
+                    BookingSubmission.objects.using(ALIAS).create(
+                        slot=slot, name=f"Client {worker}", email="client@example.com", description="Benchmark",
+                    )
+                else:
+                    post = posts.get(pk=rng.randrange(1, POSTS + 1))
+                    posts.filter(pk=post.pk).update(title=f"Post {post.pk} ({worker})", updated_at=timezone.now())
+            writes += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+        except OperationalError:
+            failures += 1
+    connections.close_all()
+    return reads, writes, failures, latencies
+
+
+def _worker(args):
+    return run(*args)
+
+
+class Command(BaseCommand):
+    help = "Benchmark multi-process SQLite throughput with stock and tuned connection settings"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=4, help="Concurrent worker processes")
+        parser.add_argument("--seconds", type=float, default=5, help="Duration of each run")
+        parser.add_argument("--writes", type=float, default=0.2, help="Share of operations that write")
+
+    def handle(self, *args, **options):
+        processes, seconds, write_ratio = options["processes"], options["seconds"], options["writes"]
+        workdir = Path(tempfile.mkdtemp(prefix="sqlite-bench-"))
+        try:
+            template = workdir / "template.sqlite3"
+            use_database("before (stock)", template)
+            create_and_seed()
+            connections[ALIAS].close()
+
+            self.stdout.write(f"{processes} processes, {seconds:g} s, {write_ratio:.0%} writes\n")
+            self.stdout.write(f"{'profile':<18}{'reads/s':>10}{'writes/s':>10}{'failed':>8}"
+                              f"{'write p50 ms':>14}{'write p95 ms':>14}")
+            for profile in PROFILES:
+                path = workdir / f"{profile.split()[0]}.sqlite3"
+                shutil.copy(template, path)
+                start_at = time.time() + 2  # after every process has started and connected
+                jobs = [(profile, path, seconds, write_ratio, start_at, n) for n in range(processes)]
+                with multiprocessing.get_context("spawn").Pool(processes) as pool:
+                    results = pool.map(_worker, jobs)
+                self._report(profile, results, seconds)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def _report(self, profile, results, seconds):
+        reads = sum(r[0] for r in results)
+        writes = sum(r[1] for r in results)
+        failures = sum(r[2] for r in results)
+        latencies = sorted(ms for r in results for ms in r[3])
+        p50 = statistics.median(latencies) if latencies else 0
+        p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0
+        self.stdout.write(f"{profile:<18}{reads / seconds:>10,.0f}{writes / seconds:>10,.0f}{failures:>8}"
+                          f"{p50:>14.1f}{p95:>14.1f}")
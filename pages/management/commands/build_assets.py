@@ -0,0 +1,66 @@
+"""
+Build the self-hosted front-end files (pages/assets.py) from assets/vendor/
+and report their size against what the site used to load from CDNs.
+
+    pip install -r requirements-dev.txt
+    python manage.py build_assets
+    python manage.py build_assets --check   # fail if the committed files are stale
+
+Run it after editing static/css/site.css, after using a Bootstrap class or
+icon for the first time in a template, or after updating a vendored library,
+then run build_critical_css, and commit the files both write. Works offline.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from pages import assets
+
+
+def _kb(size):
+    return "-" if size is None else f"{size / 1024:.1f}"
+
+
+class Command(BaseCommand):
+    help = "Build the purged CSS bundle and subset fonts from the vendored front-end sources"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true",
+                            help="Only compare the built files with the ones in static/")
+
+    def handle(self, *args, **options):
+        try:
+            outputs = assets.build()
+        except ImportError as exc:
+            raise CommandError(f"{exc}; install the build tools with `pip install -r requirements-dev.txt`")
+
+        if options["check"]:
+            stale = [name for name, data in outputs.items()
+                     if not (assets.STATIC / name).exists() or (assets.STATIC / name).read_bytes() != data]
+            if stale:
+                raise CommandError("Out of date, run `manage.py build_assets`: " + ", ".join(stale))
+            self.stdout.write(self.style.SUCCESS("Front-end files are up to date"))
+            return
+
+        for name, data in outputs.items():
+            path = assets.STATIC / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+
+        self.stdout.write("Stylesheets and fonts (KiB)        raw     gzip   brotli")
+        before = self._table("before (CDN files + site CSS)", assets.cdn_inputs())
+        after = self._table("after (static/)", {name: data for name, data in outputs.items()
+                                                 if name != assets.JS_OUTPUT})
+        saved = 1 - after[1] / before[1]
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {len(outputs)} file(s); gzip transfer {_kb(before[1])} -> {_kb(after[1])} KiB "
+            f"({saved:.0%} smaller), with Inter now self-hosted too"
+        ))
+
+    def _table(self, title, files):
+        self.stdout.write(f"  {title}")
+        totals = [0, 0, 0]
+        for name, data in files.items():
+            sizes = assets.compressed_sizes(data)
+            self.stdout.write(f"    {name:28}" + "".join(f"{_kb(size):>9}" for size in sizes))
+            totals = [t + (s or 0) for t, s in zip(totals, sizes)]
+        self.stdout.write(f"    {'total':28}" + "".join(f"{_kb(size):>9}" for size in totals))
+        return totals
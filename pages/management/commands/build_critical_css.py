@@ -0,0 +1,76 @@
+"""
+Extract the above-the-fold CSS of the main public pages (pages/critical_css.py)
+from css/bundle.css into assets/critical/, for the {% critical_css %} tag.
+
+    python manage.py build_critical_css
+    python manage.py build_critical_css --check   # fail if the committed files are stale
+
+Run it after build_assets, or after changing the top of one of those pages,
+and commit the files it writes. It renders the pages from the local database,
+so the detail pages need at least one published blog post and case study.
+"""
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from pages import assets, critical_css
+
+# render with plain static URLs: the manifest only exists after collectstatic
+RENDER_SETTINGS = {
+    "ALLOWED_HOSTS": ["testserver"],
+    "STORAGES": {
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+}
+
+
+class Command(BaseCommand):
+    help = "Extract per-page critical CSS from the built stylesheet bundle"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true",
+                            help="Only compare the extracted CSS with the files in assets/critical/")
+
+    def handle(self, *args, **options):
+        bundle = (assets.STATIC / assets.BUNDLE).read_text(encoding="utf-8")
+        outputs = {}
+        with override_settings(**RENDER_SETTINGS):
+            client = Client()
+            for page, (url_name, model_name) in critical_css.PAGES.items():
+                html = self._render(client, url_name, model_name)
+                if html is None:
+                    self.stderr.write(f"{page}: nothing published to render, skipped")
+                    continue
+                outputs[page] = critical_css.critical(bundle, critical_css.fold_elements(html)) + "\n"
+
+        if options["check"]:
+            stale = [page for page, css in outputs.items()
+                     if not critical_css.path(page).exists()
+                     or critical_css.path(page).read_text(encoding="utf-8") != css]
+            if stale:
+                raise CommandError("Out of date, run `manage.py build_critical_css`: " + ", ".join(stale))
+            self.stdout.write(self.style.SUCCESS("Critical CSS is up to date"))
+            return
+
+        critical_css.CRITICAL_DIR.mkdir(parents=True, exist_ok=True)
+        self.stdout.write(f"Critical CSS (KiB, gzip) of {assets.BUNDLE}: "
+                          f"{assets.compressed_sizes(bundle.encode())[1] / 1024:.1f}")
+        for page, css in outputs.items():
+            critical_css.path(page).write_text(css, encoding="utf-8")
+            self.stdout.write(f"    {page:16}{assets.compressed_sizes(css.encode())[1] / 1024:>7.1f}")
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(outputs)} file(s) to {critical_css.CRITICAL_DIR}"))
+
+    def _render(self, client, url_name, model_name):
+        kwargs = {}
+        if model_name:
+            obj = (apps.get_model("pages", model_name).objects.filter(published=True)
+                   .order_by("-published_at", "-id").only("slug").first())
+            if obj is None:
+                return None
+            kwargs["slug"] = obj.slug
+        response = client.get(reverse(url_name, kwargs=kwargs), secure=True)
+        if response.status_code != 200:
+            raise CommandError(f"{response.request['PATH_INFO']} returned {response.status_code}")
+        return response.content.decode()
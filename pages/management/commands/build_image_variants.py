@@ -0,0 +1,46 @@
+"""
+Generate responsive variants (pages/images.py) for every hero image that
+doesn't have current ones.
+
+    python manage.py build_image_variants
+    python manage.py build_image_variants --force   # re-encode everything
+
+Saving a post or page does this for its own image; run this once after
+deploying the variant fields, after changing WIDTHS or the encoder settings
+(with --force), or after images were changed with queryset.update().
+Variants of images kept under static/img/ are written to static/img/variants/;
+commit those so they are collected and deployed with the originals.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from pages import images
+from pages.models import BlogPost, CaseStudy, SitePage
+from pages.page_cache import bump_content_version
+
+
+class Command(BaseCommand):
+    help = "Generate responsive hero image variants"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Regenerate variants that are already current")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        processed = missing = 0
+        for model in (BlogPost, CaseStudy, SitePage):
+            queryset = (model.objects.exclude(hero_image="")
+                        .only("pk", "hero_image", "hero_width", "hero_height", "hero_variants"))
+            for obj in queryset.iterator(chunk_size=100):
+                if not images.process(obj, force=options["force"]):
+                    continue
+                processed += 1
+                if obj.hero_width is None:
+                    missing += 1
+                    self.stderr.write(f"{model.__name__} {obj.pk}: cannot read {obj.hero_image.name}")
+        if processed:
+            bump_content_version()  # cached pages still link the old images
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {processed} image(s), {missing} unreadable, in {time.perf_counter() - start:.2f} s"
+        ))
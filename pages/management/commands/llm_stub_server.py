@@ -0,0 +1,104 @@
+"""
+Local stand-in for the OpenAI-compatible chat completions API.
+Supports both plain JSON replies and `stream: true` SSE chunks.
+
+    python manage.py llm_stub_server --port 8765 --latency 0.5 --fail-rate 0.2
+
+Then run the site with LLM_BASE_URL=http://127.0.0.1:8765 to exercise the
+assistant, retries and the circuit breaker without a paid upstream.
+"""
+import json
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+DEFAULT_REPLY = ("Thanks for your question. For general information see the "
+                 "<a href='/practice-areas/'>practice areas</a>, or "
+                 "<a href='/book/'>book a consultation</a> for advice on your matter.")
+
+
+def make_handler(latency, fail_rate, reply, token_delay):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real upstream
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_stream(self, payload):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            # Split on spaces but keep them, roughly like real token deltas
+            for token in re.findall(r"\S+\s*", reply):
+                chunk = {"object": "chat.completion.chunk", "model": payload.get("model", "stub"),
+                         "choices": [{"index": 0, "delta": {"content": token}}]}
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+                time.sleep(token_delay)
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")  # terminating zero-length chunk
+
+        def _write_chunk(self, data):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                return self._send_json(400, {"error": "invalid json"})
+            if not self.path.endswith("/chat/completions"):
+                return self._send_json(404, {"error": "not found"})
+
+            time.sleep(latency)
+            if random.random() < fail_rate:
+                return self._send_json(503, {"error": "stub failure"})
+
+            if payload.get("stream"):
+                return self._send_stream(payload)
+
+            self._send_json(200, {
+                "id": "stub",
+                "object": "chat.completion",
+                "model": payload.get("model", "stub"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": reply}}],
+            })
+
+    return StubHandler
+
+
+class Command(BaseCommand):
+    help = "Run a local OpenAI-compatible stub of the LLM upstream"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--latency", type=float, default=0.3, help="Seconds to wait before answering")
+        parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 503")
+        parser.add_argument("--token-delay", type=float, default=0.03, help="Seconds between streamed tokens")
+        parser.add_argument("--reply", default=DEFAULT_REPLY)
+
+    def handle(self, *args, **options):
+        handler = make_handler(options["latency"], options["fail_rate"], options["reply"], options["token_delay"])
+        server = ThreadingHTTPServer((options["host"], options["port"]), handler)
+        server.daemon_threads = True
+        self.stdout.write(f"LLM stub listening on http://{options['host']}:{options['port']}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
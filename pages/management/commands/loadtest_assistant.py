@@ -0,0 +1,122 @@
+"""
+Measure public page latency while many assistant requests are in flight.
+
+Start a slow LLM stub and the site, then point this command at it:
+
+    python manage.py llm_stub_server --latency 5 &
+    export LLM_BASE_URL=http://127.0.0.1:8765 ASSISTANT_ENABLED=1 SECURE_SSL_REDIRECT=False ALLOWED_HOSTS=127.0.0.1
+
+    # sync workers (current Procfile)
+    gunicorn core.wsgi:application -w 2 -b 127.0.0.1:8000 &
+    python manage.py loadtest_assistant --base-url http://127.0.0.1:8000
+
+    # ASGI workers with the async assistant views
+    ASSISTANT_ASYNC=1 gunicorn core.asgi:application -k uvicorn.workers.UvicornWorker -w 2 -b 127.0.0.1:8000 &
+    python manage.py loadtest_assistant --base-url http://127.0.0.1:8000
+
+Under sync workers every in-flight assistant call pins a worker, so page
+latency climbs to the LLM latency; under ASGI it should stay flat.
+
+Each assistant request asks a distinct question so it misses the response
+cache (pages/response_cache.py) and really reaches the LLM stub; pass
+--same-message to measure cached replies instead.
+"""
+import statistics
+import threading
+import time
+import uuid
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = "Load-test page latency while concurrent /api/assist/ requests are in flight"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--page", default="/blog/", help="Public page to time")
+        parser.add_argument("--page-requests", type=int, default=50)
+        parser.add_argument("--assist-concurrency", type=int, default=20,
+                            help="Assistant requests kept in flight during the loaded phase")
+        parser.add_argument("--same-message", action="store_true",
+                            help="Repeat one question, so replies come from the response cache")
+        parser.add_argument("--timeout", type=float, default=60.0)
+
+    def handle(self, *args, **options):
+        base = options["base_url"].rstrip("/")
+        page_url = base + options["page"]
+        timeout = options["timeout"]
+
+        try:
+            requests.get(page_url, timeout=timeout, allow_redirects=False)
+        except requests.RequestException as exc:
+            raise CommandError(f"Site not reachable at {page_url}: {exc}")
+
+        baseline = self._time_pages(page_url, options["page_requests"], timeout)
+        self._report("idle", baseline)
+
+        stop = threading.Event()
+        completed, failed = [0], [0]
+        lock = threading.Lock()
+
+        def assistant_worker(n):
+            session = requests.Session()
+            # Distinct User-Agent per worker so the per-client throttle doesn't
+            # turn the load into instant "slow down" replies
+            session.headers["User-Agent"] = f"loadtest-assistant/{n}"
+            while not stop.is_set():
+                message = "How do I book?"
+                if not options["same_message"]:
+                    # a unique significant word defeats both the exact and near-duplicate tiers
+                    message += f" (ref {uuid.uuid4().hex})"
+                try:
+                    resp = session.post(base + "/api/assist/", json={"message": message},
+                                        timeout=timeout)
+                    ok = resp.status_code == 200
+                except requests.RequestException:
+                    ok = False
+                with lock:
+                    if ok:
+                        completed[0] += 1
+                    else:
+                        failed[0] += 1
+                time.sleep(10.1)  # stay under the default 3 / 30 s per-client limit
+
+        threads = [threading.Thread(target=assistant_worker, args=(n,), daemon=True)
+                   for n in range(options["assist_concurrency"])]
+        for thread in threads:
+            thread.start()
+        time.sleep(1.0)  # let the assistant calls reach the upstream
+
+        loaded = self._time_pages(page_url, options["page_requests"], timeout)
+        stop.set()
+        self._report(f"{options['assist_concurrency']} assistant calls in flight", loaded)
+        self.stdout.write(f"assistant requests completed: {completed[0]}, failed: {failed[0]}")
+
+        ratio = statistics.median(loaded) / max(statistics.median(baseline), 1e-6)
+        self.stdout.write(f"p50 slowdown under load: {ratio:.1f}x")
+
+    def _time_pages(self, url, count, timeout):
+        session = requests.Session()
+        timings = []
+        for _ in range(count):
+            start = time.perf_counter()
+            try:
+                session.get(url, timeout=timeout, allow_redirects=False)
+            except requests.RequestException:
+                pass
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def _report(self, label, timings):
+        self.stdout.write(
+            f"{label:<36} p50 {statistics.median(timings):8.1f} ms   "
+            f"p95 {percentile(timings, 95):8.1f} ms   max {max(timings):8.1f} ms"
+        )
@@ -0,0 +1,148 @@
+"""
+Post thousands of signed Calendly webhook deliveries at a running site.
+
+Every invitee gets an invitee.created delivery and some also get an
+invitee.canceled; each delivery is sent `--retries` extra times, in shuffled
+order, the way Calendly retries when it does not see a 2xx in time.
+
+    export CALENDLY_SIGNING_KEY=loadtest SECURE_SSL_REDIRECT=False ALLOWED_HOSTS=127.0.0.1
+    gunicorn core.wsgi:application -w 2 -b 127.0.0.1:8000 &
+    python manage.py loadtest_calendly --base-url http://127.0.0.1:8000 --process
+
+With --process (only when this command uses the same database as the site)
+the inbox is then drained in-process and the resulting bookings are checked:
+one row per invitee, canceled exactly where a cancellation was sent.
+"""
+import json
+import random
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from pages import calendly
+from pages.management.commands.loadtest_assistant import percentile
+from pages.models import Booking, CalendlyDelivery
+
+
+def fixture(trigger, uid, n):
+    start = datetime(2030, 1, 1, 9, tzinfo=dt_timezone.utc) + timedelta(minutes=30 * n)
+    return json.dumps({
+        "event": trigger,
+        "created_at": datetime.now(dt_timezone.utc).isoformat(),
+        "payload": {
+            "event": {
+                "uuid": f"evt-{uid}",
+                "start_time": start.isoformat(),
+                "end_time": (start + timedelta(minutes=30)).isoformat(),
+            },
+            "invitee": {"uuid": uid, "name": f"Load Test {n}", "email": f"loadtest{n}@example.com"},
+        },
+    }).encode()
+
+
+class Command(BaseCommand):
+    help = "Load-test the Calendly webhook with signed, retried fixture deliveries"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--invitees", type=int, default=1000)
+        parser.add_argument("--cancel-ratio", type=float, default=0.2,
+                            help="Share of invitees that also get an invitee.canceled")
+        parser.add_argument("--retries", type=int, default=1, help="Extra copies of every delivery")
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--signing-key", default=None, help="Default: CALENDLY_SIGNING_KEY")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--timeout", type=float, default=30.0)
+        parser.add_argument("--process", action="store_true",
+                            help="Drain the inbox afterwards and verify the bookings (same database only)")
+
+    def handle(self, *args, **options):
+        key = options["signing_key"] if options["signing_key"] is not None else settings.CALENDLY_SIGNING_KEY
+        url = options["base_url"].rstrip("/") + "/webhooks/calendly/"
+        run = uuid.uuid4().hex[:8]
+        rng = random.Random(options["seed"])
+
+        bodies, canceled = [], set()
+        for n in range(options["invitees"]):
+            uid = f"loadtest-{run}-{n}"
+            bodies.append(fixture(calendly.CREATED, uid, n))
+            if rng.random() < options["cancel_ratio"]:
+                bodies.append(fixture(calendly.CANCELED, uid, n))
+                canceled.add(uid)
+        unique = len(bodies)
+        deliveries = bodies * (1 + options["retries"])
+        rng.shuffle(deliveries)
+
+        try:
+            requests.get(url, timeout=options["timeout"])
+        except requests.RequestException as exc:
+            raise CommandError(f"Site not reachable at {url}: {exc}")
+
+        self.stdout.write(f"posting {len(deliveries)} deliveries ({unique} unique) "
+                          f"with {options['concurrency']} clients")
+        timings, statuses = [], Counter()
+        lock = threading.Lock()
+        pending = iter(deliveries)
+
+        def client():
+            session = requests.Session()
+            while True:
+                with lock:
+                    body = next(pending, None)
+                if body is None:
+                    return
+                headers = {"Content-Type": "application/json"}
+                if key:
+                    headers["Calendly-Webhook-Signature"] = calendly.sign(body, key)
+                start = time.perf_counter()
+                try:
+                    status = session.post(url, data=body, headers=headers, timeout=options["timeout"]).status_code
+                except requests.RequestException as exc:
+                    status = type(exc).__name__
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    timings.append(elapsed)
+                    statuses[status] += 1
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=client) for _ in range(options["concurrency"])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+
+        self.stdout.write(
+            f"{len(timings) / wall:8.1f} req/s   p50 {statistics.median(timings):7.1f} ms   "
+            f"p95 {percentile(timings, 95):7.1f} ms   max {max(timings):7.1f} ms"
+        )
+        self.stdout.write("responses: " + ", ".join(f"{k}: {v}" for k, v in sorted(statuses.items(), key=str)))
+
+        if options["process"]:
+            self._verify(run, unique, options["invitees"], canceled)
+
+    def _verify(self, run, unique, invitees, canceled):
+        stored = CalendlyDelivery.objects.filter(body__contains=f'"loadtest-{run}-').count()
+        start = time.perf_counter()
+        applied, failed = calendly.drain()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"inbox rows stored: {stored} (expected {unique}); "
+                          f"applied {applied}, failed {failed} in {elapsed:.2f} s")
+
+        bookings = dict(Booking.objects.filter(calendly_id__startswith=f"loadtest-{run}-")
+                        .values_list("calendly_id", "status"))
+        wrong = [uid for uid, status in bookings.items()
+                 if status != ("canceled" if uid in canceled else "created")]
+        ok = stored == unique and len(bookings) == invitees and not wrong and not failed
+        message = (f"bookings: {len(bookings)} (expected {invitees}), "
+                   f"{len(canceled)} canceled, {len(wrong)} with the wrong status")
+        self.stdout.write(self.style.SUCCESS(message) if ok else self.style.ERROR(message))
+        if not ok:
+            raise CommandError("Webhook load test produced inconsistent bookings")
@@ -0,0 +1,32 @@
+"""
+Apply stored Calendly webhook deliveries to bookings (pages/calendly.py).
+
+    python manage.py process_calendly            # apply everything due, then exit
+    python manage.py process_calendly --loop     # keep polling, for a worker process
+
+Run it from a cron job or as a long-running worker next to the web service.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from pages import calendly
+
+
+class Command(BaseCommand):
+    help = "Apply pending Calendly webhook deliveries to bookings, coalescing events per invitee"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None,
+                            help=f"Deliveries per batch (default: {calendly.BATCH_SIZE})")
+        parser.add_argument("--loop", action="store_true", help="Keep running and poll for new deliveries")
+        parser.add_argument("--interval", type=float, default=5.0, help="Seconds between polls with --loop")
+
+    def handle(self, *args, **options):
+        while True:
+            applied, failed = calendly.drain(options["batch_size"])
+            if applied or failed:
+                self.stdout.write(f"applied {applied}, failed {failed}")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,32 @@
+"""
+Rebuild the site search index (pages/search.py) and the assistant's
+retrieval chunks (pages/retrieval.py) from the content tables.
+
+    python manage.py rebuild_search_index
+
+Saves and deletes keep the index current on their own; run this after
+changes that bypass model signals (queryset.update(), raw SQL, restoring a
+database backup) or a change to how documents are built.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from pages import retrieval, search
+
+
+class Command(BaseCommand):
+    help = "Re-index site content for site search and the assistant's retrieval"
+
+    def handle(self, *args, **options):
+        if not search.enabled():
+            raise CommandError("Site search needs SQLite (FTS5) or PostgreSQL")
+        start = time.perf_counter()
+        with transaction.atomic():
+            indexed = search.rebuild()
+            chunks = retrieval.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {indexed} document(s) and {chunks} assistant chunk(s) "
+            f"in {time.perf_counter() - start:.2f} s"
+        ))
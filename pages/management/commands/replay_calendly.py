@@ -0,0 +1,58 @@
+"""
+Apply stored Calendly deliveries again, e.g. after fixing a bug in how they
+are applied or restoring the Booking table:
+
+    python manage.py replay_calendly --failed
+    python manage.py replay_calendly --since 2024-05-01
+    python manage.py replay_calendly --calendly-id <invitee uuid>
+    python manage.py replay_calendly --all --dry-run
+
+Replaying is safe: deliveries are applied as upserts and a cancellation is
+never undone by an older invitee.created.
+"""
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from pages import calendly
+from pages.models import CalendlyDelivery
+
+
+class Command(BaseCommand):
+    help = "Queue stored Calendly webhook deliveries again and apply them"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Every stored delivery")
+        parser.add_argument("--failed", action="store_true", help="Deliveries that could not be applied")
+        parser.add_argument("--since", help="Deliveries received on or after this date (YYYY-MM-DD)")
+        parser.add_argument("--calendly-id", help="Deliveries for one invitee")
+        parser.add_argument("--queue-only", action="store_true",
+                            help="Only queue them; leave applying to the process_calendly worker")
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many would be replayed")
+
+    def handle(self, *args, **options):
+        if not any(options[name] for name in ("all", "failed", "since", "calendly_id")):
+            raise CommandError("Choose deliveries with --failed, --since or --calendly-id, or pass --all")
+
+        deliveries = CalendlyDelivery.objects.all()
+        if options["failed"]:
+            deliveries = deliveries.filter(status=CalendlyDelivery.FAILED)
+        if options["since"]:
+            since = parse_date(options["since"])
+            if since is None:
+                raise CommandError("--since must be a date in YYYY-MM-DD format")
+            deliveries = deliveries.filter(received_at__gte=timezone.make_aware(datetime.combine(since, time.min)))
+        if options["calendly_id"]:
+            deliveries = deliveries.filter(calendly_id=options["calendly_id"])
+
+        if options["dry_run"]:
+            self.stdout.write(f"{deliveries.count()} delivery(ies) would be replayed")
+            return
+
+        queued = calendly.replay(deliveries)
+        self.stdout.write(f"Queued {queued} delivery(ies)")
+        if not options["queue_only"]:
+            applied, failed = calendly.drain()
+            self.stdout.write(self.style.SUCCESS(f"Applied {applied}, failed {failed}"))
@@ -0,0 +1,38 @@
+"""
+Deliver queued email (pages/outbox.py).
+
+    python manage.py send_outbox            # drain everything due, then exit
+    python manage.py send_outbox --loop     # keep polling, for a worker process
+
+Run it from a cron job or as a long-running worker next to the web service.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from pages import outbox
+
+
+class Command(BaseCommand):
+    help = "Send due messages from the email outbox, with retries and dead-lettering"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None,
+                            help="Messages per SMTP connection (default: OUTBOX_BATCH_SIZE)")
+        parser.add_argument("--loop", action="store_true", help="Keep running and poll for new messages")
+        parser.add_argument("--interval", type=float, default=10.0, help="Seconds between polls with --loop")
+
+    def handle(self, *args, **options):
+        while True:
+            total_sent = total_failed = 0
+            while True:
+                sent, failed = outbox.send_batch(options["batch_size"])
+                total_sent += sent
+                total_failed += failed
+                if not sent:
+                    break  # nothing due, or every send failed (server down): wait
+            if total_sent or total_failed:
+                self.stdout.write(f"sent {total_sent}, failed {total_failed}")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
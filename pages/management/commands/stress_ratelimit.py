@@ -0,0 +1,74 @@
+"""
+Concurrency harness for pages.ratelimit.
+
+Fires many simultaneous requests from one client at a single limit using
+several processes (like gunicorn workers) with several threads each, all
+against the configured default cache, and checks that exactly `limit` of them
+were admitted.
+
+    python manage.py stress_ratelimit --processes 4 --threads 25 --limit 10
+"""
+import multiprocessing
+import threading
+import uuid
+
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+
+from pages.ratelimit import RateLimiter
+
+
+def _process(name, rate, threads, start, results):
+    limiter = RateLimiter(name, [rate])
+    admitted = []
+    lock = threading.Lock()
+
+    def fire():
+        start.wait()
+        decision = limiter.hit("stress-client")
+        with lock:
+            admitted.append(decision.allowed)
+
+    workers = [threading.Thread(target=fire) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    results.put(sum(admitted))
+
+
+class Command(BaseCommand):
+    help = "Check that the shared rate limiter admits exactly `limit` of many concurrent requests"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=4)
+        parser.add_argument("--threads", type=int, default=25, help="Threads per process")
+        parser.add_argument("--limit", type=int, default=10)
+
+    def handle(self, *args, **options):
+        processes, threads, limit = options["processes"], options["threads"], options["limit"]
+        rate = f"{limit}/1h"  # long window so the whole burst lands inside it
+        name = f"stress-{uuid.uuid4().hex[:8]}"
+        if processes > 1 and isinstance(cache, LocMemCache):
+            self.stdout.write(self.style.WARNING(
+                "LocMemCache is per process: expect each process to admit `limit` on its own"
+            ))
+
+        ctx = multiprocessing.get_context("fork")
+        start = ctx.Event()
+        results = ctx.Queue()
+        procs = [ctx.Process(target=_process, args=(name, rate, threads, start, results))
+                 for _ in range(processes)]
+        for proc in procs:
+            proc.start()
+        start.set()
+        admitted = sum(results.get() for _ in procs)
+        for proc in procs:
+            proc.join()
+
+        total = processes * threads
+        self.stdout.write(f"{total} concurrent requests, limit {limit}: {admitted} admitted")
+        if admitted != limit:
+            raise CommandError(f"Expected exactly {limit} admitted, got {admitted}")
+        self.stdout.write(self.style.SUCCESS("OK"))
@@ -0,0 +1,37 @@
+"""
+Archive availability slots that have ended.
+
+Archived slots drop out of the owner's availability list (they stay in the
+database, with any bookings made for them) and out of the index the sweep
+itself uses, so the list and the sweep stay fast as history accumulates.
+Run it periodically, e.g. nightly from a cron job:
+
+    python manage.py sweep_slots
+    python manage.py sweep_slots --dry-run
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from pages.availability import invalidate_availability
+from pages.models import AvailabilitySlot
+
+
+class Command(BaseCommand):
+    help = "Archive availability slots whose end time has passed"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many slots would be archived")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        expired = AvailabilitySlot.objects.current().past(now)
+        if options["dry_run"]:
+            self.stdout.write(f"{expired.count()} slot(s) would be archived")
+            return
+
+        # A slot that ended unbooked can never be booked now; clear the flag so
+        # every "is_available" query skips it too
+        archived = expired.update(archived_at=now, is_available=False, updated_at=now)
+        if archived:
+            invalidate_availability()
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} slot(s)"))
@@ -0,0 +1,90 @@
+"""
+Lightweight counters for operational metrics.
+
+Counters live in the default cache so every worker sharing the cache backend
+contributes to the same totals. They are exposed in Prometheus text format by
+the `metrics` view.
+
+Each process adds its increments up in memory and writes them to the cache at
+most once per METRICS_FLUSH_INTERVAL seconds (0 writes every increment), so
+a page-cache hit does not cost a cache write. Reads flush this process's
+pending counts first; other workers' lag by up to the interval.
+"""
+import atexit
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+KEY_PREFIX = "metrics:"
+
+# name -> help text; modules register their counters at import time
+_REGISTRY = {}
+
+_pending = Counter()
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def register(name, help_text=""):
+    """Declare a counter so it appears in the metrics output even at zero."""
+    _REGISTRY[name] = help_text
+    return name
+
+
+def incr(name, delta=1):
+    """Add `delta` to a counter, written to the cache with the next flush."""
+    with _lock:
+        _pending[name] += delta
+        due = time.monotonic() - _last_flush >= settings.METRICS_FLUSH_INTERVAL
+    if due:
+        flush()
+
+
+def flush():
+    """Write this process's pending counts to the cache."""
+    global _pending, _last_flush
+    with _lock:
+        pending, _pending = _pending, Counter()
+        _last_flush = time.monotonic()
+    for name, delta in pending.items():
+        _add(name, delta)
+
+
+atexit.register(flush)
+
+
+def _add(name, delta):
+    """Atomically add `delta` to a stored counter, creating it if needed."""
+    key = KEY_PREFIX + name
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # Key missing: add() only succeeds for one racer, the rest retry incr()
+        if not cache.add(key, delta, None):
+            cache.incr(key, delta)
+
+
+def get(name):
+    flush()
+    return cache.get(KEY_PREFIX + name, 0)
+
+
+def snapshot():
+    """Return {name: value} for every registered counter."""
+    flush()
+    values = cache.get_many([KEY_PREFIX + name for name in _REGISTRY])
+    return {name: values.get(KEY_PREFIX + name, 0) for name in sorted(_REGISTRY)}
+
+
+def render_prometheus():
+    lines = []
+    for name, value in snapshot().items():
+        help_text = _REGISTRY.get(name)
+        if help_text:
+            lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
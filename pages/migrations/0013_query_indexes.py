@@ -0,0 +1,29 @@
+# Generated by Django 5.0.3 on 2026-10-18 08:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0012_bookingsubmission'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='availabilityslot',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['date', 'start_time'], name='slot_available_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=models.Index(condition=models.Q(('published', True)), fields=['-published_at', '-id'], name='blogpost_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookingsubmission',
+            index=models.Index(fields=['-created_at'], name='bookingsub_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='casestudy',
+            index=models.Index(condition=models.Q(('published', True)), fields=['-published_at', '-id'], name='casestudy_published_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_bounds(apps, schema_editor):
+    AvailabilitySlot = apps.get_model("pages", "AvailabilitySlot")
+    slots = list(AvailabilitySlot.objects.all())
+    for slot in slots:
+        slot.starts_at = timezone.make_aware(datetime.combine(slot.date, slot.start_time))
+        slot.ends_at = timezone.make_aware(datetime.combine(slot.date, slot.end_time))
+    AvailabilitySlot.objects.bulk_update(slots, ["starts_at", "ends_at"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0013_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='availabilityslot',
+            name='starts_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='availabilityslot',
+            name='ends_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='availabilityslot',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Set by sweep_slots once the slot has ended', null=True),
+        ),
+        migrations.RunPython(fill_bounds, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='availabilityslot',
+            name='starts_at',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='availabilityslot',
+            name='ends_at',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='availabilityslot',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True)), fields=['ends_at'], name='slot_current_ends_idx'),
+        ),
+    ]
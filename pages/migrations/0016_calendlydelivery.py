@@ -0,0 +1,36 @@
+# Generated by Django 5.0.3 on 2026-10-18 08:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0015_outboundemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendlyDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(editable=False, help_text='SHA-256 of the raw body', max_length=64, unique=True)),
+                ('body', models.TextField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Applied'), ('failed', 'Could not be applied')], default='pending', max_length=10)),
+                ('event', models.CharField(blank=True, help_text='e.g. invitee.created', max_length=60)),
+                ('calendly_id', models.CharField(blank=True, db_index=True, max_length=120)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('claim', models.CharField(blank=True, editable=False, help_text='Worker run currently applying this delivery', max_length=32)),
+                ('last_error', models.TextField(blank=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Calendly Delivery',
+                'verbose_name_plural': 'Calendly Deliveries',
+                'ordering': ['-received_at'],
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['next_attempt_at'], name='calendly_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,72 @@
+import html
+import re
+
+from django.db import migrations
+from django.utils.html import strip_tags
+
+# Frozen copies of what pages/search.py did when this migration was written,
+# so later changes to that module cannot change what this migration does.
+BLOG, CASE, PRACTICE_AREA = 1, 2, 3
+SPACE = re.compile(r"\s+")
+
+
+def strip_html(value):
+    return SPACE.sub(" ", html.unescape(strip_tags(re.sub(r"<", " <", value or "")))).strip()
+
+
+def documents(apps):
+    """(rowid, kind, url, public, title, summary, body) for every object."""
+    for obj in apps.get_model("pages", "BlogPost").objects.iterator():
+        yield (obj.pk * 4 + BLOG, BLOG, f"/blog/{obj.slug}/", int(obj.published), obj.title, obj.summary,
+               strip_html(obj.body))
+    for obj in apps.get_model("pages", "CaseStudy").objects.iterator():
+        summary = f"{obj.summary} {obj.outcome}".strip() if obj.outcome else obj.summary
+        yield (obj.pk * 4 + CASE, CASE, f"/cases/{obj.slug}/", int(obj.published), obj.title, summary,
+               strip_html(obj.body))
+    for obj in apps.get_model("pages", "PracticeArea").objects.iterator():
+        yield (obj.pk * 4 + PRACTICE_AREA, PRACTICE_AREA, f"/practice-areas/{obj.slug}/", 1, obj.name,
+               obj.short_summary, strip_html(obj.body or obj.description))
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE pages_search USING fts5("
+            "kind UNINDEXED, url UNINDEXED, public UNINDEXED, title, summary, body, "
+            "tokenize = 'porter unicode61 remove_diacritics 2')"
+        )
+        insert = ("INSERT INTO pages_search (rowid, kind, url, public, title, summary, body) "
+                  "VALUES (%s, %s, %s, %s, %s, %s, %s)")
+    elif vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE TABLE pages_search ("
+            "id bigint PRIMARY KEY, kind smallint NOT NULL, url text NOT NULL, public smallint NOT NULL, "
+            "title text NOT NULL, summary text NOT NULL, body text NOT NULL, "
+            "document tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('english', title), 'A') || "
+            "setweight(to_tsvector('english', summary), 'B') || "
+            "setweight(to_tsvector('english', body), 'D')) STORED)"
+        )
+        schema_editor.execute("CREATE INDEX pages_search_document_idx ON pages_search USING gin (document)")
+        insert = ("INSERT INTO pages_search (id, kind, url, public, title, summary, body) "
+                  "VALUES (%s, %s, %s, %s, %s, %s, %s)")
+    else:
+        return  # no full-text index for this backend; search returns nothing
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(insert, list(documents(apps)))
+
+
+def drop_search_index(apps, schema_editor):
+    schema_editor.execute("DROP TABLE IF EXISTS pages_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0016_calendlydelivery'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,109 @@
+import html
+import re
+
+from django.db import migrations
+from django.utils.html import strip_tags
+
+# Frozen copies of what pages/retrieval.py did when this migration was written,
+# so later changes to that module cannot change what this migration does.
+BLOG, CASE, PRACTICE_AREA, SITE_PAGE = 1, 2, 3, 4
+SITE_PAGE_URLS = {"about": "/about/", "privacy": "/privacy/", "terms": "/terms/"}
+CHUNK_WORDS = 120
+MAX_CHUNKS = 1024
+
+BLOCK_END = re.compile(r"</(?:p|div|li|h[1-6]|blockquote|tr|section)\s*>|<br\s*/?>", re.IGNORECASE)
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+SPACE = re.compile(r"[ \t\r\f\v]+")
+
+
+def paragraphs(value):
+    text = html.unescape(strip_tags(BLOCK_END.sub("\n", value or "")))
+    return [SPACE.sub(" ", line).strip() for line in text.split("\n") if line.strip()]
+
+
+def chunk_text(paras):
+    pieces = []
+    for para in paras:
+        if len(para.split()) <= CHUNK_WORDS:
+            pieces.append(para)
+        else:
+            pieces.extend(SENTENCE_END.split(para))
+
+    chunks, current, count = [], [], 0
+    for piece in pieces:
+        words = len(piece.split())
+        if current and count + words > CHUNK_WORDS:
+            chunks.append("\n".join(current))
+            current, count = [], 0
+        if words > CHUNK_WORDS:
+            split = piece.split()
+            for start in range(0, len(split), CHUNK_WORDS):
+                chunks.append(" ".join(split[start:start + CHUNK_WORDS]))
+            continue
+        current.append(piece)
+        count += words
+    if current:
+        chunks.append("\n".join(current))
+    return chunks[:MAX_CHUNKS]
+
+
+def documents(apps):
+    """(kind, pk, title, url, [chunk text]) for every retrievable object."""
+    for obj in apps.get_model("pages", "BlogPost").objects.filter(published=True).iterator():
+        paras = [obj.summary, *paragraphs(obj.body)]
+        yield BLOG, obj.pk, obj.title, f"/blog/{obj.slug}/", chunk_text([p for p in paras if p])
+    for obj in apps.get_model("pages", "CaseStudy").objects.filter(published=True).iterator():
+        paras = [obj.summary, *paragraphs(obj.body)]
+        if obj.outcome:
+            paras.append(f"Outcome: {obj.outcome}")
+        yield CASE, obj.pk, obj.title, f"/cases/{obj.slug}/", chunk_text([p for p in paras if p])
+    for obj in apps.get_model("pages", "PracticeArea").objects.iterator():
+        paras = [obj.short_summary, *paragraphs(obj.body or obj.description)]
+        yield (PRACTICE_AREA, obj.pk, obj.name, f"/practice-areas/{obj.slug}/",
+               chunk_text([p for p in paras if p]))
+    for obj in apps.get_model("pages", "SitePage").objects.filter(slug__in=SITE_PAGE_URLS).iterator():
+        yield SITE_PAGE, obj.pk, obj.title, SITE_PAGE_URLS[obj.slug], chunk_text(paragraphs(obj.body))
+
+
+def create_chunk_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE pages_assistant_chunks USING fts5("
+            "url UNINDEXED, title, body, tokenize = 'porter unicode61 remove_diacritics 2')"
+        )
+        insert = "INSERT INTO pages_assistant_chunks (rowid, url, title, body) VALUES (%s, %s, %s, %s)"
+    elif vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE TABLE pages_assistant_chunks ("
+            "id bigint PRIMARY KEY, url text NOT NULL, title text NOT NULL, body text NOT NULL, "
+            "document tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('english', title), 'A') || "
+            "setweight(to_tsvector('english', body), 'D')) STORED)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX pages_assistant_chunks_document_idx ON pages_assistant_chunks USING gin (document)"
+        )
+        insert = "INSERT INTO pages_assistant_chunks (id, url, title, body) VALUES (%s, %s, %s, %s)"
+    else:
+        return  # no full-text index for this backend; the assistant gets the site map only
+    rows = [((pk * 8 + kind) * MAX_CHUNKS + n, url, title, text)
+            for kind, pk, title, url, chunks in documents(apps)
+            for n, text in enumerate(chunks)]
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(insert, rows)
+
+
+def drop_chunk_index(apps, schema_editor):
+    schema_editor.execute("DROP TABLE IF EXISTS pages_assistant_chunks")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0017_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_chunk_index, drop_chunk_index),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.0.3 on 2026-10-18 08:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0018_assistant_chunks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='hero_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='hero_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='hero_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='casestudy',
+            name='hero_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='casestudy',
+            name='hero_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='casestudy',
+            name='hero_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='sitepage',
+            name='hero_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='sitepage',
+            name='hero_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='sitepage',
+            name='hero_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
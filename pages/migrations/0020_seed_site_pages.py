@@ -0,0 +1,34 @@
+from django.db import migrations
+
+# A copy of SITE_PAGE_DEFAULTS (pages/models.py) as it was when this ran
+SITE_PAGES = {
+    "about": {"title": "About", "body": ""},
+    "privacy": {
+        "title": "Privacy Policy",
+        "body": "<p>This is a placeholder privacy policy. Please update this content from the Owner area.</p>",
+    },
+    "terms": {
+        "title": "Terms of Use",
+        "body": "<p>This is a placeholder terms of use. Please update this content from the Owner area.</p>",
+    },
+}
+
+
+def seed(apps, schema_editor):
+    """Create the rows public pages read, which their GET views used to create on first visit."""
+    HomepageSettings = apps.get_model("pages", "HomepageSettings")
+    SitePage = apps.get_model("pages", "SitePage")
+    HomepageSettings.objects.get_or_create(pk=1)
+    for slug, defaults in SITE_PAGES.items():
+        SitePage.objects.get_or_create(slug=slug, defaults=defaults)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0019_hero_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-18 09:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0020_seed_site_pages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendlydelivery',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, help_text='Failed attempts to apply it'),
+        ),
+    ]
@@ -1,4 +1,7 @@
+from datetime import datetime
+
 from django.db import models
+from django.utils import timezone
 from django.urls import reverse
 from ckeditor.fields import RichTextField
 
@@ -57,6 +60,20 @@ class TimeStamped(models.Model):
     class Meta:
         abstract = True
 
+# Pages every install has; seeded by migration 0020 and restored with these
+# values if the owner area is opened after one was deleted
+SITE_PAGE_DEFAULTS = {
+    "about": {"title": "About", "body": ""},
+    "privacy": {
+        "title": "Privacy Policy",
+        "body": "<p>This is a placeholder privacy policy. Please update this content from the Owner area.</p>",
+    },
+    "terms": {
+        "title": "Terms of Use",
+        "body": "<p>This is a placeholder terms of use. Please update this content from the Owner area.</p>",
+    },
+}
+
 class SitePage(TimeStamped):
     """
     Simple CMS pages like About, Privacy, Terms.
@@ -66,18 +83,13 @@ class SitePage(TimeStamped):
     title = models.CharField(max_length=180)
     body = RichTextField(blank=True)
     hero_image = models.ImageField(upload_to="pages/", blank=True)
+    # filled in by pages/images.py after hero_image is saved
+    hero_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    hero_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    hero_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self): return self.title
 
-    @classmethod
-    def get_or_create_page(cls, slug, title, body=""):
-        """Convenience method to get or create a site page with defaults."""
-        page, created = cls.objects.get_or_create(
-            slug=slug,
-            defaults={"title": title, "body": body}
-        )
-        return page
-
 class PracticeArea(models.Model):
     name = models.CharField(max_length=120)
     slug = models.SlugField(unique=True)
@@ -101,12 +113,24 @@ class PostBase(TimeStamped):
     summary = models.TextField(blank=True)
     body = RichTextField()
     hero_image = models.ImageField(upload_to="posts/", blank=True)
+    # filled in by pages/images.py after hero_image is saved
+    hero_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    hero_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    hero_variants = models.JSONField(default=dict, blank=True, editable=False)
     published = models.BooleanField(default=True)
     published_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         abstract = True
         ordering = ["-published_at", "-created_at"]
+        indexes = [
+            # public lists: filter(published=True).order_by("-published_at", "-id").
+            # Partial, because Django compiles published=True to a bare
+            # `WHERE "published"`, which SQLite can only match to an index
+            # with the same condition.
+            models.Index(fields=["-published_at", "-id"], condition=models.Q(published=True),
+                         name="%(class)s_published_idx"),
+        ]
 
     def __str__(self): return self.title
 
@@ -128,6 +152,20 @@ class CaseStudy(PostBase):
     def get_absolute_url(self):
         return reverse("case_detail", args=[self.slug])
 
+class AvailabilitySlotQuerySet(models.QuerySet):
+    def bookable(self, now=None):
+        """Available slots that have not started yet."""
+        return self.filter(is_available=True, starts_at__gt=now or timezone.now())
+
+    def past(self, now=None):
+        """Slots that have already ended."""
+        return self.filter(ends_at__lte=now or timezone.now())
+
+    def current(self):
+        """Slots not yet archived by the sweep_slots command."""
+        return self.filter(archived_at__isnull=True)
+
+
 class AvailabilitySlot(models.Model):
     """
     Represents owner-defined availability windows for consultations.
@@ -142,6 +180,10 @@ class AvailabilitySlot(models.Model):
     date = models.DateField(help_text="Date of availability")
     start_time = models.TimeField(help_text="Start time (e.g., 14:00)")
     end_time = models.TimeField(help_text="End time (e.g., 15:00)")
+    # date + start/end time as aware datetimes, kept in step by save() so
+    # "has it started/ended" checks are plain indexed comparisons in SQL
+    starts_at = models.DateTimeField(editable=False)
+    ends_at = models.DateTimeField(editable=False)
     slot_type = models.CharField(
         max_length=50,
         choices=SLOT_TYPE_CHOICES,
@@ -153,40 +195,53 @@ class AvailabilitySlot(models.Model):
         help_text="Whether this slot is currently bookable"
     )
     notes = models.TextField(blank=True, help_text="Internal notes (not visible to public)")
+    archived_at = models.DateTimeField(null=True, blank=True, editable=False,
+                                       help_text="Set by sweep_slots once the slot has ended")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = AvailabilitySlotQuerySet.as_manager()
+
     class Meta:
         ordering = ['date', 'start_time']
+        indexes = [
+            # booking pages: filter(is_available=True, date__gte/date=...).order_by("date", "start_time")
+            models.Index(fields=["date", "start_time"], condition=models.Q(is_available=True),
+                         name="slot_available_date_idx"),
+            # past() and the sweep
+            models.Index(fields=["ends_at"], condition=models.Q(archived_at__isnull=True),
+                         name="slot_current_ends_idx"),
+        ]
         verbose_name = "Availability Slot"
         verbose_name_plural = "Availability Slots"
 
     def __str__(self):
         return f"{self.date} {self.start_time.strftime('%H:%M')}-{self.end_time.strftime('%H:%M')} ({self.get_slot_type_display()})"
 
+    @staticmethod
+    def bounds(date, start_time, end_time):
+        """(starts_at, ends_at) in the site's time zone for a date and times."""
+        return (timezone.make_aware(datetime.combine(date, start_time)),
+                timezone.make_aware(datetime.combine(date, end_time)))
+
+    def save(self, *args, **kwargs):
+        self.starts_at, self.ends_at = self.bounds(self.date, self.start_time, self.end_time)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"date", "start_time", "end_time"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "starts_at", "ends_at"}
+        super().save(*args, **kwargs)
+
     def get_formatted_time(self):
         """Returns formatted time range for display (e.g., '2:00 PM - 3:00 PM')"""
-        from datetime import datetime
-        start = datetime.combine(self.date, self.start_time)
-        end = datetime.combine(self.date, self.end_time)
-        return f"{start.strftime('%-I:%M %p')} - {end.strftime('%-I:%M %p')}"
+        return f"{self.start_time.strftime('%-I:%M %p')} - {self.end_time.strftime('%-I:%M %p')}"
 
     def duration_minutes(self):
         """Calculate duration in minutes from start and end times"""
-        from datetime import datetime, timedelta
-        start_dt = datetime.combine(self.date, self.start_time)
-        end_dt = datetime.combine(self.date, self.end_time)
-        delta = end_dt - start_dt
-        return int(delta.total_seconds() / 60)
+        return int((self.ends_at - self.starts_at).total_seconds() // 60)
 
     def is_in_past(self):
         """Check if this slot's date/time has already passed"""
-        from datetime import datetime
-        from django.utils import timezone
-        slot_datetime = datetime.combine(self.date, self.end_time)
-        # Make timezone-aware
-        slot_datetime = timezone.make_aware(slot_datetime)
-        return timezone.now() > slot_datetime
+        return timezone.now() > self.ends_at
 
 class BookingSubmission(models.Model):
     """
@@ -208,8 +263,98 @@ class BookingSubmission(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=["-created_at"], name="bookingsub_created_idx"),
+        ]
         verbose_name = "Booking Submission"
         verbose_name_plural = "Booking Submissions"
 
     def __str__(self):
-        return f"{self.name} – {self.slot.date} {self.slot.start_time.strftime('%H:%M')}"
\ No newline at end of file
+        return f"{self.name} – {self.slot.date} {self.slot.start_time.strftime('%H:%M')}"
+
+class OutboundEmail(models.Model):
+    """
+    Email waiting to be sent by the send_outbox worker (see pages/outbox.py).
+    Views queue messages here instead of talking to SMTP during the request.
+    """
+    PENDING = "pending"
+    SENT = "sent"
+    DEAD = "dead"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (SENT, "Sent"),
+        (DEAD, "Failed permanently"),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    to = models.TextField(help_text="Comma-separated recipient addresses")
+    reply_to = models.CharField(max_length=254, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claim = models.CharField(max_length=32, blank=True, editable=False,
+                             help_text="Worker run currently sending this message")
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            # the worker's "due messages" query
+            models.Index(fields=["next_attempt_at"], condition=models.Q(status="pending"),
+                         name="outbox_due_idx"),
+        ]
+        verbose_name = "Outbound Email"
+        verbose_name_plural = "Outbound Emails"
+
+    def __str__(self):
+        return f"{self.subject} → {self.to} ({self.get_status_display()})"
+
+    def recipients(self):
+        return [address.strip() for address in self.to.split(",") if address.strip()]
+
+class CalendlyDelivery(models.Model):
+    """
+    A verified Calendly webhook delivery, stored raw by the webhook view and
+    applied to Booking later by the process_calendly worker (see
+    pages/calendly.py). Keyed by a hash of the body, so Calendly's retries of
+    the same delivery are stored once.
+    """
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (DONE, "Applied"),
+        (FAILED, "Could not be applied"),
+    ]
+
+    digest = models.CharField(max_length=64, unique=True, editable=False,
+                              help_text="SHA-256 of the raw body")
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    event = models.CharField(max_length=60, blank=True, help_text="e.g. invitee.created")
+    calendly_id = models.CharField(max_length=120, blank=True, db_index=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claim = models.CharField(max_length=32, blank=True, editable=False,
+                             help_text="Worker run currently applying this delivery")
+    attempts = models.PositiveIntegerField(default=0, help_text="Failed attempts to apply it")
+    last_error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-received_at"]
+        indexes = [
+            # the worker's "due deliveries" query
+            models.Index(fields=["next_attempt_at"], condition=models.Q(status="pending"),
+                         name="calendly_due_idx"),
+        ]
+        verbose_name = "Calendly Delivery"
+        verbose_name_plural = "Calendly Deliveries"
+
+    def __str__(self):
+        return f"{self.event or 'delivery'} {self.calendly_id} ({self.get_status_display()})"
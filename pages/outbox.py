@@ -0,0 +1,131 @@
+"""
+Database-backed outbox for site email.
+
+Views call enqueue(), which only inserts an OutboundEmail row, so a slow or
+unreachable SMTP server never holds up a visitor. The send_outbox management
+command drains due messages in batches over one reused connection:
+
+- a batch is claimed with a single UPDATE, guarded by the due conditions,
+  that stamps the worker's token on the due rows and pushes their
+  next_attempt_at out by CLAIM_LEASE, so two workers never send the same
+  message and a crashed worker's batch is picked up again once the lease
+  expires;
+- a failed send is retried with exponential backoff (OUTBOX_RETRY_BASE
+  doubling up to OUTBOX_RETRY_CAP seconds, with jitter);
+- after OUTBOX_MAX_ATTEMPTS failures the message is dead-lettered (status
+  "dead") and kept, with its last error, for inspection or a manual retry
+  from the admin.
+"""
+import random
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from . import metrics
+from .models import OutboundEmail
+
+SENT = metrics.register("outbox_sent_total", "Queued emails delivered")
+FAILED = metrics.register("outbox_failures_total", "Email delivery attempts that failed")
+DEAD = metrics.register("outbox_dead_total", "Queued emails given up on after repeated failures")
+
+CLAIM_LEASE = timedelta(minutes=10)
+
+
+def enqueue(subject, body, to, reply_to="", from_email=None):
+    """Queue an email for the outbox worker; `to` is an address or a list of them."""
+    if isinstance(to, str):
+        to = [to]
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=", ".join(to),
+        reply_to=reply_to,
+    )
+
+
+def retry_delay(attempts):
+    """Backoff before attempt number `attempts + 1`, with +/-20% jitter."""
+    delay = min(settings.OUTBOX_RETRY_CAP, settings.OUTBOX_RETRY_BASE * 2 ** (attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim_batch(size, now=None):
+    """Claim up to `size` due messages for this worker; returns them oldest first."""
+    now = now or timezone.now()
+    token = uuid.uuid4().hex
+    due = (OutboundEmail.objects
+           .filter(status=OutboundEmail.PENDING, next_attempt_at__lte=now)
+           .order_by("next_attempt_at")
+           .values("pk")[:size])
+    _claim(due, token, now)
+    return list(OutboundEmail.objects.filter(claim=token).order_by("created_at"))
+
+
+def _claim(ids, token, now):
+    """Stamp `token` on those of `ids` that are still due; returns how many."""
+    # The due conditions are repeated on the UPDATE itself: under READ
+    # COMMITTED (PostgreSQL) two workers can select the same ids, and the
+    # second UPDATE re-checks them against the first one's committed claim
+    return (OutboundEmail.objects
+            .filter(pk__in=ids, status=OutboundEmail.PENDING, next_attempt_at__lte=now)
+            .update(claim=token, next_attempt_at=now + CLAIM_LEASE))
+
+
+def _failed(message, error, now):
+    message.attempts += 1
+    message.last_error = f"{type(error).__name__}: {error}"[:2000]
+    metrics.incr(FAILED)
+    if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        message.status = OutboundEmail.DEAD
+        metrics.incr(DEAD)
+    else:
+        message.next_attempt_at = now + retry_delay(message.attempts)
+    message.claim = ""
+    message.save(update_fields=["attempts", "last_error", "status", "next_attempt_at", "claim"])
+
+
+def send_batch(size=None):
+    """Send one batch of due messages; returns (sent, failed)."""
+    messages = claim_batch(size or settings.OUTBOX_BATCH_SIZE)
+    if not messages:
+        return 0, 0
+
+    sent = failed = 0
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as exc:
+        # Server unreachable: the whole batch counts as one failed attempt
+        now = timezone.now()
+        for message in messages:
+            _failed(message, exc, now)
+        return 0, len(messages)
+
+    try:
+        for message in messages:
+            email = EmailMessage(
+                message.subject, message.body, message.from_email, message.recipients(),
+                reply_to=[message.reply_to] if message.reply_to else None,
+                connection=connection,
+            )
+            try:
+                email.send()
+            except Exception as exc:
+                _failed(message, exc, timezone.now())
+                failed += 1
+                continue
+            message.status = OutboundEmail.SENT
+            message.attempts += 1
+            message.sent_at = timezone.now()
+            message.claim = ""
+            message.last_error = ""
+            message.save(update_fields=["status", "attempts", "sent_at", "claim", "last_error"])
+            metrics.incr(SENT)
+            sent += 1
+    finally:
+        connection.close()
+    return sent, failed
@@ -0,0 +1,88 @@
+"""
+Full-response cache for public CMS pages.
+
+Cache keys combine the request path and its QUERY_PARAMS with a global
+content version; other query strings (tracking tags, cache busters) share the
+entry of the bare page instead of filling the cache. Saving or deleting CMS
+content bumps the version (see pages/signals.py), which orphans every cached
+page at once; stale entries simply age out of the cache.
+A cache hit rebuilds the response from stored bytes without touching the ORM
+or the template engine.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.http import urlencode
+
+from . import metrics
+from .cache_versions import get_version, bump_version
+
+VERSION_NAME = "page_cache"
+# Query parameters that change what a cached page renders (list cursors)
+QUERY_PARAMS = ("cursor", "page")
+
+HITS = metrics.register("page_cache_hits_total", "Public pages served from the page cache")
+MISSES = metrics.register("page_cache_misses_total", "Public pages rendered because no cached copy existed")
+BYPASSES = metrics.register("page_cache_bypass_total", "Requests that skipped the page cache (non-GET or session cookie)")
+INVALIDATIONS = metrics.register("page_cache_invalidations_total", "Content version bumps triggered by CMS changes")
+
+
+def get_content_version():
+    return get_version(VERSION_NAME)
+
+
+def bump_content_version():
+    """Invalidate every cached page by moving to a new content version."""
+    bump_version(VERSION_NAME)
+    metrics.incr(INVALIDATIONS)
+
+
+def _cache_key(request, version):
+    params = [(name, request.GET[name]) for name in QUERY_PARAMS if name in request.GET]
+    url = request.path + ("?" + urlencode(params) if params else "")
+    digest = hashlib.sha256(url.encode()).hexdigest()
+    return f"page_cache:v{version}:{digest}"
+
+
+def _is_cacheable_request(request):
+    if request.method not in ("GET", "HEAD"):
+        return False
+    # Visitors with a session may be logged-in staff (nav shows the Owner link)
+    # or have pending flash messages, so they always get a fresh render.
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return False
+    return True
+
+
+def cache_public_page(view_func):
+    """Serve anonymous GETs of a public page from the versioned page cache."""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        timeout = settings.PAGE_CACHE_TIMEOUT
+        if not timeout or not _is_cacheable_request(request):
+            metrics.incr(BYPASSES)
+            return view_func(request, *args, **kwargs)
+
+        key = _cache_key(request, get_content_version())
+        entry = cache.get(key)
+        if entry is not None:
+            metrics.incr(HITS)
+            response = HttpResponse(entry["content"], status=entry["status"],
+                                    content_type=entry["content_type"])
+            response["X-Page-Cache"] = "hit"
+            return response
+
+        metrics.incr(MISSES)
+        response = view_func(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming and not response.cookies:
+            cache.set(key, {
+                "content": response.content,
+                "status": response.status_code,
+                "content_type": response["Content-Type"],
+            }, timeout)
+        response["X-Page-Cache"] = "miss"
+        return response
+    return wrapper
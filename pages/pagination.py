@@ -0,0 +1,70 @@
+"""
+Keyset ("load more") pagination for the published post lists.
+
+Lists are ordered newest first on (published_at, id). Instead of an OFFSET,
+the next page starts strictly after the last row shown, identified by an
+opaque cursor holding that row's (published_at, id). Each page is then an
+index range read of `per_page + 1` rows however deep the reader goes, and
+rows published in the meantime do not shift later pages.
+
+Posts without a published_at sort after all dated ones (SQLite's order for
+NULLs in a descending sort), newest id first.
+"""
+import base64
+import json
+from collections import namedtuple
+
+from django.utils.dateparse import parse_datetime
+
+KeysetPage = namedtuple("KeysetPage", ["items", "next_cursor"])
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(obj):
+    published_at = obj.published_at.isoformat() if obj.published_at else None
+    raw = json.dumps([published_at, obj.pk], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Cursor string -> (published_at or None, id)."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        published_at, pk = json.loads(raw)
+        if published_at is not None:
+            published_at = parse_datetime(published_at)
+            if published_at is None:
+                raise ValueError
+        return published_at, int(pk)
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+
+
+def paginate(queryset, cursor=None, per_page=12):
+    """
+    One page of `queryset` (already filtered and ordered by -published_at, -id)
+    starting after `cursor`. Raises InvalidCursor for a malformed cursor.
+    """
+    limit = per_page + 1  # one extra row tells us whether there is a next page
+    if not cursor:
+        items = list(queryset[:limit])
+    else:
+        published_at, pk = decode_cursor(cursor)
+        if published_at is None:
+            items = list(queryset.filter(published_at__isnull=True, pk__lt=pk)[:limit])
+        else:
+            # Written as a range plus an exclusion (rather than an OR) so the
+            # database can seek straight to the cursor in the index.
+            items = list(queryset.filter(published_at__lte=published_at)
+                         .exclude(published_at=published_at, pk__gte=pk)[:limit])
+            if len(items) < limit:
+                # past the last dated post: continue with the undated ones
+                items += queryset.filter(published_at__isnull=True)[:limit - len(items)]
+
+    if len(items) > per_page:
+        items = items[:per_page]
+        return KeysetPage(items, encode_cursor(items[-1]))
+    return KeysetPage(items, None)
@@ -0,0 +1,148 @@
+"""
+Token-budgeted prompt assembly for the assistant.
+
+The widget sends the whole conversation as `history` with every message, and
+the client controls it, so nothing from it is trusted:
+
+- clean_history() keeps only {"role": "user"|"assistant", "content": str}
+  turns (a client cannot smuggle in a "system" turn), drops the copy of the
+  current message the widget appends, and cuts any single turn down to
+  ASSISTANT_MAX_MESSAGE_TOKENS;
+- build() puts the system message and the visitor's message first, then adds
+  history turns newest first while they fit in ASSISTANT_PROMPT_TOKENS. Turns
+  that don't fit are replaced by a short summary of the questions asked in
+  them, so a long conversation keeps its thread without its full text.
+
+Tokens are estimated locally (no tokenizer download): words count one token
+each plus one per further six characters, punctuation one each, plus a small
+overhead per chat message. That is deliberately a little pessimistic for
+English, so the real prompt is not larger than the budget. The size of every
+prompt sent upstream is added to the assistant_prompt_tokens_total counter.
+"""
+import re
+from collections import namedtuple
+
+from django.conf import settings
+
+from . import metrics
+
+PROMPT_TOKENS = metrics.register("assistant_prompt_tokens_total", "Estimated prompt tokens sent to the LLM")
+TURNS_DROPPED = metrics.register("assistant_history_turns_dropped_total",
+                                 "History turns summarised away to fit the prompt budget")
+
+ROLES = ("user", "assistant")
+MAX_TURNS = 20             # history entries looked at, newest first
+MESSAGE_OVERHEAD = 4       # role and separators around each chat message
+SUMMARY_TOKENS = 150
+SUMMARY_WORDS = 20         # words kept from each summarised question
+
+Prompt = namedtuple("Prompt", ["messages", "history", "tokens", "dropped"])
+
+_TOKEN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+# The widget appends formatting instructions to every visitor message
+_WIDGET_SUFFIX = re.compile(r"\s*\[System:.*\]\s*$", re.S)
+
+
+def estimate_tokens(text):
+    """Approximate token count of `text` for a BPE tokenizer."""
+    return sum(1 + (len(piece) - 1) // 6 for piece in _TOKEN.findall(text or ""))
+
+
+def message_tokens(message):
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD
+
+
+def truncate(text, max_tokens):
+    """`text` cut to about `max_tokens`, on a word boundary, with an ellipsis."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    kept, used = [], 0
+    for word in text.split():
+        cost = estimate_tokens(word)
+        if used + cost > max_tokens - 1:
+            break
+        kept.append(word)
+        used += cost
+    return " ".join(kept) + " …"
+
+
+def clean_history(history, user_msg):
+    """Well-formed user/assistant turns from client-supplied history, oldest first."""
+    if not isinstance(history, list):
+        return []
+    if history and isinstance(history[-1], dict) and history[-1].get("content") == user_msg:
+        history = history[:-1]  # the widget sends the current message in both
+
+    limit = settings.ASSISTANT_MAX_MESSAGE_TOKENS
+    turns = []
+    for entry in history[-MAX_TURNS:]:
+        if not isinstance(entry, dict):
+            continue
+        role, content = entry.get("role"), entry.get("content")
+        if role not in ROLES or not isinstance(content, str) or not content.strip():
+            continue
+        turns.append({"role": role, "content": truncate(content.strip(), limit)})
+    return turns
+
+
+def summarize(turns, max_tokens=SUMMARY_TOKENS):
+    """A one-paragraph note of the questions asked in `turns`, newest kept if space runs out."""
+    questions = []
+    for turn in turns:
+        if turn["role"] == "user":
+            question = _WIDGET_SUFFIX.sub("", turn["content"]).split()
+            text = " ".join(question[:SUMMARY_WORDS]) + (" …" if len(question) > SUMMARY_WORDS else "")
+            if text:
+                questions.append(f'"{text}"')
+    if not questions:
+        return ""
+    prefix = "Earlier in this conversation (not shown in full) the visitor asked: "
+    while questions:
+        summary = prefix + "; ".join(questions) + "."
+        if estimate_tokens(summary) <= max_tokens:
+            return summary
+        questions.pop(0)
+    return ""
+
+
+def build(system_message, user_msg, history, budget=None):
+    """
+    The chat messages for one assistant call, within `budget` tokens
+    (default ASSISTANT_PROMPT_TOKENS). `history` must come from clean_history().
+    """
+    budget = settings.ASSISTANT_PROMPT_TOKENS if budget is None else budget
+    system = {"role": "system", "content": system_message}
+    user = {"role": "user", "content": user_msg}
+    used = message_tokens(system) + message_tokens(user)
+
+    # Newest turns first; stop at the first one that doesn't fit so the
+    # kept history is a contiguous, most recent stretch of the conversation.
+    # Unless everything fits, leave room for the summary of what is dropped.
+    costs = [message_tokens(turn) for turn in history]
+    limit = budget if used + sum(costs) <= budget else budget - SUMMARY_TOKENS - MESSAGE_OVERHEAD
+    kept = []
+    for turn, cost in zip(reversed(history), reversed(costs)):
+        if used + cost > limit:
+            break
+        kept.insert(0, turn)
+        used += cost
+    dropped = history[:len(history) - len(kept)]
+    if kept and kept[0]["role"] == "assistant" and dropped:
+        # an answer whose question was dropped reads as out of context
+        dropped.append(kept.pop(0))
+        used -= message_tokens(dropped[-1])
+
+    messages = [system]
+    summary = summarize(dropped)
+    if summary:
+        messages.append({"role": "system", "content": summary})
+        used += estimate_tokens(summary) + MESSAGE_OVERHEAD
+    messages += kept + [user]
+    return Prompt(messages, kept, used, len(dropped))
+
+
+def record(prompt):
+    """Count a prompt that is being sent upstream."""
+    metrics.incr(PROMPT_TOKENS, prompt.tokens)
+    if prompt.dropped:
+        metrics.incr(TURNS_DROPPED, prompt.dropped)
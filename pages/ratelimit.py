@@ -0,0 +1,151 @@
+"""
+Shared, atomic rate limiting for public endpoints.
+
+Each limit ("3/30s") is enforced as a sliding window made of small time slots.
+A request first increments the counter for the current slot with cache.incr()
+and only then sums the slots still inside the window, so concurrent requests
+each see a distinct count and at most `limit` of them get through, whichever
+worker they land on. With the shared cache backend the limits are per node,
+not per process.
+
+This behaves like a token bucket of capacity `limit` refilled over `period`,
+but needs nothing beyond incr/add/get_many, which every Django cache backend
+supports atomically (an exact GCRA would need compare-and-set).
+
+Endpoints are configured in settings.RATE_LIMITS:
+
+    RATE_LIMITS = {
+        "assist": {"rates": ["3/30s"], "block": 10},
+        "contact": {"rates": ["5/10m", "20/1d"]},
+    }
+
+`block` (seconds) keeps a client locked out after it trips a limit.
+
+Clients are told apart by IP and user agent. Behind reverse proxies,
+settings.RATE_LIMIT_PROXY_HOPS says how many of them append to X-Forwarded-For.
+The address added by the outermost one is used, and anything a client puts
+before it is ignored.
+
+Only allowed requests count: a blocked request is rejected before touching the
+window, and one that trips a limit gives its increments back, so a client that
+keeps retrying is let in again as soon as its earlier requests age out.
+"""
+import hashlib
+import re
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+
+DENIED = metrics.register("ratelimit_denied_total", "Requests rejected by a rate limit")
+
+Rate = namedtuple("Rate", ["limit", "period"])
+Decision = namedtuple("Decision", ["allowed", "retry_after"])
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+_RATE_RE = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*([smhd])\s*$")
+
+SLOTS = 10  # sub-windows per period; more slots = smoother window, more keys
+
+
+def parse_rate(text):
+    """'3/30s' -> Rate(limit=3, period=30)."""
+    match = _RATE_RE.match(text)
+    if not match:
+        raise ValueError(f"Invalid rate {text!r}; expected e.g. '3/30s' or '20/1h'")
+    limit, count, unit = match.groups()
+    return Rate(int(limit), int(count or 1) * _UNITS[unit])
+
+
+def client_ip(request):
+    ip = request.META.get("REMOTE_ADDR", "unknown")
+    hops = settings.RATE_LIMIT_PROXY_HOPS
+    if hops:
+        forwarded = [part.strip() for part in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",")]
+        if len(forwarded) >= hops and forwarded[-hops]:
+            ip = forwarded[-hops]
+    return ip
+
+
+def client_key(request):
+    """Identify a client by IP and (truncated) user agent, hashed."""
+    ip = client_ip(request)
+    ua = request.META.get("HTTP_USER_AGENT", "")[:60]
+    return hashlib.sha256(f"{ip}|{ua}".encode()).hexdigest()
+
+
+def _incr(key, timeout):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if cache.add(key, 1, timeout):
+            return 1
+        return cache.incr(key)
+
+
+class RateLimiter:
+    def __init__(self, name, rates, block=0):
+        self.name = name
+        self.rates = [parse_rate(r) if isinstance(r, str) else r for r in rates]
+        self.block = block
+
+    def _block_key(self, ident):
+        return f"rl:{self.name}:{ident}:block"
+
+    def hit(self, ident, now=None):
+        """Count one request from `ident`; return a Decision."""
+        now = time.time() if now is None else now
+
+        if self.block:
+            blocked_until = cache.get(self._block_key(ident))
+            if blocked_until and blocked_until > now:
+                metrics.incr(DENIED)
+                return Decision(False, blocked_until - now)
+
+        retry_after = 0.0
+        counted = []
+        for index, rate in enumerate(self.rates):
+            slot_len = rate.period / SLOTS
+            slot = int(now // slot_len)
+            prefix = f"rl:{self.name}:{ident}:{index}:"
+            # Increment first, then read the rest of the window: the incr is the
+            # atomic step that orders concurrent requests.
+            count = _incr(prefix + str(slot), int(rate.period + slot_len) + 1)
+            counted.append(prefix + str(slot))
+            previous = cache.get_many([prefix + str(s) for s in range(slot - SLOTS + 1, slot)])
+            count += sum(previous.values())
+            if count > rate.limit:
+                retry_after = max(retry_after, (slot + 1) * slot_len - now)
+
+        if retry_after:
+            for key in counted:
+                try:
+                    cache.decr(key)
+                except ValueError:
+                    pass  # expired meanwhile
+            if self.block:
+                retry_after = max(retry_after, self.block)
+                cache.set(self._block_key(ident), now + self.block, self.block)
+            metrics.incr(DENIED)
+            return Decision(False, retry_after)
+        return Decision(True, 0.0)
+
+    def check(self, request):
+        return self.hit(client_key(request))
+
+
+def get_limiter(name):
+    """Limiter for the endpoint `name` as configured in settings.RATE_LIMITS."""
+    config = settings.RATE_LIMITS.get(name)
+    if not config:
+        return None
+    return RateLimiter(name, config.get("rates", []), config.get("block", 0))
+
+
+def is_limited(name, request):
+    """True if this request to endpoint `name` should be rejected."""
+    limiter = get_limiter(name)
+    return bool(limiter) and not limiter.check(request).allowed
@@ -0,0 +1,86 @@
+"""
+Recurring availability: expand a rule such as "weekdays 14:00-17:00 in
+30-minute blocks from A to B, except these dates" into AvailabilitySlots.
+
+The rule is expanded in memory, checked for overlaps against existing slots
+with a single date-range query, and the remaining slots are written with one
+bulk_create. plan() does everything except the write, which is what the owner
+area's preview shows.
+"""
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta
+
+from django.db import transaction
+
+from .availability import invalidate_availability
+from .models import AvailabilitySlot
+
+MAX_SLOTS = 2000  # refuse rules that would expand to more slots than this
+
+Rule = namedtuple("Rule", ["start_date", "end_date", "weekdays", "start_time", "end_time",
+                           "block_minutes", "skip_dates"])
+Candidate = namedtuple("Candidate", ["date", "start_time", "end_time"])
+Plan = namedtuple("Plan", ["new", "conflicts"])
+
+
+class RuleTooLarge(ValueError):
+    pass
+
+
+def expand(rule):
+    """All (date, start, end) blocks the rule describes, in date/time order."""
+    block = timedelta(minutes=rule.block_minutes)
+    skip = set(rule.skip_dates)
+    weekdays = set(rule.weekdays)
+    candidates = []
+    day = rule.start_date
+    while day <= rule.end_date:
+        if day.weekday() in weekdays and day not in skip:
+            start = datetime.combine(day, rule.start_time)
+            window_end = datetime.combine(day, rule.end_time)
+            while start + block <= window_end:
+                candidates.append(Candidate(day, start.time(), (start + block).time()))
+                if len(candidates) > MAX_SLOTS:
+                    raise RuleTooLarge(f"This rule creates more than {MAX_SLOTS} slots; use a shorter date range.")
+                start += block
+        day += timedelta(days=1)
+    return candidates
+
+
+def existing_by_date(start_date, end_date):
+    """{date: [(start, end), ...]} for every slot in the range, in one query."""
+    taken = defaultdict(list)
+    rows = (AvailabilitySlot.objects
+            .filter(date__gte=start_date, date__lte=end_date)
+            .values_list("date", "start_time", "end_time"))
+    for day, start, end in rows:
+        taken[day].append((start, end))
+    return taken
+
+
+def plan(rule):
+    """Expand `rule` and split the result into new slots and ones that overlap existing slots."""
+    candidates = expand(rule)
+    if not candidates:
+        return Plan([], [])
+    taken = existing_by_date(candidates[0].date, candidates[-1].date)
+    new, conflicts = [], []
+    for candidate in candidates:
+        overlaps = any(candidate.start_time < end and start < candidate.end_time
+                       for start, end in taken.get(candidate.date, ()))
+        (conflicts if overlaps else new).append(candidate)
+    return Plan(new, conflicts)
+
+
+def create_slots(candidates, slot_type, notes=""):
+    """Insert the candidates as available slots in one bulk_create; returns the count."""
+    slots = [AvailabilitySlot(date=c.date, start_time=c.start_time, end_time=c.end_time,
+                              slot_type=slot_type, notes=notes)
+             for c in candidates]
+    for slot in slots:  # bulk_create bypasses save(), which normally sets these
+        slot.starts_at, slot.ends_at = AvailabilitySlot.bounds(slot.date, slot.start_time, slot.end_time)
+    with transaction.atomic():
+        AvailabilitySlot.objects.bulk_create(slots, batch_size=500)
+        # bulk_create sends no post_save, so refresh the booking calendar here
+        transaction.on_commit(invalidate_availability)
+    return len(slots)
@@ -0,0 +1,53 @@
+"""
+Incremental redaction for streamed assistant replies.
+
+The upstream streams arbitrary token fragments, so an email address, phone
+number or PPS number can arrive split across several deltas. StreamRedactor
+holds back the tail of the text that could still be part of a match and only
+releases text up to a point no match can cross, then runs the normal
+redaction on it, so the concatenated output equals redacting the whole reply.
+"""
+import re
+
+# Characters a phone match can span (views._redact_personal allows spaces,
+# dashes and brackets between digits) and characters an email or PPS match
+# can span. Every match lies inside one unbroken run of one of these classes.
+_PHONE_CHARS = re.compile(r"[\d\s\-\(\)\+]")
+_WORD_CHARS = re.compile(r"[\w\.@\-]")
+
+
+def _joins(a, b, chars):
+    return bool(chars.match(a)) and (b is None or bool(chars.match(b)))
+
+
+class StreamRedactor:
+    def __init__(self, redact):
+        self.redact = redact
+        self._pending = ""
+
+    @staticmethod
+    def _safe_cut(text):
+        """
+        Index before which no match can still change: the last position not
+        inside a phone-character or word-character run. A run that reaches
+        the end of the text (b is None) may still grow with the next delta.
+        """
+        cut = len(text)
+        while cut > 0:
+            a, b = text[cut - 1], text[cut] if cut < len(text) else None
+            if not (_joins(a, b, _PHONE_CHARS) or _joins(a, b, _WORD_CHARS)):
+                break
+            cut -= 1
+        return cut
+
+    def feed(self, delta):
+        """Add a streamed fragment; return the redacted text now safe to emit."""
+        self._pending += delta
+        cut = self._safe_cut(self._pending)
+        ready, self._pending = self._pending[:cut], self._pending[cut:]
+        return self.redact(ready) if ready else ""
+
+    def flush(self):
+        """Return whatever is still buffered, redacted, at the end of the stream."""
+        ready, self._pending = self._pending, ""
+        return self.redact(ready) if ready else ""
@@ -0,0 +1,134 @@
+"""
+Cache of assistant replies for repeated questions.
+
+Two tiers, both stored in the shared cache:
+
+- Exact: keyed on the normalised user message, a hash of the recent history
+  and a scope made of the model, SYSTEM_PROMPT, the site map fingerprint
+  (pages/site_context.py) and the CMS content version. The passages retrieved
+  for the question are left out. Editing the prompt or any CMS content changes
+  the key, so stale answers are never served.
+- Near-duplicate (first turn only): a bounded, most-recently-used list of
+  cached questions per prompt/content scope. A new question whose character
+  shingles overlap an indexed one by at least
+  ASSISTANT_NEAR_DUPLICATE_THRESHOLD (Jaccard) reuses that answer, provided
+  both have the same significant words (retrieval.query_terms): "... about a
+  divorce" and "... about a will" overlap heavily but are different questions.
+
+Entries expire after ASSISTANT_RESPONSE_CACHE_TTL seconds and are otherwise
+evicted least-recently-used by the cache backend.
+"""
+import hashlib
+import json
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+from .page_cache import get_content_version
+from .retrieval import query_terms
+
+HITS = metrics.register("assistant_cache_hits_total", "Assistant replies served from the exact response cache")
+NEAR_HITS = metrics.register("assistant_cache_near_hits_total", "Assistant replies served from a near-duplicate question")
+MISSES = metrics.register("assistant_cache_misses_total", "Assistant questions that needed an LLM call")
+
+# The widget appends link-formatting instructions to every message; they carry
+# no meaning for matching questions.
+_SYSTEM_SUFFIX = re.compile(r"\s*\[System:.*\]\s*$", re.S)
+_NON_WORD = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+HISTORY_TURNS = 4      # trailing history entries that shape the key
+INDEX_SIZE = 200       # questions kept in the near-duplicate index
+SHINGLE_SIZE = 3
+
+
+def normalize(text):
+    text = _SYSTEM_SUFFIX.sub("", text or "")
+    text = _NON_WORD.sub(" ", text.lower())
+    return _SPACES.sub(" ", text).strip()
+
+
+def _digest(value):
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:24]
+
+
+def _prior_history(user_msg, history):
+    """History without the current message (the widget sends it in both)."""
+    if history and isinstance(history[-1], dict) and history[-1].get("content") == user_msg:
+        history = history[:-1]
+    return history[-HISTORY_TURNS:]
+
+
+def scope(system_prompt, site_fingerprint):
+    """Everything besides the conversation that can change an answer."""
+    return _digest(f"{settings.LLM_MODEL}|{get_content_version()}|{site_fingerprint}|{system_prompt}")
+
+
+def _exact_key(scope, question, history):
+    history_hash = _digest(json.dumps(
+        [[h.get("role"), normalize(str(h.get("content") or ""))] for h in history if isinstance(h, dict)],
+    ))
+    return f"assist_rc:{scope}:{history_hash}:{_digest(question)}"
+
+
+def shingles(text):
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def similarity(a, b):
+    sa, sb = shingles(a), shingles(b)
+    return len(sa & sb) / len(sa | sb) if sa and sb else 0.0
+
+
+def lookup(scope, user_msg, history):
+    """Return a cached reply for this turn (`scope` from scope()), or None."""
+    if not settings.ASSISTANT_RESPONSE_CACHE_TTL:
+        return None
+    question = normalize(user_msg)
+    prior = _prior_history(user_msg, history)
+
+    reply = cache.get(_exact_key(scope, question, prior))
+    if reply is not None:
+        metrics.incr(HITS)
+        return reply
+
+    threshold = settings.ASSISTANT_NEAR_DUPLICATE_THRESHOLD
+    if threshold and not prior and question:
+        index = cache.get(f"assist_rc:index:{scope}") or []
+        terms = set(query_terms(question))
+        best_key, best_score = None, threshold
+        for indexed_question, key in index:
+            score = similarity(question, indexed_question)
+            if score >= best_score and set(query_terms(indexed_question)) == terms:
+                best_key, best_score = key, score
+        if best_key:
+            reply = cache.get(best_key)
+            if reply is not None:
+                metrics.incr(NEAR_HITS)
+                return reply
+
+    metrics.incr(MISSES)
+    return None
+
+
+def store(scope, user_msg, history, reply):
+    """Cache a successful LLM reply for this turn."""
+    ttl = settings.ASSISTANT_RESPONSE_CACHE_TTL
+    if not ttl:
+        return
+    question = normalize(user_msg)
+    prior = _prior_history(user_msg, history)
+    key = _exact_key(scope, question, prior)
+    cache.set(key, reply, ttl)
+
+    if not prior and question:
+        # Best-effort most-recently-used index; a lost update under concurrent
+        # writes only costs a future near-duplicate hit.
+        index_key = f"assist_rc:index:{scope}"
+        index = [entry for entry in (cache.get(index_key) or []) if entry[0] != question]
+        index.insert(0, (question, key))
+        cache.set(index_key, index[:INDEX_SIZE], ttl)
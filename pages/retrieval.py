@@ -0,0 +1,259 @@
+"""
+Retrieval for the assistant: the passages of site content most relevant to
+a visitor's question, packed into a fixed token budget.
+
+Every published blog post, case study, practice area and site page is split
+into chunks of about CHUNK_WORDS words along paragraph boundaries, and the
+chunks are stored in `pages_assistant_chunks` (migration 0018): an FTS5
+table on SQLite, a `tsvector` table on PostgreSQL, like the site search index
+in pages/search.py. The receivers in signals.py re-chunk one object when it is
+saved; rows are keyed by `(object pk * 8 + kind) * MAX_CHUNKS + n`, so an
+object's chunks are one rowid range.
+
+At question time the message (plus the visitor's previous message, for
+follow-ups) becomes an OR query of its significant words, the best-ranked
+chunks are fetched, at most MAX_PER_DOCUMENT per page, and they are added
+to the prompt in rank order until ASSISTANT_CONTEXT_TOKENS is used up. The
+prompt stays small however much content the site has, and older posts are
+as reachable as new ones.
+"""
+import html
+import re
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connection
+from django.urls import reverse
+from django.utils.html import strip_tags
+
+from .models import BlogPost, CaseStudy, PracticeArea, SitePage
+from .prompt import estimate_tokens
+from .search import enabled
+
+TABLE = "pages_assistant_chunks"
+
+BLOG, CASE, PRACTICE_AREA, SITE_PAGE = 1, 2, 3, 4
+MODEL_KINDS = {"blogpost": BLOG, "casestudy": CASE, "practicearea": PRACTICE_AREA, "sitepage": SITE_PAGE}
+# SitePage slug -> URL name of the public page that renders it
+SITE_PAGE_URLS = {"about": "about", "privacy": "privacy", "terms": "terms"}
+
+CHUNK_WORDS = 120
+MAX_CHUNKS = 1024           # per object; rowid ranges are this wide
+MAX_PER_DOCUMENT = 2
+CANDIDATES = 12
+# candidates scoring below this fraction of the best one are noise from a
+# single common word (an OR query matches a lot) and are left out
+MIN_RELATIVE_SCORE = 0.3
+MAX_QUERY_TERMS = 16
+
+HEADER = "RELEVANT SITE CONTENT (excerpts; link to the URL given with each):"
+
+Chunk = namedtuple("Chunk", ["title", "url", "text"])
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers him his how i if in into is it its itself just me more most my no nor not
+now of off on once only or other our ours out over own same she should so some such than that the
+their theirs them then there these they this those through to too under until up very was we were
+what when where which while who whom why will with would you your yours hi hello thanks thank please
+tell know want need like get much many also may might must shall
+""".split())
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_BLOCK_END = re.compile(r"</(?:p|div|li|h[1-6]|blockquote|tr|section)\s*>|<br\s*/?>", re.IGNORECASE)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_SPACE = re.compile(r"[ \t\r\f\v]+")
+
+
+def paragraphs(value):
+    """Plain-text paragraphs from RichTextField HTML (or plain text)."""
+    text = html.unescape(strip_tags(_BLOCK_END.sub("\n", value or "")))
+    return [_SPACE.sub(" ", line).strip() for line in text.split("\n") if line.strip()]
+
+
+def chunk_text(paras, size=CHUNK_WORDS):
+    """Pack paragraphs into chunks of about `size` words; long paragraphs split at sentences."""
+    pieces = []
+    for para in paras:
+        if len(para.split()) <= size:
+            pieces.append(para)
+        else:
+            pieces.extend(_SENTENCE_END.split(para))
+
+    chunks, current, count = [], [], 0
+    for piece in pieces:
+        words = len(piece.split())
+        if current and count + words > size:
+            chunks.append("\n".join(current))
+            current, count = [], 0
+        if words > size:  # one very long sentence: hard split
+            split = piece.split()
+            for start in range(0, len(split), size):
+                chunks.append(" ".join(split[start:start + size]))
+            continue
+        current.append(piece)
+        count += words
+    if current:
+        chunks.append("\n".join(current))
+    return chunks[:MAX_CHUNKS]
+
+
+def kind_of(instance):
+    return MODEL_KINDS[instance._meta.model_name]
+
+
+def document(kind, obj):
+    """(title, url, [chunk text]) for an object, or None if it must not be retrieved."""
+    if kind == PRACTICE_AREA:
+        paras = [obj.short_summary, *paragraphs(obj.body or obj.description)]
+        return obj.name, reverse("practice_area_detail", args=[obj.slug]), chunk_text([p for p in paras if p])
+    if kind == SITE_PAGE:
+        if obj.slug not in SITE_PAGE_URLS:
+            return None  # not served at any public URL
+        return obj.title, reverse(SITE_PAGE_URLS[obj.slug]), chunk_text(paragraphs(obj.body))
+    if not obj.published:
+        return None
+    paras = [obj.summary, *paragraphs(obj.body)]
+    if kind == CASE and obj.outcome:
+        paras.append(f"Outcome: {obj.outcome}")
+    url = reverse("blog_detail" if kind == BLOG else "case_detail", args=[obj.slug])
+    return obj.title, url, chunk_text([p for p in paras if p])
+
+
+def _base(kind, pk):
+    return (pk * 8 + kind) * MAX_CHUNKS
+
+
+def _key_column():
+    return "rowid" if connection.vendor == "sqlite" else "id"
+
+
+def _rows(kind, obj):
+    doc = document(kind, obj)
+    if doc is None:
+        return []
+    title, url, chunks = doc
+    base = _base(kind, obj.pk)
+    return [(base + n, url, title, text) for n, text in enumerate(chunks)]
+
+
+def _insert(cursor, rows):
+    if rows:
+        cursor.executemany(
+            f"INSERT INTO {TABLE} ({_key_column()}, url, title, body) VALUES (%s, %s, %s, %s)", rows,
+        )
+
+
+def index(instance):
+    """Replace one object's chunks (removing them if it is unpublished)."""
+    if not enabled():
+        return
+    kind = kind_of(instance)
+    base = _base(kind, instance.pk)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE {_key_column()} BETWEEN %s AND %s",
+                       [base, base + MAX_CHUNKS - 1])
+        _insert(cursor, _rows(kind, instance))
+
+
+def remove(instance):
+    if not enabled():
+        return
+    base = _base(kind_of(instance), instance.pk)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE {_key_column()} BETWEEN %s AND %s",
+                       [base, base + MAX_CHUNKS - 1])
+
+
+def rebuild():
+    """Re-chunk all content from scratch; returns the number of chunks."""
+    if not enabled():
+        return 0
+    sources = [
+        (BLOG, BlogPost.objects.filter(published=True)),
+        (CASE, CaseStudy.objects.filter(published=True)),
+        (PRACTICE_AREA, PracticeArea.objects.all()),
+        (SITE_PAGE, SitePage.objects.all()),
+    ]
+    total = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+        for kind, queryset in sources:
+            for obj in queryset.iterator(chunk_size=200):
+                rows = _rows(kind, obj)
+                _insert(cursor, rows)
+                total += len(rows)
+        if connection.vendor == "sqlite":
+            cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+    return total
+
+
+def query_terms(text):
+    """Significant words of a question, in order, without duplicates."""
+    seen = []
+    for word in _WORD.findall(text.lower()):
+        if len(word) > 1 and word not in STOPWORDS and not word.isdigit() and word not in seen:
+            seen.append(word)
+    return seen[:MAX_QUERY_TERMS]
+
+
+def _candidates(terms, limit):
+    if connection.vendor == "sqlite":
+        sql = f"""
+            SELECT {_key_column()}, url, title, body, -bm25({TABLE}, 0, 3.0, 1.0) AS score
+            FROM {TABLE} WHERE {TABLE} MATCH %s ORDER BY score DESC LIMIT %s
+        """
+        params = [" OR ".join(f'"{term}"' for term in terms), limit]
+    else:
+        sql = f"""
+            SELECT id, url, title, body, ts_rank_cd(document, q) AS score
+            FROM {TABLE}, to_tsquery('english', %s) AS q
+            WHERE document @@ q ORDER BY score DESC LIMIT %s
+        """
+        params = [" | ".join(terms), limit]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def retrieve(question, previous="", budget=None):
+    """The most relevant Chunks for a question whose text fits within `budget` tokens."""
+    if not enabled():
+        return []
+    budget = settings.ASSISTANT_CONTEXT_TOKENS if budget is None else budget
+    terms = query_terms(f"{question} {previous}")
+    if not terms or budget <= 0:
+        return []
+
+    candidates = _candidates(terms, CANDIDATES)
+    if not candidates:
+        return []
+    floor = candidates[0][4] * MIN_RELATIVE_SCORE
+    chosen, per_document, used = [], {}, estimate_tokens(HEADER)
+    for key, url, title, body, score in candidates:
+        if score < floor:
+            break
+        document_key = key // MAX_CHUNKS
+        if per_document.get(document_key, 0) >= MAX_PER_DOCUMENT:
+            continue
+        chunk = Chunk(title, url, body)
+        cost = estimate_tokens("\n\n" + format_chunk(chunk))
+        if used + cost > budget:
+            continue  # a shorter, lower-ranked chunk may still fit
+        chosen.append(chunk)
+        per_document[document_key] = per_document.get(document_key, 0) + 1
+        used += cost
+    return chosen
+
+
+def format_chunk(chunk):
+    return f"[{chunk.title}]({chunk.url})\n{chunk.text}"
+
+
+def format_context(chunks):
+    """The retrieved passages as a prompt section, or "" if there are none."""
+    if not chunks:
+        return ""
+    passages = "\n\n".join(format_chunk(chunk) for chunk in chunks)
+    return f"{HEADER}\n\n{passages}"
@@ -0,0 +1,217 @@
+"""
+Site search over blog posts, case studies and practice areas.
+
+Documents live in one full-text table, `pages_search`, created by migration
+0017: an FTS5 virtual table on SQLite, or a table with a generated, GIN-indexed
+`tsvector` column on PostgreSQL. Each row holds the plain text of one object
+(RichTextField HTML stripped) plus what a result needs to render (title, URL),
+so a search is a single query with no joins back to the content tables.
+
+Rows are keyed by `object pk * 4 + kind`, so the post_save / post_delete
+receivers in signals.py replace or remove one document by primary key.
+Drafts are indexed too, flagged not public, so the admin can search them;
+the public /search/ view only sees published documents.
+
+search() ranks with BM25 on SQLite (title weighted above summary above body)
+and ts_rank_cd on PostgreSQL, and returns an HTML-safe snippet per result with
+the matched terms in <mark>.
+"""
+import html
+import re
+from collections import namedtuple
+
+from django.db import connection
+from django.urls import reverse
+from django.utils.html import escape, strip_tags
+from django.utils.safestring import mark_safe
+
+from .models import BlogPost, CaseStudy, PracticeArea
+
+TABLE = "pages_search"
+
+BLOG, CASE, PRACTICE_AREA = 1, 2, 3
+KIND_LABELS = {BLOG: "Insight", CASE: "Case study", PRACTICE_AREA: "Practice area"}
+MODEL_KINDS = {"blogpost": BLOG, "casestudy": CASE, "practicearea": PRACTICE_AREA}
+
+MAX_TERMS = 10
+SNIPPET_WORDS = 24
+# snippet highlight markers, swapped for <mark> after the text is escaped
+_OPEN, _CLOSE = "\x02", "\x03"
+
+
+class Result(namedtuple("Result", ["kind", "object_id", "title", "url", "snippet", "rank"])):
+    __slots__ = ()
+
+    @property
+    def label(self):
+        return KIND_LABELS[self.kind]
+
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_SPACE = re.compile(r"\s+")
+
+
+def strip_html(value):
+    """Plain text from RichTextField HTML: tags dropped, entities decoded, whitespace collapsed."""
+    # tags are replaced by a space first so "<p>one</p><p>two</p>" doesn't become "onetwo"
+    return _SPACE.sub(" ", html.unescape(strip_tags(re.sub(r"<", " <", value or "")))).strip()
+
+
+def doc_id(kind, pk):
+    return pk * 4 + kind
+
+
+def kind_of(instance):
+    return MODEL_KINDS[instance._meta.model_name]
+
+
+def document(kind, obj):
+    """(title, summary, body, public, url) for an object."""
+    if kind == PRACTICE_AREA:
+        return (obj.name, obj.short_summary, strip_html(obj.body or obj.description), True,
+                reverse("practice_area_detail", args=[obj.slug]))
+    summary = obj.summary
+    if kind == CASE and obj.outcome:
+        summary = f"{summary} {obj.outcome}".strip()
+    url = reverse("blog_detail" if kind == BLOG else "case_detail", args=[obj.slug])
+    return obj.title, summary, strip_html(obj.body), obj.published, url
+
+
+def _insert_sql():
+    if connection.vendor == "sqlite":
+        return f"INSERT INTO {TABLE} (rowid, kind, url, public, title, summary, body) VALUES (%s, %s, %s, %s, %s, %s, %s)"
+    return f"INSERT INTO {TABLE} (id, kind, url, public, title, summary, body) VALUES (%s, %s, %s, %s, %s, %s, %s)"
+
+
+def _key_column():
+    return "rowid" if connection.vendor == "sqlite" else "id"
+
+
+def _row(kind, obj):
+    title, summary, body, public, url = document(kind, obj)
+    return doc_id(kind, obj.pk), kind, url, int(public), title, summary, body
+
+
+def enabled():
+    """Whether the database has a search table (see migration 0017)."""
+    return connection.vendor in ("sqlite", "postgresql")
+
+
+def index(instance):
+    """Add or replace one object's document."""
+    if not enabled():
+        return
+    kind = kind_of(instance)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE {_key_column()} = %s", [doc_id(kind, instance.pk)])
+        cursor.execute(_insert_sql(), _row(kind, instance))
+
+
+def remove(instance):
+    if not enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE {_key_column()} = %s", [doc_id(kind_of(instance), instance.pk)])
+
+
+def rebuild(batch_size=500):
+    """Re-index everything from scratch; returns the number of documents."""
+    if not enabled():
+        return 0
+    sources = [
+        (BLOG, BlogPost.objects.only(
+            "pk", "title", "slug", "summary", "body", "published")),
+        (CASE, CaseStudy.objects.only(
+            "pk", "title", "slug", "summary", "body", "published", "outcome")),
+        (PRACTICE_AREA, PracticeArea.objects.only(
+            "pk", "name", "slug", "short_summary", "body", "description")),
+    ]
+    total = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+        for kind, queryset in sources:
+            batch = []
+            for obj in queryset.iterator(chunk_size=batch_size):
+                batch.append(_row(kind, obj))
+                if len(batch) == batch_size:
+                    cursor.executemany(_insert_sql(), batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(_insert_sql(), batch)
+                total += len(batch)
+        if connection.vendor == "sqlite":
+            cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+    return total
+
+
+def fts_query(text):
+    """
+    An FTS5 query for free text: each word quoted (so user input can't use
+    FTS syntax), all required, the last one as a prefix so a half-typed word
+    still matches ("enforce" finds "enforceability"). The porter stemmer is
+    applied to prefixes as well, so this works for prefixes of the stem.
+    Empty if there are no words.
+    """
+    terms = _WORD.findall(text)[:MAX_TERMS]
+    if not terms:
+        return ""
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _highlight(snippet):
+    return mark_safe(escape(snippet).replace(_OPEN, "<mark>").replace(_CLOSE, "</mark>"))
+
+
+def search(text, limit=20, offset=0, public_only=True, kinds=None):
+    """Ranked Results for free text, best first."""
+    if not enabled():
+        return []
+    where, params = [], []
+    if public_only:
+        where.append("public = 1")
+    if kinds:
+        where.append(f"kind IN ({', '.join(['%s'] * len(kinds))})")
+        params.extend(kinds)
+
+    if connection.vendor == "sqlite":
+        query = fts_query(text)
+        if not query:
+            return []
+        sql = f"""
+            SELECT rowid, kind, title, url,
+                   snippet({TABLE}, -1, '{_OPEN}', '{_CLOSE}', '…', {SNIPPET_WORDS}),
+                   bm25({TABLE}, 0, 0, 0, 10.0, 4.0, 1.0) AS score
+            FROM {TABLE}
+            WHERE {TABLE} MATCH %s {''.join(' AND ' + w for w in where)}
+            ORDER BY score
+            LIMIT %s OFFSET %s
+        """
+        params = [query, *params, limit, offset]
+    else:
+        if not _WORD.search(text):
+            return []
+        sql = f"""
+            SELECT id, kind, title, url,
+                   ts_headline('english', body, q,
+                               'StartSel={_OPEN}, StopSel={_CLOSE}, MaxWords={SNIPPET_WORDS}, MinWords=8, MaxFragments=1'),
+                   ts_rank_cd(document, q) AS score
+            FROM {TABLE}, websearch_to_tsquery('english', %s) AS q
+            WHERE document @@ q {''.join(' AND ' + w for w in where)}
+            ORDER BY score DESC
+            LIMIT %s OFFSET %s
+        """
+        params = [text, *params, limit, offset]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    return [Result(kind, key // 4, title, url, _highlight(snippet), rank)
+            for key, kind, title, url, snippet, rank in rows]
+
+
+def matching_ids(text, kind, limit=1000):
+    """Primary keys of objects of `kind` (drafts included) matching text, best first."""
+    return [r.object_id for r in search(text, limit=limit, public_only=False, kinds=[kind])]
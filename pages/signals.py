@@ -0,0 +1,97 @@
+"""
+Model signal receivers that keep derived caches and the search index in step
+with CMS content, and hero image variants with the uploaded image.
+Connected in PagesConfig.ready().
+"""
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
+from . import images, retrieval, search
+from .availability import invalidate_availability
+from .models import AvailabilitySlot, BlogPost, CaseStudy, PracticeArea, SitePage, HomepageSettings
+from .page_cache import bump_content_version
+from .site_context import invalidate_site_context
+
+CMS_MODELS = (BlogPost, CaseStudy, PracticeArea, SitePage, HomepageSettings)
+# Models listed in the assistant's site map
+SITE_MAP_MODELS = (BlogPost, CaseStudy, PracticeArea)
+# Models in the site search index (pages/search.py)
+SEARCH_MODELS = (BlogPost, CaseStudy, PracticeArea)
+# Models chunked for the assistant's retrieval index (pages/retrieval.py)
+RETRIEVAL_MODELS = (BlogPost, CaseStudy, PracticeArea, SitePage)
+# Models with a hero_image that gets responsive variants (pages/images.py)
+HERO_IMAGE_MODELS = (BlogPost, CaseStudy, SitePage)
+
+
+def hero_image_saved(sender, instance, **kwargs):
+    if not kwargs.get("raw"):
+        images.process(instance)
+
+
+def hero_image_deleted(sender, instance, **kwargs):
+    images.delete_variants(instance.hero_variants)
+
+
+def cms_content_changed(sender, **kwargs):
+    if kwargs.get("raw"):
+        return  # loaddata: leave caches alone until the fixture is in place
+    bump_content_version()
+
+
+def site_map_content_changed(sender, **kwargs):
+    if not kwargs.get("raw"):
+        invalidate_site_context()
+
+
+def search_document_saved(sender, instance, **kwargs):
+    search.index(instance)
+
+
+def search_document_deleted(sender, instance, **kwargs):
+    search.remove(instance)
+
+
+def retrieval_document_saved(sender, instance, **kwargs):
+    retrieval.index(instance)
+
+
+def retrieval_document_deleted(sender, instance, **kwargs):
+    retrieval.remove(instance)
+
+
+def availability_changed(sender, **kwargs):
+    if not kwargs.get("raw"):
+        invalidate_availability()
+
+
+def case_practice_areas_changed(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_content_version()
+
+
+# Before the cache receivers below, so re-rendered pages see the new variants
+for model in HERO_IMAGE_MODELS:
+    post_save.connect(hero_image_saved, sender=model, dispatch_uid=f"hero_image_saved_{model.__name__}")
+    post_delete.connect(hero_image_deleted, sender=model, dispatch_uid=f"hero_image_deleted_{model.__name__}")
+
+for model in CMS_MODELS:
+    post_save.connect(cms_content_changed, sender=model, dispatch_uid=f"cms_saved_{model.__name__}")
+    post_delete.connect(cms_content_changed, sender=model, dispatch_uid=f"cms_deleted_{model.__name__}")
+
+for model in SITE_MAP_MODELS:
+    post_save.connect(site_map_content_changed, sender=model, dispatch_uid=f"site_map_saved_{model.__name__}")
+    post_delete.connect(site_map_content_changed, sender=model, dispatch_uid=f"site_map_deleted_{model.__name__}")
+
+for model in SEARCH_MODELS:
+    post_save.connect(search_document_saved, sender=model, dispatch_uid=f"search_saved_{model.__name__}")
+    post_delete.connect(search_document_deleted, sender=model, dispatch_uid=f"search_deleted_{model.__name__}")
+
+for model in RETRIEVAL_MODELS:
+    post_save.connect(retrieval_document_saved, sender=model, dispatch_uid=f"retrieval_saved_{model.__name__}")
+    post_delete.connect(retrieval_document_deleted, sender=model, dispatch_uid=f"retrieval_deleted_{model.__name__}")
+
+# Slots created, edited, booked or deleted change the booking calendar
+post_save.connect(availability_changed, sender=AvailabilitySlot, dispatch_uid="availability_saved")
+post_delete.connect(availability_changed, sender=AvailabilitySlot, dispatch_uid="availability_deleted")
+
+m2m_changed.connect(case_practice_areas_changed, sender=CaseStudy.practice_areas.through,
+                    dispatch_uid="cms_case_practice_areas")
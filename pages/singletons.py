@@ -0,0 +1,43 @@
+"""
+Read-only access to the CMS rows the home, about, privacy and terms pages
+render on every visit: HomepageSettings and the SITE_PAGE_DEFAULTS pages.
+
+The rows are seeded by migration 0020, so public views only ever read them.
+Each worker keeps the instances it has read for the current page-cache
+content version, which pages/signals.py bumps on every CMS save, so a GET
+normally runs no query at all. The instances are shared between requests and
+must not be modified; the owner area loads its own copies to edit.
+
+A row that is missing (deleted in the admin) is served as an unsaved instance
+with the default values, not created; saving it in the owner area creates it.
+"""
+from .models import SITE_PAGE_DEFAULTS, HomepageSettings, SitePage
+from .page_cache import get_content_version
+
+# Per-process (version, {key: instance}), swapped as one tuple so threads never
+# see a version paired with another version's rows
+_memo = (None, {})
+
+
+def _cached(key, load):
+    global _memo
+    version = get_content_version()
+    memo_version, rows = _memo
+    if memo_version != version:
+        rows = {}
+        _memo = (version, rows)
+    if key not in rows:
+        rows[key] = load()
+    return rows[key]
+
+
+def homepage_settings():
+    return _cached("homepage", lambda: HomepageSettings.objects.filter(pk=1).first() or HomepageSettings())
+
+
+def site_page(slug):
+    """One of the SITE_PAGE_DEFAULTS pages."""
+    def load():
+        page = SitePage.objects.filter(slug=slug).first()
+        return page or SitePage(slug=slug, **SITE_PAGE_DEFAULTS[slug])
+    return _cached(f"site_page:{slug}", load)
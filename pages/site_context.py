@@ -0,0 +1,110 @@
+"""
+Site map injected into the assistant's system prompt.
+
+Building it takes three queries, but it only changes when a practice area,
+blog post or case study is edited, so the rendered text is cached under a
+version that pages/signals.py bumps on those saves. The text is built
+deterministically and carries a fingerprint: identical content always yields a
+byte-identical prompt prefix, which lets upstream providers reuse their
+prompt cache between requests.
+"""
+import hashlib
+from collections import namedtuple
+
+from django.core.cache import cache
+
+from .cache_versions import get_version, bump_version
+from .models import PracticeArea, BlogPost, CaseStudy
+
+VERSION_NAME = "site_map"
+
+SiteContext = namedtuple("SiteContext", ["text", "fingerprint"])
+
+# Per-process (version, SiteContext) pair, swapped as one tuple so threads
+# never see a version paired with another version's text
+_memo = (None, None)
+
+
+def build_site_context():
+    """
+    Build a structured site map with real URLs from the database.
+    Returns a formatted string for injection into the system prompt.
+    """
+    parts = []
+
+    # Static pages (always available)
+    parts.append("SITE MAP - Static Pages:")
+    parts.append("- About: /about/")
+    parts.append("- Contact: /contact/")
+    parts.append("- Book Consultation: /book/")
+    parts.append("- Practice Areas Index: /practice-areas/")
+    parts.append("- Blog Index: /blog/")
+    parts.append("- Case Studies Index: /cases/")
+    parts.append("- Privacy Policy: /privacy/")
+    parts.append("- Terms of Use: /terms/")
+    parts.append("")
+
+    # Practice Areas (with real URLs)
+    try:
+        areas = PracticeArea.objects.order_by("order", "name", "id").only("name", "slug")[:8]
+        if areas:
+            parts.append("Practice Areas (detailed pages):")
+            for area in areas:
+                url = f"/practice-areas/{area.slug}/"
+                parts.append(f"- {area.name}: {url}")
+            parts.append("")
+    except Exception:
+        pass
+
+    # Recent Blog Posts
+    try:
+        posts = BlogPost.objects.filter(published=True).order_by('-published_at', '-id').only("title", "slug")[:6]
+        if posts:
+            parts.append("Recent Blog Posts:")
+            for post in posts:
+                parts.append(f"- {post.title}: {post.get_absolute_url()}")
+            parts.append("")
+    except Exception:
+        pass
+
+    # Recent Case Studies
+    try:
+        cases = CaseStudy.objects.filter(published=True).order_by('-published_at', '-id').only("title", "slug")[:4]
+        if cases:
+            parts.append("Recent Case Studies:")
+            for case in cases:
+                parts.append(f"- {case.title}: {case.get_absolute_url()}")
+            parts.append("")
+    except Exception:
+        pass
+
+    return "\n".join(parts)
+
+
+def fingerprint(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def get_site_context():
+    """Return the current SiteContext, rebuilding it only after content changes."""
+    global _memo
+    version = get_version(VERSION_NAME)
+    memo_version, memo_context = _memo
+    if memo_version == version:
+        return memo_context
+
+    key = f"assistant:site_map:v{version}"
+    context = cache.get(key)
+    if context is None:
+        text = build_site_context()
+        context = SiteContext(text, fingerprint(text))
+        cache.set(key, tuple(context), 60 * 60 * 24)
+    else:
+        context = SiteContext(*context)
+
+    _memo = (version, context)
+    return context
+
+
+def invalidate_site_context():
+    bump_version(VERSION_NAME)
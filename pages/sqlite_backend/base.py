@@ -0,0 +1,61 @@
+"""
+SQLite database backend for several gunicorn workers sharing one database file.
+
+Django's own backend opens connections with SQLite's defaults: a rollback
+journal, so one writer blocks every reader, and deferred transactions, so a
+transaction that reads before it writes can fail with "database is locked"
+when it tries to upgrade its lock, however long the busy timeout. This backend
+adds the two options Django 5.1 introduced for that:
+
+    DATABASES = {
+        "default": {
+            "ENGINE": "pages.sqlite_backend",
+            "NAME": BASE_DIR / "db.sqlite3",
+            "OPTIONS": {
+                # run on every new connection
+                "init_command": "PRAGMA journal_mode = WAL; PRAGMA busy_timeout = 5000",
+                # BEGIN IMMEDIATE: transaction.atomic() takes the write lock up
+                # front, waiting up to busy_timeout for it
+                "transaction_mode": "IMMEDIATE",
+            },
+        }
+    }
+
+The options have the same names and meaning as in Django 5.1, so after an
+upgrade ENGINE can go back to "django.db.backends.sqlite3". Queries outside
+transaction.atomic() run in autocommit mode as before.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ("DEFERRED", "IMMEDIATE", "EXCLUSIVE")
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        # not sqlite3.connect() arguments
+        params.pop("init_command", None)
+        params.pop("transaction_mode", None)
+        return params
+
+    @property
+    def transaction_mode(self):
+        mode = self.settings_dict["OPTIONS"].get("transaction_mode")
+        if mode is not None and mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f"settings.DATABASES[{self.alias!r}]['OPTIONS']['transaction_mode'] is {mode!r}; "
+                f"use one of {', '.join(TRANSACTION_MODES)}"
+            )
+        return mode and mode.upper()
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        init_command = self.settings_dict["OPTIONS"].get("init_command", "")
+        for statement in init_command.split(";"):
+            if statement.strip():
+                conn.execute(statement)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f"BEGIN {self.transaction_mode}" if self.transaction_mode else "BEGIN")
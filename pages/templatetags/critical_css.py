@@ -0,0 +1,46 @@
+import functools
+import re
+
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from .. import assets, critical_css as critical
+
+register = template.Library()
+
+_RELATIVE_URL = re.compile(r"""url\((["']?)\.\./([^"')]+)\1\)""")
+
+
+@functools.lru_cache(maxsize=None)
+def _inline_css(page):
+    """The page's critical CSS with its relative URLs pointing at the collected files, or None."""
+    try:
+        css = critical.path(page).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    # urls are relative to css/bundle.css; in the page they'd resolve against its own URL
+    return _RELATIVE_URL.sub(lambda m: f'url("{static(m.group(2))}")', css)
+
+
+@register.simple_tag
+def critical_css(page):
+    """
+    The critical CSS of `page` (a key of critical_css.PAGES) inlined, and the
+    full bundle loaded without blocking rendering, e.g.
+
+        {% block stylesheets %}{% critical_css "home" %}{% endblock %}
+
+    Pages without a built file get the usual blocking <link>.
+    """
+    bundle = static(assets.BUNDLE)
+    css = _inline_css(page)
+    if css is None:
+        return format_html('<link href="{}" rel="stylesheet">', bundle)
+    return format_html(
+        '<style>{}</style>\n'
+        '  <link rel="preload" href="{}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">\n'
+        '  <noscript><link href="{}" rel="stylesheet"></noscript>',
+        mark_safe(css), bundle, bundle,
+    )
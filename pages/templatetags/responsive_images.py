@@ -0,0 +1,52 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from .. import images
+
+register = template.Library()
+
+# the <img src> for browsers without srcset support
+FALLBACK_WIDTH = 800
+
+
+def _srcset(storage, files):
+    return ", ".join(f"{storage.url(name)} {width}w" for width, name in files)
+
+
+@register.simple_tag
+def responsive_image(obj, sizes="100vw", loading="lazy", **attrs):
+    """
+    The hero image of `obj` as a <picture> with AVIF/WebP/fallback srcsets,
+    intrinsic width/height and lazy loading, e.g.
+
+        {% responsive_image post sizes="(min-width: 992px) 33vw, 100vw" alt=post.title class="w-100" %}
+
+    Use loading="eager" fetchpriority="high" for an image above the fold.
+    Objects whose variants aren't generated yet get a plain <img> of the original.
+    """
+    if not obj.hero_image:
+        return ""
+    attrs = {"alt": "", **attrs, "loading": loading, "decoding": "async"}
+    if obj.hero_width and obj.hero_height:
+        attrs.update(width=obj.hero_width, height=obj.hero_height)
+
+    variants = obj.hero_variants or {}
+    if variants.get("src") != obj.hero_image.name or "sources" not in variants:
+        attrs["src"] = images.source_url(obj)
+        return format_html("<img {}>", _attributes(attrs))
+
+    storage = images.storage_for(variants["origin"])
+    fallback = variants["sources"][variants["fallback"]]
+    src = max((f for f in fallback if f[0] <= FALLBACK_WIDTH), default=fallback[0])
+    attrs.update(src=storage.url(src[1]), srcset=_srcset(storage, fallback), sizes=sizes)
+    sources = format_html_join(
+        "", '<source type="{}" srcset="{}" sizes="{}">',
+        ((mime, _srcset(storage, files), sizes)
+         for mime, files in variants["sources"].items() if mime != variants["fallback"]),
+    )
+    return format_html('<picture class="responsive-image">{}<img {}></picture>', sources, _attributes(attrs))
+
+
+def _attributes(attrs):
+    return mark_safe(" ".join(format_html('{}="{}"', key, value) for key, value in attrs.items()))
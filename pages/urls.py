@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth import views as auth_views
 from . import views
@@ -8,6 +9,7 @@ urlpatterns = [
     path("practice-areas/", views.practice_areas, name="practice_areas"),
     path("practice-areas/<slug:slug>/", views.practice_area_detail, name="practice_area_detail"),
     path("book/", views.book_index, name="book_index"),
+    path("api/availability/<int:year>/<int:month>/", views.availability_month, name="availability_month"),
     path("book/date/<str:date>/", views.book_date, name="book_date"),
     path("book/slot/<int:pk>/", views.book_slot, name="book_slot"),
     path("book/slot/<int:pk>/submit/", views.book_submit, name="book_submit"),
@@ -19,8 +21,13 @@ urlpatterns = [
     path("blog/<slug:slug>/", views.blog_detail, name="blog_detail"),
     path("cases/", views.case_list, name="case_list"),
     path("cases/<slug:slug>/", views.case_detail, name="case_detail"),
+    path("search/", views.site_search, name="site_search"),
     path("webhooks/calendly/", views.calendly_webhook, name="calendly_webhook"),
-    path("api/assist/", views.ai_assist, name="ai_assist"),
+    path("api/assist/", views.ai_assist_async if settings.ASSISTANT_ASYNC else views.ai_assist, name="ai_assist"),
+    path("api/assist/stream/", views.ai_assist_stream_async if settings.ASSISTANT_ASYNC else views.ai_assist_stream, name="ai_assist_stream"),
+    path("api/blog/", views.blog_list_more, name="blog_list_more"),
+    path("api/cases/", views.case_list_more, name="case_list_more"),
+    path("metrics/", views.metrics, name="metrics"),
 
     # Owner area (obscure URL for security)
     path("site-access-dk2847/", auth_views.LoginView.as_view(template_name="SitePages/owner_login.html"), name="owner_login"),
@@ -44,6 +51,7 @@ urlpatterns = [
     path("owner/cases/<int:pk>/delete/", views.owner_case_delete, name="owner_case_delete"),
     path("owner/availability/", views.owner_availability_list, name="owner_availability_list"),
     path("owner/availability/new/", views.owner_availability_create, name="owner_availability_create"),
+    path("owner/availability/recurring/", views.owner_availability_bulk, name="owner_availability_bulk"),
     path("owner/availability/<int:pk>/", views.owner_availability_edit, name="owner_availability_edit"),
     path("owner/availability/<int:pk>/delete/", views.owner_availability_delete, name="owner_availability_delete"),
     path("owner/bookings/", views.owner_booking_list, name="owner_booking_list"),
@@ -1,23 +1,61 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.core.mail import send_mail
+from django.template.loader import render_to_string
+from django.urls import reverse
 from django.conf import settings
 from django.contrib import messages
-from .forms import ContactForm, HomepageSettingsForm, AboutPageForm, SitePageForm, PracticeAreaForm, BlogPostForm, CaseStudyForm, AvailabilitySlotForm, BookingSubmissionForm
-import hmac, hashlib, json
-import re, time, requests
-from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, HttpResponseBadRequest
-from .models import Booking, HomepageSettings, PracticeArea
-from .models import SitePage, PracticeArea, BlogPost, CaseStudy, AvailabilitySlot, BookingSubmission
-from django.core.cache import cache
+from .forms import ContactForm, HomepageSettingsForm, AboutPageForm, SitePageForm, PracticeAreaForm, BlogPostForm, CaseStudyForm, AvailabilitySlotForm, BookingSubmissionForm, RecurringAvailabilityForm
+import hmac, json
+from collections import namedtuple
+import re
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, HttpResponseBadRequest, StreamingHttpResponse
+from .models import HomepageSettings, PracticeArea
+from .models import SITE_PAGE_DEFAULTS, SitePage, PracticeArea, BlogPost, CaseStudy, AvailabilitySlot, BookingSubmission
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.utils import timezone
-
+from django.db.models import Prefetch
+from asgiref.sync import sync_to_async
+from . import metrics as site_metrics
+from .page_cache import cache_public_page
+from .conditional import conditional_page, latest_update
+from .site_context import get_site_context
+from .llm_client import LLMError, get_client as get_llm_client
+from .redaction import StreamRedactor
+from . import response_cache
+from .ratelimit import is_limited
+from .pagination import InvalidCursor, paginate
+from .booking import SlotTaken, reserve_slot
+from . import recurrence
+from . import outbox
+from . import calendly
+from . import search
+from . import retrieval
+from . import prompt
+from . import singletons
+from .availability import MAX_MONTHS_AHEAD, add_months, month_availability, month_offset, upcoming_dates
+
+# Validators for conditional GETs (pages/conditional.py): the newest
+# updated_at among the rows each page renders
+def _home_updated(request):
+    return latest_update(HomepageSettings.objects.all(), BlogPost.objects.filter(published=True),
+                         CaseStudy.objects.filter(published=True))
+
+def _site_page_updated(slug):
+    return lambda request: singletons.site_page(slug).updated_at
+
+def _post_updated(model):
+    return lambda request, slug: latest_update(model.objects.filter(slug=slug, published=True))
+
+def _posts_updated(model):
+    return lambda request: latest_update(model.objects.filter(published=True))
+
+@conditional_page(_home_updated)
+@cache_public_page
 def home(request):
-    homepage = HomepageSettings.load()
+    homepage = singletons.homepage_settings()
     practice_areas = PracticeArea.objects.all()[:3]
-    featured_cases = CaseStudy.objects.filter(published=True).order_by('-published_at')[:3]
-    latest_posts = BlogPost.objects.filter(published=True).order_by('-published_at')[:3]
+    featured_cases = CaseStudy.objects.filter(published=True).order_by('-published_at', '-id')[:3]
+    latest_posts = BlogPost.objects.filter(published=True).order_by('-published_at', '-id')[:3]
     return render(request, "SitePages/home.html", {
         "homepage": homepage,
         "practice_areas": practice_areas,
@@ -25,47 +63,39 @@ def home(request):
         "latest_posts": latest_posts,
     })
 
+@conditional_page(_site_page_updated("about"))
 def about(request):
-    page, created = SitePage.objects.get_or_create(
-        slug="about",
-        defaults={"title": "About", "body": ""}
-    )
-    return render(request, "SitePages/about.html", {"page": page})
+    return render(request, "SitePages/about.html", {"page": singletons.site_page("about")})
 
+@conditional_page(_site_page_updated("privacy"))
 def privacy(request):
-    page = SitePage.get_or_create_page(
-        slug="privacy",
-        title="Privacy Policy",
-        body="<p>This is a placeholder privacy policy. Please update this content from the Owner area.</p>"
-    )
-    return render(request, "SitePages/privacy.html", {"page": page})
+    return render(request, "SitePages/privacy.html", {"page": singletons.site_page("privacy")})
 
+@conditional_page(_site_page_updated("terms"))
 def terms(request):
-    page = SitePage.get_or_create_page(
-        slug="terms",
-        title="Terms of Use",
-        body="<p>This is a placeholder terms of use. Please update this content from the Owner area.</p>"
-    )
-    return render(request, "SitePages/terms.html", {"page": page})
+    return render(request, "SitePages/terms.html", {"page": singletons.site_page("terms")})
 
 def contact(request):
     if request.method == "POST":
         form = ContactForm(request.POST)
-        if form.is_valid():
+        if is_limited("contact", request):
+            form.add_error(None, "Too many enquiries from this connection. Please wait a few minutes and try again.")
+        elif form.is_valid():
             lead = form.save()
-            if getattr(settings, "DEFAULT_FROM_EMAIL", None) and getattr(settings, "ENQUIRY_TO_EMAIL", None):
-                send_mail(
+            if settings.ENQUIRY_TO_EMAIL:
+                # queued; delivered by the send_outbox worker
+                outbox.enqueue(
                     "New website enquiry",
                     f"Name: {lead.name}\nEmail: {lead.email}\nPhone: {lead.phone}\n\n{lead.message}",
-                    settings.DEFAULT_FROM_EMAIL,
-                    [settings.ENQUIRY_TO_EMAIL],
-                    fail_silently=True,
+                    settings.ENQUIRY_TO_EMAIL,
+                    reply_to=lead.email,
                 )
             return render(request, "SitePages/thanks.html", {"lead": lead})
     else:
         form = ContactForm()
     return render(request, "SitePages/contact.html", {"form": form})
 
+@csrf_exempt
 def calendly_webhook(request):
     if request.method != "POST":
         return HttpResponse(status=405)
@@ -74,40 +104,11 @@ def calendly_webhook(request):
     signing_key = getattr(settings, "CALENDLY_SIGNING_KEY", "")
     if signing_key:
         sig = request.headers.get("Calendly-Webhook-Signature", "")
-        try:
-            parts = dict(p.split("=",1) for p in sig.split(","))
-            expected = hmac.new(signing_key.encode(), msg=request.body, digestmod=hashlib.sha256).hexdigest()
-            if parts.get("v1") != expected:
-                return HttpResponseForbidden("Invalid signature")
-        except Exception:
-            return HttpResponseForbidden("Bad signature header")
-
-    payload = json.loads(request.body.decode("utf-8"))
-    trig = payload.get("event")            # e.g. "invitee.created"
-    data = payload.get("payload", {})
-
-    # Common fields (v2 webhooks)
-    event = data.get("event", {})          # start_time, end_time, status
-    invitee = data.get("invitee", {})      # name, email
-    uid = invitee.get("uuid") or data.get("uuid") or event.get("uuid") or "unknown"
-
-    if trig == "invitee.created":
-        Booking.objects.update_or_create(
-            calendly_id=uid,
-            defaults={
-                "status": "created",
-                "start_time": event.get("start_time"),
-                "end_time": event.get("end_time"),
-                "invitee_name": invitee.get("name",""),
-                "invitee_email": invitee.get("email",""),
-            }
-        )
-    elif trig == "invitee.canceled":
-        Booking.objects.update_or_create(
-            calendly_id=uid,
-            defaults={"status": "canceled"}
-        )
+        if not calendly.verify_signature(request.body, sig, signing_key):
+            return HttpResponseForbidden("Invalid signature")
 
+    # Stored as-is (retries deduplicated); the process_calendly worker applies it
+    calendly.receive(request.body)
     return HttpResponse(status=204)
 
 def page_view(slug):
@@ -116,33 +117,108 @@ def page_view(slug):
         return render(request, "SitePages/page_generic.html", {"page": page})
     return view
 
+@conditional_page()
+@cache_public_page
 def practice_areas(request):
     areas = PracticeArea.objects.all()
     return render(request, "SitePages/practice_areas.html", {"areas": areas})
 
+@conditional_page()
+@cache_public_page
 def practice_area_detail(request, slug):
     area = get_object_or_404(PracticeArea, slug=slug)
     all_areas = PracticeArea.objects.all()
     return render(request, "SitePages/practice_area_detail.html", {"area": area, "all_areas": all_areas})
 
+# Blog and case lists are paginated with a keyset cursor (pages/pagination.py);
+# "load more" fetches the next cards from the *_more JSON endpoints.
+LIST_PAGE_SIZE = 12
+
+def _blog_cards():
+    # only the columns includes/blog_cards.html renders; never the body
+    return (BlogPost.objects.filter(published=True).order_by('-published_at', '-id')
+            .only("title", "slug", "summary", "hero_image", "hero_width", "hero_height", "hero_variants",
+                  "published_at"))
+
+def _case_cards():
+    return (CaseStudy.objects.filter(published=True).order_by('-published_at', '-id')
+            .only("title", "slug", "summary", "outcome", "date_of_case", "citation_url", "published_at")
+            .prefetch_related(Prefetch("practice_areas", queryset=PracticeArea.objects.only("name"))))
+
+def _list_page(queryset, request):
+    """First page for a bad cursor, so stale "load more" links still work."""
+    try:
+        return paginate(queryset, request.GET.get("cursor"), LIST_PAGE_SIZE)
+    except InvalidCursor:
+        return paginate(queryset, None, LIST_PAGE_SIZE)
+
+def _more_response(queryset, request, template, name):
+    try:
+        page = paginate(queryset, request.GET.get("cursor"), LIST_PAGE_SIZE)
+    except InvalidCursor:
+        return JsonResponse({"error": "Invalid cursor."}, status=400)
+    html = render_to_string(template, {name: page.items}, request=request)
+    return JsonResponse({"html": html, "next_cursor": page.next_cursor})
+
 # Blog
+@conditional_page(_posts_updated(BlogPost))
+@cache_public_page
 def blog_list(request):
-    posts = BlogPost.objects.filter(published=True).order_by('-published_at', '-id')
-    return render(request, "SitePages/blog_list.html", {"posts": posts})
+    page = _list_page(_blog_cards(), request)
+    return render(request, "SitePages/blog_list.html", {"posts": page.items, "next_cursor": page.next_cursor})
+
+@conditional_page(_posts_updated(BlogPost))
+@cache_public_page
+def blog_list_more(request):
+    return _more_response(_blog_cards(), request, "includes/blog_cards.html", "posts")
 
+@conditional_page(_post_updated(BlogPost))
+@cache_public_page
 def blog_detail(request, slug):
     post = get_object_or_404(BlogPost, slug=slug, published=True)
     return render(request, "SitePages/blog_detail.html", {"post": post})
 
 # Cases
+@conditional_page(_posts_updated(CaseStudy))
+@cache_public_page
 def case_list(request):
-    cases = CaseStudy.objects.filter(published=True).order_by('-published_at', '-id')
-    return render(request, "SitePages/case_list.html", {"cases": cases})
+    page = _list_page(_case_cards(), request)
+    return render(request, "SitePages/case_list.html", {"cases": page.items, "next_cursor": page.next_cursor})
 
+@conditional_page(_posts_updated(CaseStudy))
+@cache_public_page
+def case_list_more(request):
+    return _more_response(_case_cards(), request, "includes/case_cards.html", "cases")
+
+@conditional_page(_post_updated(CaseStudy))
+@cache_public_page
 def case_detail(request, slug):
     case = get_object_or_404(CaseStudy, slug=slug, published=True)
     return render(request, "SitePages/case_detail.html", {"case": case})
 
+# Search
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGES = 10
+
+def site_search(request):
+    query = request.GET.get("q", "").strip()[:200]
+    try:
+        page = min(max(int(request.GET.get("page", 1)), 1), SEARCH_MAX_PAGES)
+    except ValueError:
+        page = 1
+    results = []
+    if query:
+        # one extra row tells us whether there is a next page
+        results = search.search(query, limit=SEARCH_PAGE_SIZE + 1, offset=(page - 1) * SEARCH_PAGE_SIZE)
+    has_next = len(results) > SEARCH_PAGE_SIZE and page < SEARCH_MAX_PAGES
+    return render(request, "SitePages/search.html", {
+        "query": query,
+        "results": results[:SEARCH_PAGE_SIZE],
+        "page": page,
+        "previous_page": page - 1 if page > 1 else None,
+        "next_page": page + 1 if has_next else None,
+    })
+
 # Owner area
 def is_staff_user(user):
     return user.is_authenticated and user.is_staff
@@ -169,10 +245,7 @@ def owner_edit_homepage(request):
 @login_required
 @user_passes_test(is_staff_user, login_url='/')
 def owner_edit_about(request):
-    page, created = SitePage.objects.get_or_create(
-        slug="about",
-        defaults={"title": "About", "body": ""}
-    )
+    page, created = SitePage.objects.get_or_create(slug="about", defaults=SITE_PAGE_DEFAULTS["about"])
     if request.method == "POST":
         form = AboutPageForm(request.POST, request.FILES, instance=page)
         if form.is_valid():
@@ -192,15 +265,9 @@ def owner_site_pages_list(request):
 @login_required
 @user_passes_test(is_staff_user, login_url='/')
 def owner_edit_site_page(request, slug):
-    # Known pages with default content
-    defaults = {
-        "privacy": {"title": "Privacy Policy", "body": "<p>Please add your privacy policy content here.</p>"},
-        "terms": {"title": "Terms of Use", "body": "<p>Please add your terms of use content here.</p>"},
-    }
-
     page, created = SitePage.objects.get_or_create(
         slug=slug,
-        defaults=defaults.get(slug, {"title": slug.replace("-", " ").title(), "body": ""})
+        defaults=SITE_PAGE_DEFAULTS.get(slug, {"title": slug.replace("-", " ").title(), "body": ""})
     )
 
     if request.method == "POST":
@@ -391,161 +458,237 @@ RULES:
 
 INTERNAL LINKS:
 - You may include internal links using HTML anchor tags: <a href="/path/">link text</a>
-- ONLY link to URLs listed in the SITE MAP below, or to top-level pages: /about/, /contact/, /book/, /practice-areas/, /blog/, /cases/
+- ONLY link to URLs listed in the SITE MAP or RELEVANT SITE CONTENT below, or to top-level pages: /about/, /contact/, /book/, /practice-areas/, /blog/, /cases/
 - Do NOT invent or guess URLs. If unsure whether a specific page exists, link to the nearest parent page.
 - Example: "You can learn more about employment matters <a href='/practice-areas/employment/'>here</a>."
 - Example: "To book a consultation, visit the <a href='/book/'>booking page</a>."
 """
 
-def _build_site_context():
-    """
-    Build a structured site map with real URLs from the database.
-    Returns a formatted string for injection into the system prompt.
-    """
-    parts = []
-
-    # Static pages (always available)
-    parts.append("SITE MAP - Static Pages:")
-    parts.append("- About: /about/")
-    parts.append("- Contact: /contact/")
-    parts.append("- Book Consultation: /book/")
-    parts.append("- Practice Areas Index: /practice-areas/")
-    parts.append("- Blog Index: /blog/")
-    parts.append("- Case Studies Index: /cases/")
-    parts.append("- Privacy Policy: /privacy/")
-    parts.append("- Terms of Use: /terms/")
-    parts.append("")
-
-    # Practice Areas (with real URLs)
-    try:
-        areas = PracticeArea.objects.all().order_by("order")[:8]
-        if areas:
-            parts.append("Practice Areas (detailed pages):")
-            for area in areas:
-                url = f"/practice-areas/{area.slug}/"
-                parts.append(f"- {area.name}: {url}")
-            parts.append("")
-    except Exception:
-        pass
-
-    # Recent Blog Posts
-    try:
-        posts = BlogPost.objects.filter(published=True).order_by('-published_at')[:6]
-        if posts:
-            parts.append("Recent Blog Posts:")
-            for post in posts:
-                parts.append(f"- {post.title}: {post.get_absolute_url()}")
-            parts.append("")
-    except Exception:
-        pass
-
-    # Recent Case Studies
-    try:
-        cases = CaseStudy.objects.filter(published=True).order_by('-published_at')[:4]
-        if cases:
-            parts.append("Recent Case Studies:")
-            for case in cases:
-                parts.append(f"- {case.title}: {case.get_absolute_url()}")
-            parts.append("")
-    except Exception:
-        pass
-
-    return "\n".join(parts)
-
 def _redact_personal(text: str) -> str:
-    """Light redaction: strip emails/phones so we don't store/echo them."""
+    """Light redaction: strip emails/phones/PPS numbers so we don't store/echo them."""
     text = re.sub(r'[\w\.-]+@[\w\.-]+', '[redacted-email]', text)
+    text = re.sub(r'\b\d{7}[A-Za-z]{1,2}\b', '[redacted-pps]', text)
     text = re.sub(r'\+?\d[\d\s\-\(\)]{7,}\d', '[redacted-phone]', text)
     return text
 
-def _rate_key(request):
-    ip = request.META.get("REMOTE_ADDR", "unknown")
-    ua = request.META.get("HTTP_USER_AGENT", "")[:60]
-    return "assist_rl_" + hashlib.sha256(f"{ip}|{ua}".encode()).hexdigest()
+UNAVAILABLE_REPLY = ("Sorry—I'm unavailable right now. For anything important, "
+                     "please use the contact form or book a consultation.")
 
-@csrf_exempt
-def ai_assist(request):
+# One validated assistant turn. `cached_reply` is set when the response cache
+# already holds an answer, in which case no LLM call is needed.
+AssistTurn = namedtuple("AssistTurn", ["messages", "cache_scope", "user_msg", "history",
+                                       "cached_reply", "prompt_tokens", "site_fingerprint"])
+
+def _prepare_assist(request):
+    """
+    Shared front half of the assistant endpoints: method/feature checks,
+    throttling, payload validation, prompt assembly and response-cache lookup.
+    Returns (AssistTurn, None) on success, or (None, JsonResponse) when the
+    request should be answered directly.
+    """
     if request.method != "POST":
-        return JsonResponse({"reply": "POST only"}, status=405)
+        return None, JsonResponse({"reply": "POST only"}, status=405)
     if not settings.ASSISTANT_ENABLED:
-        return JsonResponse({"reply": "The assistant is currently unavailable. Please use the contact form or book a consultation."})
-
-    # very light per-IP throttle: 1 request / 3 seconds, burst 3 in 30s
-    key = _rate_key(request)
-    now = time.time()
-    window = cache.get(key, {"ts": [], "block": 0})
-    # drop old timestamps
-    window["ts"] = [t for t in window["ts"] if now - t < 30]
-    if window.get("block", 0) and now - window["block"] < 10:
-        return JsonResponse({"reply":"You're sending messages a bit quickly—please wait a moment and try again."}, status=200)
-    if len(window["ts"]) >= 3:
-        window["block"] = now
-        cache.set(key, window, 30)
-        return JsonResponse({"reply":"You're sending messages a bit quickly—please wait a moment and try again."}, status=200)
+        return None, JsonResponse({"reply": "The assistant is currently unavailable. Please use the contact form or book a consultation."})
+
+    # per-client throttle, shared across workers (settings.RATE_LIMITS["assist"])
+    if is_limited("assist", request):
+        return None, JsonResponse({"reply":"You're sending messages a bit quickly—please wait a moment and try again."}, status=200)
 
     try:
         payload = json.loads(request.body.decode("utf-8"))
         user_msg = (payload.get("message") or "").strip()
         history  = payload.get("history") or []
     except Exception:
-        return JsonResponse({"reply": "Invalid request format"}, status=400)
+        return None, JsonResponse({"reply": "Invalid request format"}, status=400)
 
     if not user_msg:
-        return JsonResponse({"reply": "Please enter a message"}, status=400)
-
-    # keep short history
-    history = history[-8:]
-
-    # Build site-aware context with real URLs
-    site_map = _build_site_context()
-    system_message = SYSTEM_PROMPT + "\n\n" + site_map
+        return None, JsonResponse({"reply": "Please enter a message"}, status=400)
+    if prompt.estimate_tokens(user_msg) > settings.ASSISTANT_MAX_MESSAGE_TOKENS:
+        return None, JsonResponse({"reply": "That message is too long for the assistant. Please shorten it, or use the contact form for detailed questions."}, status=400)
+
+    # only well-formed user/assistant turns, each of bounded size
+    history = prompt.clean_history(history, user_msg)
+
+    # Site-aware context with real URLs (cached until CMS content changes),
+    # then the passages most relevant to this question. The retrieved part
+    # goes last so the prompt prefix stays identical between questions.
+    site_context = get_site_context()
+    system_message = SYSTEM_PROMPT + "\n\n" + site_context.text
+    # Cached replies are scoped by the stable prefix only: the passages depend
+    # on the question, which is keyed anyway, and would split near-duplicate
+    # questions apart
+    cache_scope = response_cache.scope(SYSTEM_PROMPT, site_context.fingerprint)
+    previous = next((turn["content"] for turn in reversed(history) if turn["role"] == "user"), "")
+    relevant = retrieval.format_context(retrieval.retrieve(
+        response_cache.normalize(user_msg), previous=response_cache.normalize(previous),
+    ))
+    if relevant:
+        system_message += "\n\n" + relevant
+
+    # older turns are summarised away if the whole prompt would exceed the budget
+    built = prompt.build(system_message, user_msg, history)
+
+    cached_reply = response_cache.lookup(cache_scope, user_msg, built.history)
+    if cached_reply is None:
+        prompt.record(built)
+    return AssistTurn(built.messages, cache_scope, user_msg, built.history, cached_reply, built.tokens,
+                      site_context.fingerprint), None
+
+def _store_reply(turn, reply):
+    response_cache.store(turn.cache_scope, turn.user_msg, turn.history, reply)
+
+def _with_prompt_size(response, turn):
+    # estimated prompt size for this turn (pages/prompt.py), for clients and load tests
+    response["X-Prompt-Tokens"] = str(turn.prompt_tokens)
+    # which site map the prompt was built from (changes after CMS edits)
+    response["X-Site-Map-Fingerprint"] = turn.site_fingerprint
+    return response
+
+def _json_reply(turn, reply):
+    return _with_prompt_size(JsonResponse({"reply": reply}), turn)
 
-    messages = [
-        {"role":"system","content": system_message},
-    ] + history + [
-        {"role":"user","content": user_msg}
-    ]
+@csrf_exempt
+def ai_assist(request):
+    turn, error = _prepare_assist(request)
+    if error:
+        return error
+    if turn.cached_reply is not None:
+        return _json_reply(turn, turn.cached_reply)
 
-    # Call OpenAI-compatible endpoint
+    # Call OpenAI-compatible endpoint (pooled session, retries, circuit breaker)
     try:
-        resp = requests.post(
-            f"{settings.LLM_BASE_URL}/chat/completions",
-            headers={
-                "Authorization": f"Bearer {settings.LLM_API_KEY}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "model": settings.LLM_MODEL,
-                "messages": messages,
-                "temperature": 0.2,
-                "max_tokens": 350,
-            },
-            timeout=25,
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        reply = data["choices"][0]["message"]["content"].strip()
-    except Exception:
-        reply = ("Sorry—I'm unavailable right now. For anything important, "
-                 "please use the contact form or book a consultation.")
-
-    # record a timestamp for rate-limiting window
-    window["ts"].append(now)
-    cache.set(key, window, 30)
+        reply = get_llm_client().chat(turn.messages, temperature=0.2, max_tokens=350)
+    except LLMError:
+        return _json_reply(turn, UNAVAILABLE_REPLY)
 
     # light redaction before returning (just in case)
     reply = _redact_personal(reply)
+    _store_reply(turn, reply)
 
     # Note: Frontend handles HTML sanitization, only allowing safe tags
     # (<a>, <p>, <ul>, <li>, <strong>, <em>) and only internal links (starting with /)
-    return JsonResponse({"reply": reply})
+    return _json_reply(turn, reply)
+
+def _sse(data, event=None):
+    """Format one Server-Sent Events message."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+def _sse_response(events):
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # stop proxies buffering the stream
+    return response
+
+def _cached_events(reply):
+    yield _sse({"delta": reply})
+    yield _sse({}, event="done")
+
+@csrf_exempt
+def ai_assist_stream(request):
+    """
+    Streaming variant of ai_assist: proxies the upstream's token deltas as
+    Server-Sent Events ({"delta": ...} messages, then a "done" event).
+    Requests answered without calling the LLM (throttled, invalid, disabled)
+    get the same JSON response as ai_assist, so the client can fall back.
+    """
+    turn, error = _prepare_assist(request)
+    if error:
+        return error
+    if turn.cached_reply is not None:
+        return _with_prompt_size(_sse_response(_cached_events(turn.cached_reply)), turn)
+
+    def events():
+        redactor = StreamRedactor(_redact_personal)
+        sent = []
+        try:
+            for delta in get_llm_client().stream_chat(turn.messages, temperature=0.2, max_tokens=350):
+                safe = redactor.feed(delta)
+                if safe:
+                    sent.append(safe)
+                    yield _sse({"delta": safe})
+            tail = redactor.flush()
+            if tail:
+                sent.append(tail)
+                yield _sse({"delta": tail})
+            yield _sse({}, event="done")
+            _store_reply(turn, "".join(sent).strip())
+        except LLMError:
+            if sent:
+                yield _sse({"delta": redactor.flush()})
+                yield _sse({}, event="done")
+            else:
+                yield _sse({"reply": UNAVAILABLE_REPLY}, event="error")
+
+    return _with_prompt_size(_sse_response(events()), turn)
+
+# Async assistant views, used instead of the two above when the site runs under
+# an ASGI worker (ASSISTANT_ASYNC=1). While the LLM call is in flight they only
+# hold an event-loop task, not a whole worker, so page views keep flowing.
+@csrf_exempt
+async def ai_assist_async(request):
+    turn, error = await sync_to_async(_prepare_assist)(request)
+    if error:
+        return error
+    if turn.cached_reply is not None:
+        return _json_reply(turn, turn.cached_reply)
+
+    try:
+        reply = await get_llm_client().achat(turn.messages, temperature=0.2, max_tokens=350)
+    except LLMError:
+        return _json_reply(turn, UNAVAILABLE_REPLY)
+
+    reply = _redact_personal(reply)
+    await sync_to_async(_store_reply)(turn, reply)
+    return _json_reply(turn, reply)
+
+@csrf_exempt
+async def ai_assist_stream_async(request):
+    """Async version of ai_assist_stream (same SSE event format)."""
+    turn, error = await sync_to_async(_prepare_assist)(request)
+    if error:
+        return error
+
+    async def events():
+        if turn.cached_reply is not None:
+            for event in _cached_events(turn.cached_reply):
+                yield event
+            return
+        redactor = StreamRedactor(_redact_personal)
+        sent = []
+        try:
+            async for delta in get_llm_client().astream_chat(turn.messages, temperature=0.2, max_tokens=350):
+                safe = redactor.feed(delta)
+                if safe:
+                    sent.append(safe)
+                    yield _sse({"delta": safe})
+            tail = redactor.flush()
+            if tail:
+                sent.append(tail)
+                yield _sse({"delta": tail})
+            yield _sse({}, event="done")
+            await sync_to_async(_store_reply)(turn, "".join(sent).strip())
+        except LLMError:
+            if sent:
+                yield _sse({"delta": redactor.flush()})
+                yield _sse({}, event="done")
+            else:
+                yield _sse({"reply": UNAVAILABLE_REPLY}, event="error")
+
+    return _with_prompt_size(_sse_response(events()), turn)
 
 # Availability Slots (Custom Booking System)
 @login_required
 @user_passes_test(is_staff_user, login_url='/')
 def owner_availability_list(request):
-    slots = AvailabilitySlot.objects.all()
-    return render(request, "SitePages/owner_availability_list.html", {"slots": slots})
+    # slots archived by sweep_slots are only listed on request
+    show_archived = request.GET.get("archived") == "1"
+    slots = AvailabilitySlot.objects.all() if show_archived else AvailabilitySlot.objects.current()
+    return render(request, "SitePages/owner_availability_list.html", {
+        "slots": slots,
+        "show_archived": show_archived,
+    })
 
 @login_required
 @user_passes_test(is_staff_user, login_url='/')
@@ -563,6 +706,33 @@ def owner_availability_create(request):
         "is_create": True
     })
 
+@login_required
+@user_passes_test(is_staff_user, login_url='/')
+def owner_availability_bulk(request):
+    """Generate recurring slots from a rule; "preview" shows them without saving"""
+    preview = None
+    if request.method == "POST":
+        form = RecurringAvailabilityForm(request.POST)
+        if form.is_valid():
+            try:
+                plan = recurrence.plan(form.rule())
+            except recurrence.RuleTooLarge as exc:
+                form.add_error(None, str(exc))
+            else:
+                if request.POST.get("action") == "create":
+                    created = recurrence.create_slots(plan.new, form.cleaned_data["slot_type"],
+                                                      form.cleaned_data["notes"])
+                    skipped = f" Skipped {len(plan.conflicts)} overlapping existing slots." if plan.conflicts else ""
+                    messages.success(request, f"Created {created} availability slots.{skipped}")
+                    return redirect("owner_availability_list")
+                preview = plan
+    else:
+        form = RecurringAvailabilityForm()
+    return render(request, "SitePages/owner_availability_bulk.html", {
+        "form": form,
+        "preview": preview,
+    })
+
 @login_required
 @user_passes_test(is_staff_user, login_url='/')
 def owner_availability_edit(request, pk):
@@ -600,26 +770,31 @@ def owner_availability_delete(request, pk):
 # Public Booking System Views
 def book_index(request):
     """Shows list of available dates"""
-    from datetime import date
-    from collections import defaultdict
-
-    # Get all available slots in the future
-    today = date.today()
-    available_slots = AvailabilitySlot.objects.filter(
-        date__gte=today,
-        is_available=True
-    ).order_by('date', 'start_time')
-
-    # Group slots by date
-    dates_with_counts = defaultdict(int)
-    for slot in available_slots:
-        dates_with_counts[slot.date] += 1
-
-    # Convert to list of tuples (date, count)
-    dates_list = sorted(dates_with_counts.items())
-
+    dates_list = upcoming_dates()
     return render(request, "SitePages/booking_index.html", {
         "dates_list": dates_list,
+        # the calendar (js/booking_calendar.js) opens on the first bookable month
+        "calendar_month": dates_list[0][0] if dates_list else None,
+    })
+
+def availability_month(request, year, month):
+    """JSON: bookable dates and slot counts for one month, for the booking calendar"""
+    if not 1 <= month <= 12 or not 0 <= month_offset(year, month) <= MAX_MONTHS_AHEAD:
+        return JsonResponse({"error": "Month out of range."}, status=404)
+    offset = month_offset(year, month)
+
+    prev_month = add_months(year, month, -1) if offset > 0 else None
+    next_month = add_months(year, month, 1) if offset < MAX_MONTHS_AHEAD else None
+    return JsonResponse({
+        "year": year,
+        "month": month,
+        "days": [
+            {"date": day.isoformat(), "available": count,
+             "url": reverse("book_date", args=[day.isoformat()])}
+            for day, count in month_availability(year, month)
+        ],
+        "previous": {"year": prev_month[0], "month": prev_month[1]} if prev_month else None,
+        "next": {"year": next_month[0], "month": next_month[1]} if next_month else None,
     })
 
 def book_date(request, date):
@@ -634,10 +809,7 @@ def book_date(request, date):
         return redirect("book_index")
 
     # Get available slots for this date
-    slots = AvailabilitySlot.objects.filter(
-        date=selected_date,
-        is_available=True
-    ).order_by('start_time')
+    slots = AvailabilitySlot.objects.bookable().filter(date=selected_date).order_by('start_time')
 
     if not slots:
         messages.warning(request, "No available slots for this date.")
@@ -657,8 +829,8 @@ def book_slot(request, pk):
         messages.error(request, "This slot is no longer available.")
         return redirect("book_index")
 
-    # Check if slot is in the past
-    if slot.is_in_past():
+    # Check if slot has already started
+    if slot.starts_at <= timezone.now():
         messages.error(request, "This slot is in the past.")
         return redirect("book_index")
 
@@ -678,21 +850,33 @@ def book_submit(request, pk):
         messages.error(request, "This slot is no longer available.")
         return redirect("book_index")
 
-    # Check if slot is in the past
-    if slot.is_in_past():
+    # Check if slot has already started
+    if slot.starts_at <= timezone.now():
         messages.error(request, "This slot is in the past.")
         return redirect("book_index")
 
     if request.method == "POST":
+        if is_limited("book_submit", request):
+            messages.error(request, "Too many booking attempts. Please wait a few minutes and try again.")
+            return redirect("book_slot", pk=pk)
         form = BookingSubmissionForm(request.POST)
         if form.is_valid():
-            booking = form.save(commit=False)
-            booking.slot = slot
-            booking.save()
-
-            # Mark slot as unavailable
-            slot.is_available = False
-            slot.save()
+            # Claim the slot and save the booking in one transaction; a
+            # concurrent submission for the same slot gets SlotTaken
+            try:
+                booking = reserve_slot(slot.pk, form.save(commit=False))
+            except SlotTaken:
+                messages.error(request, "Sorry, that slot was just taken by someone else. Please choose another time.")
+                return redirect("book_index")
+
+            if settings.ENQUIRY_TO_EMAIL:
+                outbox.enqueue(
+                    f"New consultation booking: {slot.date:%a %d %b %Y} {slot.get_formatted_time()}",
+                    f"Name: {booking.name}\nEmail: {booking.email}\nPhone: {booking.phone}\n"
+                    f"Slot: {slot}\n\n{booking.description}",
+                    settings.ENQUIRY_TO_EMAIL,
+                    reply_to=booking.email,
+                )
 
             # Redirect to success page
             return redirect("book_success", booking_id=booking.pk)
@@ -736,4 +920,13 @@ def owner_booking_toggle_paid(request, pk):
         status = "paid" if booking.is_paid else "unpaid"
         messages.success(request, f"Booking marked as {status}.")
 
-    return redirect("owner_booking_list")
\ No newline at end of file
+    return redirect("owner_booking_list")
+
+def metrics(request):
+    """Prometheus-style counters. Staff only, or a scraper holding METRICS_TOKEN."""
+    token = settings.METRICS_TOKEN
+    bearer = request.headers.get("Authorization", "")
+    authorised = bool(token) and hmac.compare_digest(bearer, f"Bearer {token}")
+    if not authorised and not is_staff_user(request.user):
+        return HttpResponseForbidden("Forbidden")
+    return HttpResponse(site_metrics.render_prometheus(), content_type="text/plain; version=0.0.4")
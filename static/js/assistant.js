@@ -24,6 +24,7 @@
 
   /* ===== Modal Toggle ===== */
   function openModal() {
+    modal.hidden = false;
     modal.classList.add('active');
     modal.setAttribute('aria-hidden', 'false');
     input.focus();
@@ -127,6 +128,51 @@
       top: body.scrollHeight,
       behavior: 'smooth'
     });
+
+    return bubble;
+  }
+
+  /* ===== Streaming (Server-Sent Events over fetch) ===== */
+  // Reads `data: {"delta": ...}` events from the streaming endpoint and calls
+  // onDelta for each one. Resolves with the full reply text.
+  async function readStream(response, onDelta) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let reply = '';
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // Events are separated by a blank line
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const rawEvent = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+
+        let eventName = 'message';
+        let data = '';
+        rawEvent.split('\n').forEach(line => {
+          if (line.startsWith('event:')) eventName = line.slice(6).trim();
+          if (line.startsWith('data:')) data += line.slice(5).trim();
+        });
+        const payload = data ? JSON.parse(data) : {};
+
+        if (eventName === 'error') {
+          return payload.reply || reply;
+        }
+        if (eventName === 'done') {
+          return reply;
+        }
+        if (payload.delta) {
+          reply += payload.delta;
+          onDelta(reply);
+        }
+      }
+    }
+    return reply;
   }
 
   /* ===== Typing Indicator ===== */
@@ -165,8 +211,9 @@
     showTyping();
 
     try {
-      // Call backend API
-      const response = await fetch('/api/assist/', {
+      const canStream = window.ReadableStream && window.TextDecoder;
+      // Call backend API (streaming endpoint when the browser supports it)
+      const response = await fetch(canStream ? '/api/assist/stream/' : '/api/assist/', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -177,14 +224,39 @@
         })
       });
 
-      const data = await response.json();
-      const reply = data.reply || 'Sorry—please try again or use the contact form.';
+      let reply;
+      const contentType = response.headers.get('Content-Type') || '';
+
+      if (contentType.startsWith('text/event-stream')) {
+        // Render tokens as they arrive; the bubble appears with the first one
+        let bubble = null;
+        reply = await readStream(response, (text) => {
+          if (!bubble) {
+            hideTyping();
+            bubble = addMessage('ai', text);
+          } else {
+            bubble.innerHTML = sanitizeHTML(text);
+            body.scrollTop = body.scrollHeight;
+          }
+        });
+        reply = reply || 'Sorry—please try again or use the contact form.';
+        hideTyping();
+        if (bubble) {
+          bubble.innerHTML = sanitizeHTML(reply);
+        } else {
+          addMessage('ai', reply);
+        }
+      } else {
+        // Plain JSON (non-streaming endpoint, throttled or invalid requests)
+        const data = await response.json();
+        reply = data.reply || 'Sorry—please try again or use the contact form.';
 
-      // Hide typing indicator
-      hideTyping();
+        // Hide typing indicator
+        hideTyping();
 
-      // Add assistant message to UI
-      addMessage('ai', reply);
+        // Add assistant message to UI
+        addMessage('ai', reply);
+      }
 
       // Add to history
       history.push({ role: 'assistant', content: reply });
@@ -0,0 +1,70 @@
+/* ===== Month calendar on the booking page ===== */
+
+// The list of available dates below it works without JavaScript. With it,
+// this shows one month at a time from /api/availability/<year>/<month>/, each
+// bookable day linking to its time slots.
+(() => {
+  const calendar = document.querySelector('[data-availability-calendar]');
+  if (!calendar) return;
+
+  const title = calendar.querySelector('[data-calendar-title]');
+  const grid = calendar.querySelector('[data-calendar-grid]');
+  const steps = calendar.querySelectorAll('[data-calendar-step]');
+  const WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'];
+  // the API's dates are calendar days, so format them without a time zone shift
+  const monthName = new Intl.DateTimeFormat(undefined, { month: 'long', year: 'numeric', timeZone: 'UTC' });
+  const dayName = new Intl.DateTimeFormat(undefined, { dateStyle: 'full', timeZone: 'UTC' });
+
+  const monthUrl = ({ year, month }) => calendar.dataset.url.replace(/\d+\/\d+\/$/, `${year}/${month}/`);
+  const isoDate = (year, month, day) =>
+    `${year}-${String(month).padStart(2, '0')}-${String(day).padStart(2, '0')}`;
+
+  let shown = null;
+
+  function render(data) {
+    shown = data;
+    const available = new Map(data.days.map((day) => [day.date, day]));
+    const first = new Date(Date.UTC(data.year, data.month - 1, 1));
+    const length = new Date(Date.UTC(data.year, data.month, 0)).getUTCDate();
+
+    const cells = WEEKDAYS.map((name) => `<div class="weekday" aria-hidden="true">${name}</div>`);
+    for (let blank = (first.getUTCDay() + 6) % 7; blank > 0; blank--) cells.push('<div></div>');
+    for (let n = 1; n <= length; n++) {
+      const day = available.get(isoDate(data.year, data.month, n));
+      if (day) {
+        const label = `${dayName.format(new Date(Date.UTC(data.year, data.month - 1, n)))}: ` +
+                      `${day.available} slot${day.available === 1 ? '' : 's'} available`;
+        cells.push(`<a class="day" href="${day.url}" aria-label="${label}" title="${label}">${n}</a>`);
+      } else {
+        cells.push(`<span class="day">${n}</span>`);
+      }
+    }
+    grid.innerHTML = cells.join('');
+    title.textContent = monthName.format(first);
+
+    steps.forEach((button) => {
+      const target = data[button.dataset.calendarStep];
+      button.disabled = !target;
+      button.dataset.url = target ? monthUrl(target) : '';
+    });
+  }
+
+  async function load(url) {
+    const response = await fetch(url, { headers: { 'Accept': 'application/json' } });
+    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+    render(await response.json());
+  }
+
+  steps.forEach((button) => {
+    button.addEventListener('click', () => {
+      if (!button.dataset.url) return;
+      steps.forEach((step) => { step.disabled = true; });
+      // on failure stay on the current month; the list below has every date
+      load(button.dataset.url).catch(() => render(shown));
+    });
+  });
+
+  load(calendar.dataset.url)
+    .then(() => { calendar.hidden = false; })
+    .catch(() => { /* leave the calendar hidden; the list below still works */ });
+})();
@@ -0,0 +1,36 @@
+/* ===== "Load more" for the blog and case study lists ===== */
+
+// The button is a plain link to the next page (?cursor=...), so the lists
+// still page without JavaScript. With it, the next cards are fetched from the
+// JSON endpoint and appended in place.
+(() => {
+  document.querySelectorAll('[data-load-more]').forEach((button) => {
+    const target = document.querySelector(button.dataset.target);
+    if (!target) return;
+
+    button.addEventListener('click', async (event) => {
+      event.preventDefault();
+      if (button.classList.contains('disabled')) return;
+      button.classList.add('disabled');
+
+      try {
+        const url = `${button.dataset.url}?cursor=${encodeURIComponent(button.dataset.cursor)}`;
+        const response = await fetch(url, { headers: { 'Accept': 'application/json' } });
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        const data = await response.json();
+
+        target.insertAdjacentHTML('beforeend', data.html);
+        if (data.next_cursor) {
+          button.dataset.cursor = data.next_cursor;
+          button.href = `?cursor=${encodeURIComponent(data.next_cursor)}`;
+          button.classList.remove('disabled');
+        } else {
+          button.parentElement.remove();
+        }
+      } catch (error) {
+        // fall back to a normal page load
+        window.location.href = button.href;
+      }
+    });
+  });
+})();